@@ -0,0 +1,316 @@
+"""Bulk processing of archived recordings.
+
+A batch source is a directory, a glob pattern or a manifest file (one path
+per line, or JSON lines with a ``path`` key). Files are fanned out to a pool
+of worker processes that each load the models once, and results are
+written as JSON lines in completion order. Re-running with ``--resume``
+skips files that already have a successful record in the output file and
+retries the ones that failed. A worker crash fails the files it was
+running, and the pool is restarted for the rest of the batch.
+
+Usage:
+    python batch.py recordings/ --output results.jsonl --workers 4 --resume
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import multiprocessing
+import re
+import sys
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    BrokenExecutor,
+    ProcessPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from config_loader import load_toml_config, load_yaml_config
+from jobs import init_worker
+from resources import child_threads
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from config_loader import TOMLConfigModel
+
+AUDIO_EXTENSIONS = {".wav", ".mp3"}
+MANIFEST_EXTENSIONS = {".txt", ".jsonl", ".lst"}
+IN_FLIGHT_PER_WORKER = 2  # Keeps workers busy without queueing the whole batch
+SECONDS_PER_HOUR = 3600
+# Output names accepted over the API: a plain file name in the results directory
+OUTPUT_NAME_PATTERN = re.compile(r"^[\w-][\w.-]*\.jsonl$")
+
+
+class BatchRequestModel(BaseModel):
+    """Represents a batch request sent to the API.
+
+    ``output`` is a file name inside the configured batch output directory.
+    """
+
+    source: str
+    output: str | None = Field(default=None, pattern=OUTPUT_NAME_PATTERN.pattern)
+    resume: bool = False
+    workers: int | None = Field(default=None, ge=1)
+
+
+def _read_manifest(manifest: Path) -> list[Path]:
+    """Read paths from a manifest, resolving them relative to the manifest."""
+    paths = []
+    with manifest.open(encoding="utf-8") as manifest_file:
+        for line in manifest_file:
+            entry = line.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            if entry.startswith("{"):
+                entry = json.loads(entry)["path"]
+            path = Path(entry)
+            paths.append(path if path.is_absolute() else manifest.parent / path)
+    return paths
+
+
+def collect_inputs(source: str, input_root: Path | None = None) -> list[Path]:
+    """Expand a directory, glob pattern or manifest into audio file paths.
+
+    When ``input_root`` is given, paths outside it are dropped.
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        paths = sorted(
+            path for path in source_path.rglob("*")
+            if path.suffix.lower() in AUDIO_EXTENSIONS
+        )
+    elif source_path.is_file() and source_path.suffix.lower() in MANIFEST_EXTENSIONS:
+        paths = _read_manifest(source_path)
+    else:
+        paths = sorted(
+            Path(match) for match in glob.glob(source, recursive=True)  # noqa: PTH207
+            if Path(match).suffix.lower() in AUDIO_EXTENSIONS
+        )
+    if input_root is not None:
+        paths = [path for path in paths if is_within(path, input_root)]
+    return paths
+
+
+def is_within(path: Path, root: Path) -> bool:
+    """Return True if ``path`` resolves to a location inside ``root``."""
+    return path.resolve().is_relative_to(root.resolve())
+
+
+def completed_paths(output: Path) -> set[str]:
+    """Return the paths that already have a successful record in ``output``."""
+    if not output.exists():
+        return set()
+
+    done = set()
+    with output.open(encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Truncated last line of an interrupted run
+            if "path" in record and record.get("status") == "ok":
+                done.add(record["path"])
+    return done
+
+
+def _open_for_append(output: Path) -> Any:  # noqa: ANN401
+    """Open ``output`` for appending, after any line cut off by an interruption."""
+    truncated = False
+    if output.exists() and output.stat().st_size:
+        with output.open("rb") as output_file:
+            output_file.seek(-1, 2)
+            truncated = output_file.read(1) != b"\n"
+    output_file = output.open("a", encoding="utf-8")
+    if truncated:
+        output_file.write("\n")
+    return output_file
+
+
+def _process_one(
+    path: str, required_phrases: dict, prohibited_phrases: set,
+    categories: dict | None,
+) -> dict:
+    """Process one recording inside a worker process."""
+    from core import cached_validate_and_process  # noqa: PLC0415
+
+    start_time = time.perf_counter()
+    result = cached_validate_and_process(
+        path, required_phrases, prohibited_phrases, categories=categories,
+    )
+    return {
+        "path": path,
+        "status": "error" if "error" in result else "ok",
+        "seconds": round(time.perf_counter() - start_time, 2),
+        "result": result,
+    }
+
+
+def iter_batch(  # noqa: PLR0913
+    paths: list[Path],
+    workers: int,
+    required_phrases: dict,
+    prohibited_phrases: set,
+    system_config: TOMLConfigModel,
+    *,
+    categories: dict | None = None,
+) -> Iterator[dict]:
+    """Process ``paths`` on a worker pool, yielding records as they finish.
+
+    If a worker crashes, the files in flight fail and a new pool takes the
+    remaining ones.
+    """
+
+    def create_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(None, system_config, child_threads(workers)),
+        )
+
+    executor = create_pool()
+    remaining = iter(paths)
+    running = {}
+
+    def submit(path: Path) -> None:
+        nonlocal executor
+        args = (_process_one, str(path), required_phrases, prohibited_phrases,
+                categories)
+        try:
+            future = executor.submit(*args)
+        except BrokenExecutor:
+            logger.error("Batch worker pool crashed; starting a new one.")
+            executor.shutdown(wait=False)  # Its futures have already failed
+            executor = create_pool()
+            future = executor.submit(*args)
+        running[future] = path
+
+    def fill() -> None:
+        while len(running) < workers * IN_FLIGHT_PER_WORKER:
+            path = next(remaining, None)
+            if path is None:
+                return
+            submit(path)
+
+    try:
+        fill()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = running.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:  # noqa: BLE001
+                    record = {"path": str(path), "status": "error", "error": str(e)}
+                yield record
+            fill()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batch(  # noqa: PLR0913
+    source: str,
+    output: Path | None,
+    workers: int,
+    required_phrases: dict,
+    prohibited_phrases: set,
+    *,
+    system_config: TOMLConfigModel,
+    resume: bool = False,
+    input_root: Path | None = None,
+    categories: dict | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Run a batch, appending each record to ``output`` as it completes.
+
+    Yields one record per processed file, followed by a final
+    ``{"summary": ...}`` record with throughput figures.
+    """
+    paths = collect_inputs(source, input_root)
+    skipped = 0
+    if resume and output is not None:
+        done = completed_paths(output)
+        pending = [path for path in paths if str(path) not in done]
+        skipped = len(paths) - len(pending)
+        paths = pending
+    logger.info(
+        f"Batch {source}: {len(paths)} files to process, {skipped} already done.",
+    )
+
+    counts = {"ok": 0, "error": 0}
+    start_time = time.perf_counter()
+    output_file = None
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output_file = (
+            _open_for_append(output) if resume
+            else output.open("w", encoding="utf-8")
+        )
+    try:
+        for record in iter_batch(
+            paths, workers, required_phrases, prohibited_phrases, system_config,
+            categories=categories,
+        ):
+            counts[record["status"]] += 1
+            if output_file is not None:
+                output_file.write(json.dumps(record) + "\n")
+                output_file.flush()
+            yield record
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    elapsed = time.perf_counter() - start_time
+    processed = counts["ok"] + counts["error"]
+    yield {
+        "summary": {
+            "processed": processed,
+            "ok": counts["ok"],
+            "errors": counts["error"],
+            "skipped": skipped,
+            "elapsed_seconds": round(elapsed, 2),
+            "calls_per_hour": (
+                round(processed / elapsed * SECONDS_PER_HOUR, 1) if elapsed else 0.0
+            ),
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point."""
+    app_config = load_yaml_config()
+    system_config = load_toml_config()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Directory, glob pattern or manifest file")
+    parser.add_argument("--output", type=Path, default=Path("batch_results.jsonl"))
+    parser.add_argument("--workers", type=int, default=system_config.batch.workers)
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip files already recorded in the output file")
+    args = parser.parse_args(argv)
+
+    for record in run_batch(
+        args.source, args.output, args.workers,
+        app_config.required_phrases.model_dump(),
+        frozenset(app_config.prohibited_phrases),
+        system_config=system_config,
+        resume=args.resume,
+        categories=app_config.categories,
+    ):
+        if "summary" in record:
+            logger.info(f"Batch finished: {record['summary']}")
+        else:
+            logger.info(f"[{record['status'].upper()}] {record['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
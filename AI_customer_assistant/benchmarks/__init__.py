@@ -0,0 +1 @@
+"""Benchmarks for the audio pipeline; run them from the project root."""
@@ -0,0 +1,87 @@
+"""Check the import time of the service entry points against a budget.
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The
+report lists its cumulative import time, the slowest imported packages and
+any heavy model library that got imported eagerly (those must only be
+imported by the model registry loaders). The exit status is 1 when a module
+exceeds its budget or imports a heavy library.
+
+Usage:
+    python -m benchmarks.bench_import_time --budget core=1000 main=2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGETS_MS = {"core": 1000, "main": 2000}
+HEAVY_MODULES = (
+    "torch", "whisper", "pyannote", "textblob", "nltk", "spacy", "transformers",
+)
+TOP_PACKAGES = 5
+US_PER_MS = 1000
+
+
+def measure_import(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and summarise ``-X importtime``."""
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative: dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total_us, name = line.split("|")
+        if total_us.strip().isdigit():
+            cumulative.setdefault(name.strip(), int(total_us))
+
+    packages = {
+        name: total for name, total in cumulative.items() if "." not in name
+    }
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES + 1]
+    return {
+        "total_ms": round(cumulative.get(module, 0) / US_PER_MS, 1),
+        "slowest_ms": {
+            name: round(total / US_PER_MS, 1)
+            for name, total in slowest if name != module
+        },
+        "heavy_imports": sorted(
+            name for name in packages if name in HEAVY_MODULES
+        ),
+    }
+
+
+def main() -> None:
+    """Measure every module, print a JSON report and exit 1 on a violation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget", nargs="+",
+        default=[f"{module}={ms}" for module, ms in DEFAULT_BUDGETS_MS.items()],
+        help="module=milliseconds pairs",
+    )
+    args = parser.parse_args()
+
+    report = {}
+    over_budget = False
+    for entry in args.budget:
+        module, budget_ms = entry.split("=")
+        result = measure_import(module)
+        result["budget_ms"] = float(budget_ms)
+        result["within_budget"] = (
+            result["total_ms"] <= result["budget_ms"] and not result["heavy_imports"]
+        )
+        over_budget = over_budget or not result["within_budget"]
+        report[module] = result
+
+    print(json.dumps(report, indent=2))  # noqa: T201
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
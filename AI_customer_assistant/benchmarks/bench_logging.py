@@ -0,0 +1,135 @@
+"""Measure logging server throughput and end-to-end lag with simulated clients.
+
+A ``LoggingServer`` runs in this process on a free port, writing to a
+temporary directory. ``--clients`` processes each send ``--messages``
+records, through the batching ``UnifiedLogger`` or, with ``--legacy``, one
+JSON ``send_json`` per record like the previous client. The report gives
+the records written per second (from the first client's first record to the
+last record written, so process start-up is excluded), the lag from a
+record's creation to its write (for legacy records, from its receipt) and
+what the clients dropped.
+
+Usage:
+    python -m benchmarks.bench_logging --clients 8 --messages 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import zmq
+
+from logging_client import BLOCK, UnifiedLogger
+from logging_server import LoggingServer, RotatingLogWriter, parse_size
+
+SETTLE_TIMEOUT = 60  # Seconds to wait for the server to write every record
+PERCENTILE_99 = 98  # Index of the 99th percentile in statistics.quantiles(n=100)
+
+
+def _free_port() -> int:
+    """Return a TCP port that was free a moment ago."""
+    context = zmq.Context.instance()
+    socket = context.socket(zmq.PUSH)
+    port = socket.bind_to_random_port("tcp://127.0.0.1")
+    socket.close()
+    return port
+
+
+def run_client(port: int, client: int, messages: int, overflow: str) -> dict:
+    """Send ``messages`` records through a batching client and return its stats."""
+    client_logger = UnifiedLogger(port=port, overflow=overflow)
+    started = time.time()
+    for index in range(messages):
+        client_logger.send_log("INFO", "client {} message {}", client, index)
+    client_logger.flush(SETTLE_TIMEOUT)
+    client_logger.close(SETTLE_TIMEOUT)
+    return {**client_logger.stats(), "started": started}
+
+
+def run_legacy_client(port: int, client: int, messages: int, _overflow: str) -> dict:
+    """Send ``messages`` records one JSON frame at a time, like the old client."""
+    context = zmq.Context()
+    socket = context.socket(zmq.PUSH)
+    socket.connect(f"tcp://127.0.0.1:{port}")
+    started = time.time()
+    for index in range(messages):
+        socket.send_json({
+            "level": "INFO", "message": f"client {client} message {index}",
+        })
+    socket.close(linger=SETTLE_TIMEOUT * 1000)
+    context.term()
+    return {
+        "sent": messages, "dropped_queue_full": 0, "dropped_send": 0,
+        "started": started,
+    }
+
+
+def main() -> None:
+    """Run the clients against an in-process server and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--legacy", action="store_true",
+                        help="send one JSON frame per record")
+    parser.add_argument("--overflow", default=BLOCK, choices=("drop", "block"))
+    args = parser.parse_args()
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as log_dir:
+        server = LoggingServer(
+            RotatingLogWriter(Path(log_dir) / "bench.log", parse_size("100MB"),
+                              compression=None),
+            port=port, track_lag=True,
+        )
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        client = run_legacy_client if args.legacy else run_client
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            client_stats = pool.starmap(client, [
+                (port, index, args.messages, args.overflow)
+                for index in range(args.clients)
+            ])
+        sent = sum(stats["sent"] for stats in client_stats)
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        while server.written < sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.time() - min(stats["started"] for stats in client_stats)
+        server.stop()
+        server_thread.join()
+
+    lags = server.lag_samples or [0.0]
+    report = {
+        "clients": args.clients,
+        "messages_per_client": args.messages,
+        "format": "legacy-json" if args.legacy else "batch",
+        "sent": sent,
+        "written": server.written,
+        "dropped": sum(
+            stats["dropped_queue_full"] + stats["dropped_send"]
+            for stats in client_stats
+        ),
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(server.written / elapsed),
+        "lag_ms": {
+            "p50": round(statistics.median(lags) * 1000, 2),
+            "p99": round(
+                statistics.quantiles(lags, n=100)[PERCENTILE_99] * 1000
+                if len(lags) > 1 else lags[0] * 1000, 2,
+            ),
+            "max": round(max(lags) * 1000, 2),
+        },
+        "server": server.stats(),
+    }
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
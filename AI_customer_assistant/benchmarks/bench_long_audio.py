@@ -0,0 +1,79 @@
+"""Compare single-call and segmented transcription on a long recording.
+
+The bundled call is tiled until it reaches the requested length, then
+transcribed once with a single ``model.transcribe`` call and once with the
+parallel segmented path.
+
+Usage:
+    python -m benchmarks.bench_long_audio --minutes 20 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config_loader import load_toml_config
+from services.audio_context import SAMPLE_RATE, decode_audio
+from services.model_registry import get_model, model_registry
+from services.segmented_transcription import (
+    start_segment_workers,
+    transcribe_long_audio,
+)
+
+SECONDS_PER_MINUTE = 60
+
+
+def _tile(samples: np.ndarray, seconds: float) -> np.ndarray:
+    """Repeat ``samples`` until the buffer is ``seconds`` long."""
+    target = int(seconds * SAMPLE_RATE)
+    repeats = -(-target // len(samples))
+    return np.tile(samples, repeats)[:target]
+
+
+def main() -> None:
+    """Run the benchmark and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", default="customer_service_call.wav")
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-single", action="store_true",
+                        help="Only time the segmented path")
+    args = parser.parse_args()
+
+    system_config = load_toml_config()
+    model_registry.configure(system_config.models)
+    config = system_config.transcription.model_copy(update={"workers": args.workers})
+    samples = _tile(decode_audio(args.audio), args.minutes * SECONDS_PER_MINUTE)
+    report: dict = {
+        "audio_seconds": len(samples) / SAMPLE_RATE,
+        "workers": args.workers,
+    }
+
+    if not args.skip_single:
+        model = get_model("whisper")
+        start_time = time.perf_counter()
+        single = model.transcribe(samples)
+        report["single_call_seconds"] = round(time.perf_counter() - start_time, 2)
+        report["single_call_words"] = len(single["text"].split())
+
+    # Time a warm run: start the pool and load Whisper in every worker first.
+    start_segment_workers(config.workers, system_config.models)
+    start_time = time.perf_counter()
+    segmented = transcribe_long_audio(samples, config, system_config.models)
+    report["segmented_seconds"] = round(time.perf_counter() - start_time, 2)
+    report["segmented_words"] = len(segmented["text"].split())
+    report["segments"] = len(segmented["segments"])
+
+    if "single_call_seconds" in report:
+        report["speedup"] = round(
+            report["single_call_seconds"] / report["segmented_seconds"], 2,
+        )
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
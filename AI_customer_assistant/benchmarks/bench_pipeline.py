@@ -0,0 +1,286 @@
+"""Time every pipeline stage and text service on synthetic calls and transcripts.
+
+Calls of each ``--minutes`` length are rendered by ``benchmarks.synthetic``
+and run through ``core.process_audio_file`` ``--repeat`` times; the stage
+usage recorded by ``metrics`` gives the best wall and CPU time of every
+stage. Transcripts of each ``--words`` size are run through the text
+services on their own. With ``--backend stub`` (the default) Whisper,
+pyannote and TextBlob are replaced by the deterministic stubs, so no
+network access or Hugging Face token is needed; ``--backend real`` uses
+the configured models.
+
+The report is written as sorted, indented JSON to ``--output`` so a
+committed baseline shows regressions as diffs; ``--compare`` lists the
+timings more than ``--tolerance`` slower than a previous report and exits
+with status 1 if there are any.
+
+Usage:
+    python -m benchmarks.bench_pipeline --minutes 1 10 --words 1000 1000000 \
+        --output benchmarks/baselines/pipeline-stub.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+import wave
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from loguru import logger
+
+import core
+import metrics
+from benchmarks.synthetic import (
+    install_stub_models,
+    synthetic_call,
+    synthetic_transcript,
+)
+from config_loader import CacheConfigModel, load_toml_config, load_yaml_config
+from services.audio_context import SAMPLE_RATE, AudioContext
+from services.basic_categorization import categorize_call
+from services.compliance import check_compliance
+from services.model_registry import model_registry
+from services.pii_check import check_pii, mask_pii, scan_pii
+from services.profanity_check import scan_profanity
+from services.sentimental_analysis import analyze_sentiment
+from services.utils import clean_text
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+STUB = "stub"
+REAL = "real"
+SECONDS_PER_MINUTE = 60
+INT16_MAX = 32767
+TIMING_KEYS = ("wall_ms", "cpu_ms", "best_ms")
+MIN_COMPARED_MS = 1.0  # Shorter timings are dominated by noise
+
+
+def _write_wav(path: Path, samples: np.ndarray) -> None:
+    """Write float samples as a 16-bit mono WAV file."""
+    pcm = (np.clip(samples, -1, 1) * INT16_MAX).astype("<i2")
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(pcm.itemsize)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm.tobytes())
+
+
+def _best_time(func: Callable[[], object], repeat: int) -> float:
+    """Return the fastest of ``repeat`` timed calls, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start_time)
+    return round(min(timings) * 1000, 3)
+
+
+def _configure(backend: str, phrases: list[str]) -> None:
+    """Configure the pipeline for benchmarking with the chosen backend.
+
+    The result cache is disabled. With stubs, every stage runs on a thread
+    and transcription is never segmented, since worker processes would
+    load the real models.
+    """
+    system_config = load_toml_config()
+    update: dict[str, Any] = {"cache": CacheConfigModel(enabled=False)}
+    if backend == STUB:
+        update["pipeline"] = system_config.pipeline.model_copy(
+            update={"stage_executors": {}},
+        )
+        update["transcription"] = system_config.transcription.model_copy(
+            update={"workers": 1},
+        )
+    core.configure(system_config.model_copy(update=update))
+    if backend == STUB:
+        install_stub_models(phrases)
+
+
+def bench_call(
+    seconds: float, speakers: int, repeat: int, phrases: dict[str, Any],
+) -> dict[str, Any]:
+    """Run one synthetic call through the pipeline and report stage timings."""
+    call = synthetic_call(seconds, speakers)
+    report: dict[str, Any] = {
+        "audio_seconds": round(call.duration_seconds, 2),
+        "speakers": speakers,
+        "turns": len(call.turns),
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "call.wav"
+        _write_wav(path, call.samples)
+        if shutil.which("ffmpeg"):
+            report["decode_ms"] = _best_time(
+                lambda: AudioContext.from_file(path), repeat,
+            )
+        audio = AudioContext(path=path, samples=call.samples)
+
+        observations: list[tuple] = []
+        metrics.forward_to(observations.append)
+        totals = []
+        try:
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                result = core.process_audio_file(
+                    str(path), phrases["required"], phrases["prohibited"],
+                    audio=audio, categories=phrases["categories"],
+                )
+                totals.append(time.perf_counter() - start_time)
+        finally:
+            metrics.forward_to(None)
+
+    stages: dict[str, dict[str, Any]] = defaultdict(dict)
+    for kind, *args in observations:
+        if kind != "stage":
+            continue
+        name, status, usage = args
+        stage = stages[name]
+        if usage is None:
+            stage["status"] = status
+            continue
+        stage["wall_ms"] = round(
+            min(stage.get("wall_ms", float("inf")), usage.wall * 1000), 3,
+        )
+        stage["cpu_ms"] = round(
+            min(stage.get("cpu_ms", float("inf")), usage.cpu * 1000), 3,
+        )
+    report["total"] = {"wall_ms": round(min(totals) * 1000, 3)}
+    report["stages"] = dict(sorted(stages.items()))
+    report["transcript_words"] = len(result.get("transcription", "").split())
+    report["error"] = result.get("error")
+    return report
+
+
+def bench_text(words: int, repeat: int, phrases: dict[str, Any]) -> dict[str, Any]:
+    """Time every text service on a synthetic transcript of ``words`` tokens."""
+    raw = synthetic_transcript(words, phrases["vocabulary"])
+    text = clean_text(raw)
+    services: dict[str, Callable[[], object]] = {
+        "clean_text": lambda: clean_text(raw),
+        "check_pii": lambda: check_pii(text),
+        "mask_pii": lambda: mask_pii(text),
+        "scan_pii": lambda: scan_pii(text),
+        "profanity": lambda: scan_profanity(text, phrases["prohibited"]),
+        "compliance": lambda: check_compliance(text, phrases["required"]),
+        "categorize_call": lambda: categorize_call(text, phrases["categories"]),
+        "sentiment": lambda: analyze_sentiment(text),
+    }
+    return {
+        "words": words,
+        "characters": len(text),
+        "services": {
+            name: {"best_ms": _best_time(func, repeat)}
+            for name, func in services.items()
+        },
+    }
+
+
+def _timings(report: dict[str, Any], path: str = "") -> dict[str, float]:
+    """Flatten the timing leaves of a report into ``{path: milliseconds}``."""
+    flat = {}
+    for key, value in report.items():
+        child = f"{path}/{key}" if path else str(key)
+        if isinstance(value, dict):
+            flat.update(_timings(value, child))
+        elif key in TIMING_KEYS and isinstance(value, (int, float)):
+            flat[child] = value
+    return flat
+
+
+def compare(baseline: dict[str, Any], report: dict[str, Any],
+            tolerance: float) -> list[dict[str, Any]]:
+    """Return the timings more than ``tolerance`` slower than the baseline.
+
+    Timings under ``MIN_COMPARED_MS`` in the baseline are not compared.
+    """
+    before, after = _timings(baseline), _timings(report)
+    return [
+        {"timing": path, "baseline_ms": before[path], "current_ms": value,
+         "ratio": round(value / before[path], 2)}
+        for path, value in after.items()
+        if before.get(path, 0) >= MIN_COMPARED_MS
+        and value > before[path] * (1 + tolerance)
+    ]
+
+
+def main() -> None:
+    """Run the benchmarks, write the JSON report and compare it if asked."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", default=STUB, choices=(STUB, REAL))
+    parser.add_argument("--minutes", type=float, nargs="*", default=[1, 10])
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--words", type=int, nargs="*",
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a timing is reported")
+    args = parser.parse_args()
+
+    logger.disable("core")
+    logging.getLogger("services").setLevel(logging.WARNING)
+    app_config = load_yaml_config()
+    required = app_config.required_phrases.model_dump()
+    prohibited = frozenset(app_config.prohibited_phrases)
+    categories = app_config.categories
+    phrases = {
+        "required": required,
+        "prohibited": prohibited,
+        "categories": categories,
+        "vocabulary": sorted({
+            *(phrase for group in required.values() for phrase in group),
+            *prohibited,
+            *(keyword for group in categories.values() for keyword in group),
+        }),
+    }
+    _configure(args.backend, phrases["vocabulary"])
+    if args.backend == REAL:
+        model_registry.warm_up()
+
+    report = {
+        "backend": args.backend,
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "repeat": args.repeat,
+        "calls": {
+            f"{minutes:g}min": bench_call(
+                minutes * SECONDS_PER_MINUTE, args.speakers, args.repeat, phrases,
+            )
+            for minutes in args.minutes
+        },
+        "transcripts": {
+            f"{words}words": bench_text(words, args.repeat, phrases)
+            for words in args.words
+        },
+    }
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(f"{payload}\n", encoding="utf-8")
+    else:
+        print(payload)  # noqa: T201
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(baseline, report, args.tolerance)
+        print(json.dumps({"regressions": regressions}, indent=2))  # noqa: T201
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Compare transcription backends by real-time factor and word error rate.
+
+Every ``--backends`` x ``--models`` combination is loaded through
+``load_backend`` (as the model registry would), warmed up once and run
+``--repeat`` times over each recording. The real-time factor is the best
+transcription time divided by the audio duration (below 1 is faster than
+real time).
+
+The word error rate needs reference transcripts: ``--references`` takes a
+JSON file mapping each recording's file name to its text. Without one, the
+first combination's transcript stands in as the reference, so the rate
+shows how far the others drift from it (the first then scores 0).
+
+``--concurrency`` also measures aggregate throughput: for each level, that
+many threads transcribe the first recording at once, one Whisper call each
+and then through a shared ``WhisperBatcher`` (``[transcription] batching``),
+and the report gives the audio seconds transcribed per wall second.
+
+Usage:
+    python -m benchmarks.bench_transcription --backends whisper whisper-int8 \
+        --models base small --concurrency 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from config_loader import load_toml_config
+from services.audio_context import SAMPLE_RATE, decode_audio
+from services.batched_transcription import WhisperBatcher, transcribe_batched
+from services.model_registry import resolve_device
+from services.transcription_backends import WHISPER, WHISPER_INT8, load_backend
+from services.utils import clean_text
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from services.transcription_backends import WhisperBackend
+
+DEFAULT_AUDIO = ("customer_service_call.wav", "customer_service_call_fixed.wav")
+PUNCTUATION = re.compile(r"[.,!?;]")  # Kept by clean_text, ignored for WER
+
+
+def _words(text: str) -> list[str]:
+    """Return the words of ``text`` normalised as the pipeline cleans them."""
+    return PUNCTUATION.sub(" ", clean_text(text)).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Return (substitutions + deletions + insertions) / reference words."""
+    expected, actual = _words(reference), _words(hypothesis)
+    if not expected:
+        return float(bool(actual))
+    previous = list(range(len(actual) + 1))
+    for row, word in enumerate(expected, start=1):
+        current = [row]
+        for column, candidate in enumerate(actual, start=1):
+            current.append(min(
+                previous[column] + 1,  # deletion
+                current[column - 1] + 1,  # insertion
+                previous[column - 1] + (word != candidate),  # substitution
+            ))
+        previous = current
+    return previous[-1] / len(expected)
+
+
+def _throughput(
+    transcribe: Any, samples: np.ndarray, concurrency: int,  # noqa: ANN401
+) -> float:
+    """Return audio seconds per second with ``concurrency`` parallel calls."""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start_time = time.perf_counter()
+        list(pool.map(transcribe, [samples] * concurrency))
+        elapsed = time.perf_counter() - start_time
+    return round(concurrency * len(samples) / SAMPLE_RATE / elapsed, 2)
+
+
+def bench_concurrency(
+    transcriber: WhisperBackend, samples: np.ndarray, levels: list[int],
+) -> dict[str, Any]:
+    """Compare aggregate throughput with and without batched decoding."""
+    config = load_toml_config().transcription
+    batcher = WhisperBatcher(
+        transcriber, config.max_batch_size, config.max_batch_wait_ms / 1000,
+    )
+    try:
+        return {
+            str(level): {
+                "unbatched": _throughput(
+                    lambda audio: transcriber.transcribe(audio, word_timestamps=True),
+                    samples, level,
+                ),
+                "batched": _throughput(
+                    lambda audio: transcribe_batched(audio, batcher), samples, level,
+                ),
+            }
+            for level in levels
+        }
+    finally:
+        batcher.close()
+
+
+def bench_backend(
+    backend: str, model: str, recordings: dict[str, Any], repeat: int,
+    concurrency: list[int] | None = None,
+) -> dict[str, Any]:
+    """Load one backend and model and time it on every recording."""
+    models_config = load_toml_config().models.model_copy(
+        update={"whisper_backend": backend, "whisper_model": model},
+    )
+    start_time = time.perf_counter()
+    transcriber = load_backend(models_config)
+    load_seconds = time.perf_counter() - start_time
+    transcriber.transcribe(next(iter(recordings.values()))[:SAMPLE_RATE])
+
+    results = {}
+    for name, samples in recordings.items():
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            text = transcriber.transcribe(samples, word_timestamps=True)["text"]
+            timings.append(time.perf_counter() - start_time)
+        results[name] = {
+            "seconds": round(min(timings), 2),
+            "rtf": round(min(timings) / (len(samples) / SAMPLE_RATE), 3),
+            "text": text.strip(),
+        }
+    report = {
+        "backend": backend,
+        "model": model,
+        "device": str(transcriber.device),
+        "fp16": transcriber.fp16,
+        "load_seconds": round(load_seconds, 2),
+        "recordings": results,
+    }
+    if concurrency:
+        report["audio_seconds_per_second"] = bench_concurrency(
+            transcriber, next(iter(recordings.values())), concurrency,
+        )
+    return report
+
+
+def main() -> None:
+    """Run every combination and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", nargs="+", default=list(DEFAULT_AUDIO))
+    parser.add_argument("--backends", nargs="+", default=[WHISPER, WHISPER_INT8],
+                        choices=(WHISPER, WHISPER_INT8))
+    parser.add_argument("--models", nargs="+",
+                        default=[load_toml_config().models.whisper_model])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--references", help="JSON file of reference transcripts")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[],
+                        help="parallel transcriptions to measure throughput at")
+    parser.add_argument("--show-text", action="store_true",
+                        help="include the transcripts in the report")
+    args = parser.parse_args()
+
+    recordings = {Path(path).name: decode_audio(path) for path in args.audio}
+    runs = [
+        bench_backend(backend, model, recordings, args.repeat, args.concurrency)
+        for model in args.models
+        for backend in args.backends
+    ]
+
+    if args.references:
+        references = json.loads(Path(args.references).read_text(encoding="utf-8"))
+        reference_source = args.references
+    else:
+        first = runs[0]
+        references = {
+            name: result["text"] for name, result in first["recordings"].items()
+        }
+        reference_source = f"{first['backend']}/{first['model']} transcript"
+    for run in runs:
+        for name, result in run["recordings"].items():
+            if name in references:
+                result["wer"] = round(
+                    word_error_rate(references[name], result["text"]), 4,
+                )
+            if not args.show_text:
+                del result["text"]
+
+    report = {
+        "resolved_device": resolve_device(load_toml_config().models.device),
+        "reference": reference_source,
+        "runs": runs,
+    }
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Measure call throughput for different worker/thread splits of the CPUs.
+
+For each ``WORKERSxTHREADS`` split, a pool of worker processes is started
+(each limited to the given torch/BLAS threads and with its models loaded
+before timing starts) and the same recording is processed ``--calls``
+times with the result cache disabled. The report gives calls per minute
+per split, so the best ``number_of_workers``/``threads_per_worker``
+combination for a node can be read off directly.
+
+Usage:
+    python -m benchmarks.bench_worker_split --splits 1x16 2x8 4x4 8x2 --calls 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import _process_one
+from config_loader import CacheConfigModel, load_toml_config, load_yaml_config
+from jobs import init_worker
+from resources import available_cpus
+
+SECONDS_PER_MINUTE = 60
+
+
+def _default_splits() -> list[str]:
+    """Return power-of-two splits that use every available CPU."""
+    cpus = len(available_cpus())
+    splits = []
+    workers = 1
+    while workers <= cpus:
+        splits.append(f"{workers}x{cpus // workers}")
+        workers *= 2
+    return splits
+
+
+def run_split(
+    workers: int, threads: int, audio: str, calls: int, phrases: tuple,
+) -> dict:
+    """Process ``calls`` copies of ``audio`` on ``workers`` processes."""
+    system_config = load_toml_config()
+    system_config = system_config.model_copy(update={
+        "cache": CacheConfigModel(enabled=False),
+        "transcription": system_config.transcription.model_copy(
+            update={"workers": 1},
+        ),
+    })
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(None, system_config, threads),
+    )
+    try:
+        # Start every worker and load its models before timing
+        list(executor.map(time.sleep, [1.0] * workers))
+        start_time = time.perf_counter()
+        records = list(executor.map(
+            _process_one, [audio] * calls, *([value] * calls for value in phrases),
+        ))
+        elapsed = time.perf_counter() - start_time
+    finally:
+        executor.shutdown()
+
+    errors = sum(record["status"] == "error" for record in records)
+    return {
+        "workers": workers,
+        "threads": threads,
+        "seconds": round(elapsed, 2),
+        "calls_per_minute": round(calls * SECONDS_PER_MINUTE / elapsed, 2),
+        "mean_call_seconds": round(
+            sum(record["seconds"] for record in records) / calls, 2,
+        ),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    """Run every split and print a JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", default="customer_service_call.wav")
+    parser.add_argument("--calls", type=int, default=16)
+    parser.add_argument("--splits", nargs="+", default=_default_splits(),
+                        help="WORKERSxTHREADS pairs")
+    args = parser.parse_args()
+
+    app_config = load_yaml_config()
+    phrases = (
+        app_config.required_phrases.model_dump(),
+        frozenset(app_config.prohibited_phrases),
+        app_config.categories,
+    )
+    report = {"cpus": len(available_cpus()), "calls": args.calls, "splits": []}
+    for split in args.splits:
+        workers, threads = (int(value) for value in split.split("x"))
+        report["splits"].append(
+            run_split(workers, threads, args.audio, args.calls, phrases),
+        )
+    print(json.dumps(report, indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
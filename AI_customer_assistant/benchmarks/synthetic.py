@@ -0,0 +1,284 @@
+"""Synthetic calls, transcripts and deterministic stub model backends.
+
+``synthetic_call`` renders a call as alternating speaker turns separated by
+pauses, each speaker a tone at its own pitch with a syllable-rate envelope.
+The stub backends derive everything from the samples alone, so a given
+buffer always gives the same result without network access, a Hugging Face
+token or the real model libraries:
+
+* ``StubWhisper`` finds speech frames by energy and emits words from the
+  configured vocabulary at a fixed speaking rate, with Whisper-style
+  segments and word timestamps.
+* ``StubDiarization`` labels speech frames by their zero-crossing rate
+  (which tracks the tone pitch) and merges them into speaker turns.
+* ``StubSentiment`` scores text against a small word lexicon.
+
+``install_stub_models`` registers them with the model registry in place of
+Whisper, pyannote and TextBlob.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import numpy as np
+
+from services.audio_context import SAMPLE_RATE
+from services.model_registry import model_registry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+FILLER_WORDS = (
+    "thank", "you", "for", "calling", "how", "can", "i", "help", "today", "my",
+    "account", "was", "charged", "twice", "please", "hold", "while", "i", "check",
+    "the", "order", "and", "confirm", "the", "details", "it", "should", "arrive",
+    "next", "week", "is", "there", "anything", "else", "i", "can", "do", "for", "you",
+)
+PII_SAMPLES = (
+    "+1 555 123 4567", "123-45-6789", "jane.doe@example.com",
+    "4111 1111 1111 1111", "192.168.10.20", "12/05/1990",
+)
+PHRASE_RATE = 0.03  # Fraction of tokens that are configured phrases
+PII_RATE = 0.01  # Fraction of tokens that are PII values
+NOISY_RATE = 0.05  # Fraction of tokens given capitals, accents or punctuation
+POSITIVE_WORDS = frozenset({"thank", "great", "happy", "help", "perfect", "good"})
+NEGATIVE_WORDS = frozenset({"wrong", "twice", "angry", "bad", "problem", "crap"})
+
+BASE_PITCH_HZ = 140.0
+PITCH_STEP_HZ = 70.0  # Pitch difference between consecutive speakers
+SYLLABLE_HZ = 4.0
+TONE_AMPLITUDE = 0.3
+NOISE_AMPLITUDE = 0.002
+TURN_SECONDS = (2.0, 9.0)
+PAUSE_SECONDS = (0.3, 1.5)
+FRAME_SECONDS = 0.1
+SPEECH_RMS = 0.05  # Frames above this RMS count as speech
+WORDS_PER_SECOND = 2.5
+WORDS_PER_SEGMENT = 12
+
+
+class Turn(NamedTuple):
+    """A speaker turn, in seconds."""
+
+    start: float
+    end: float
+    speaker: str
+
+
+@dataclass
+class SyntheticCall:
+    """Rendered samples of a call with the turns they were rendered from."""
+
+    samples: np.ndarray
+    turns: list[Turn]
+
+    @property
+    def duration_seconds(self) -> float:
+        """Duration derived from the sample count."""
+        return len(self.samples) / SAMPLE_RATE
+
+
+def _speaker_label(index: int) -> str:
+    """Return the pyannote-style label of a speaker index."""
+    return f"SPEAKER_{index:02d}"
+
+
+def synthetic_call(seconds: float, speakers: int = 2, seed: int = 0) -> SyntheticCall:
+    """Render a call of ``seconds`` with ``speakers`` taking turns.
+
+    Speakers alternate (never twice in a row) with random turn lengths and
+    pauses; each speaks a tone at ``BASE_PITCH_HZ + index * PITCH_STEP_HZ``.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    total = int(seconds * SAMPLE_RATE)
+    samples = np.zeros(total, dtype=np.float32)
+    turns = []
+    speaker = 0
+    position = rng.uniform(*PAUSE_SECONDS)
+    while position < seconds:
+        end = min(position + rng.uniform(*TURN_SECONDS), seconds)
+        first, last = int(position * SAMPLE_RATE), int(end * SAMPLE_RATE)
+        t = np.arange(last - first, dtype=np.float32) / SAMPLE_RATE
+        pitch = BASE_PITCH_HZ + speaker * PITCH_STEP_HZ
+        envelope = 0.65 + 0.35 * np.sin(2 * np.pi * SYLLABLE_HZ * t)
+        samples[first:last] = TONE_AMPLITUDE * envelope * np.sin(2 * np.pi * pitch * t)
+        turns.append(Turn(round(position, 3), round(end, 3), _speaker_label(speaker)))
+        if speakers > 1:
+            speaker = (speaker + rng.randrange(1, speakers)) % speakers
+        position = end + rng.uniform(*PAUSE_SECONDS)
+    noise = np.random.default_rng(seed).standard_normal(total).astype(np.float32)
+    samples += NOISE_AMPLITUDE * noise
+    return SyntheticCall(samples, turns)
+
+
+def _noisy(token: str, rng: random.Random) -> str:
+    """Return ``token`` with capitals, an accent or punctuation added."""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return token.capitalize()
+    if choice == 1:
+        return token.replace("e", "é", 1)
+    return f"{token}{rng.choice(',.!?-')}"
+
+
+def script_tokens(phrases: list[str], seed: int = 0) -> Iterator[str]:
+    """Yield an endless, reproducible stream of spoken tokens.
+
+    Mostly filler words, with ``phrases`` (required, prohibited or category
+    phrases), PII values and tokens that ``clean_text`` has to normalise
+    mixed in.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    while True:
+        draw = rng.random()
+        if draw < PHRASE_RATE and phrases:
+            yield from rng.choice(phrases).split()
+        elif draw < PHRASE_RATE + PII_RATE:
+            yield from rng.choice(PII_SAMPLES).split()
+        elif draw < PHRASE_RATE + PII_RATE + NOISY_RATE:
+            yield _noisy(rng.choice(FILLER_WORDS), rng)
+        else:
+            yield rng.choice(FILLER_WORDS)
+
+
+def synthetic_transcript(words: int, phrases: list[str], seed: int = 0) -> str:
+    """Return a raw (uncleaned) transcript of about ``words`` tokens."""
+    tokens = script_tokens(phrases, seed)
+    return " ".join(next(tokens) for _ in range(words))
+
+
+def _frames(samples: np.ndarray) -> np.ndarray:
+    """Split ``samples`` into ``(n_frames, frame_length)`` without copying."""
+    length = int(FRAME_SECONDS * SAMPLE_RATE)
+    usable = len(samples) // length * length
+    return samples[:usable].reshape(-1, length)
+
+
+def _runs(labels: np.ndarray) -> list[tuple[int, int, int]]:
+    """Return ``(first, end, label)`` frame runs of equal non-negative labels."""
+    if not len(labels):
+        return []
+    edges = np.flatnonzero(np.diff(labels)) + 1
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [len(labels)]))
+    return [
+        (int(start), int(end), int(labels[start]))
+        for start, end in zip(starts, ends, strict=True) if labels[start] >= 0
+    ]
+
+
+def _samples_of(audio: Any) -> np.ndarray:  # noqa: ANN401
+    """Return mono float32 samples of a buffer or a pyannote waveform dict."""
+    if isinstance(audio, dict):
+        audio = audio["waveform"]
+    return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+
+def _speech_frames(samples: np.ndarray) -> np.ndarray:
+    """Return a per-frame mask of frames above the speech energy."""
+    frames = _frames(samples)
+    return np.sqrt(np.mean(frames * frames, axis=1)) > SPEECH_RMS
+
+
+class StubWhisper:
+    """Whisper stand-in emitting words wherever the audio has energy."""
+
+    device = SimpleNamespace(type="cpu")
+
+    def __init__(self, phrases: list[str]) -> None:
+        """Draw words from filler, ``phrases`` and PII values."""
+        self.phrases = phrases
+
+    def transcribe(self, audio: Any, **_kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
+        """Return a Whisper-style result with segment and word timestamps."""
+        samples = _samples_of(audio)
+        tokens = script_tokens(self.phrases, seed=len(samples))
+        word_seconds = 1 / WORDS_PER_SECOND
+        segments = []
+        for first, end, _ in _runs(_speech_frames(samples).astype(np.int8) - 1):
+            start_time, end_time = first * FRAME_SECONDS, end * FRAME_SECONDS
+            count = max(int((end_time - start_time) * WORDS_PER_SECOND), 1)
+            words = [
+                {
+                    "word": f" {next(tokens)}",
+                    "start": round(start_time + index * word_seconds, 2),
+                    "end": round(
+                        min(start_time + (index + 1) * word_seconds, end_time), 2,
+                    ),
+                }
+                for index in range(count)
+            ]
+            for offset in range(0, count, WORDS_PER_SEGMENT):
+                chunk = words[offset:offset + WORDS_PER_SEGMENT]
+                segments.append({
+                    "start": chunk[0]["start"],
+                    "end": chunk[-1]["end"],
+                    "text": "".join(word["word"] for word in chunk),
+                    "words": chunk,
+                })
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": "en",
+        }
+
+
+class _Annotation:
+    """The part of a pyannote ``Annotation`` the diarization service uses."""
+
+    def __init__(self, turns: list[Turn]) -> None:
+        self.turns = turns
+
+    def itertracks(
+        self, yield_label: bool = False,  # noqa: FBT001, FBT002
+    ) -> Iterator[tuple]:
+        """Yield ``(segment, track, label)`` (or ``(segment, track)``)."""
+        for index, turn in enumerate(self.turns):
+            segment = SimpleNamespace(start=turn.start, end=turn.end)
+            yield (segment, index, turn.speaker) if yield_label else (segment, index)
+
+
+class StubDiarization:
+    """Diarization stand-in telling speakers apart by pitch."""
+
+    def __call__(self, audio: Any) -> _Annotation:  # noqa: ANN401
+        """Return the speaker turns of a waveform dict or buffer."""
+        samples = _samples_of(audio)
+        frames = _frames(samples)
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+        pitch = crossings / (2 * FRAME_SECONDS)
+        speaker = np.rint((pitch - BASE_PITCH_HZ) / PITCH_STEP_HZ).astype(int)
+        speech = _speech_frames(samples)
+        # Frames next to silence mix speech with it and misread the pitch
+        speech[1:] &= speech[:-1].copy()
+        speech[:-1] &= speech[1:].copy()
+        labels = np.where(speech, np.maximum(speaker, 0), -1)
+        return _Annotation([
+            Turn(first * FRAME_SECONDS, end * FRAME_SECONDS, _speaker_label(label))
+            for first, end, label in _runs(labels)
+        ])
+
+
+class StubSentiment:
+    """Sentiment stand-in counting lexicon words."""
+
+    def analyze(self, text: str) -> tuple[float, float]:
+        """Return ``(polarity, subjectivity)`` like TextBlob's analyzer."""
+        words = text.lower().split()
+        if not words:
+            return 0.0, 0.0
+        positive = sum(word in POSITIVE_WORDS for word in words)
+        negative = sum(word in NEGATIVE_WORDS for word in words)
+        polarity = (positive - negative) / max(positive + negative, 1)
+        return polarity, min((positive + negative) / len(words) * 5, 1.0)
+
+
+def install_stub_models(phrases: list[str]) -> None:
+    """Register the stub backends in place of the real models."""
+    model_registry.register("whisper", lambda _config: StubWhisper(phrases))
+    model_registry.register("diarization", lambda _config: StubDiarization())
+    model_registry.register("sentiment", lambda _config: StubSentiment())
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import toml
 import yaml
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 
 
 # ✅ Pydantic Models for YAML Validation
@@ -15,11 +15,24 @@ class RequiredPhrasesModel(BaseModel):
     disclaimers: list[str]
 
 
+# Used when config.yaml has no ``categories`` section
+DEFAULT_CALL_CATEGORIES: dict[str, list[str]] = {
+    "Billing Issue": ["bill", "charge", "payment", "refund", "overcharged"],
+    "Order Return": ["return", "exchange", "replace", "wrong item"],
+    "Technical Support": ["error", "not working", "issue", "troubleshoot", "fix"],
+    "Account Support": ["login", "password", "account locked", "reset"],
+    "General Inquiry": ["information", "details", "help", "assist"],
+}
+
+
 class YAMLConfigModel(BaseModel):
     """Represents the YAML model."""
 
     required_phrases: RequiredPhrasesModel
     prohibited_phrases: list[str]
+    categories: dict[str, list[str]] = Field(
+        default_factory=lambda: dict(DEFAULT_CALL_CATEGORIES),
+    )
 
 
 # ✅ Pydantic Model for TOML Validation
@@ -31,6 +44,15 @@ class LoggingConfigModel(BaseModel):
     log_compression: str
     min_log_level: str
     logging_server_port_no: int
+    logging_server_address: str = "localhost"
+    client_queue_size: int = 10000
+    client_batch_size: int = 256
+    client_flush_interval_ms: float = 50
+    client_overflow: str = "drop"
+    client_block_timeout_ms: float = 100
+    server_drain_batch: int = 1000
+    server_buffer_kb: int = 256
+    server_flush_interval_ms: float = 200
 
 
 class ServerConfigModel(BaseModel):
@@ -39,6 +61,114 @@ class ServerConfigModel(BaseModel):
     port_no: int
     number_of_workers: int
     timeout_keep_alive: int
+    threads_per_worker: int = 0
+    cpu_affinity: bool = False
+    max_concurrent_requests: int = 2
+    request_timeout_seconds: float = 1800
+
+
+class UploadsConfigModel(BaseModel):
+    """Represents the UPLOADS CONFIG model."""
+
+    directory: str = "temp"
+    max_upload_mb: int = 200
+    chunk_size_kb: int = 1024
+
+
+class ModelsConfigModel(BaseModel):
+    """Represents the MODELS CONFIG model."""
+
+    device: str = "auto"
+    whisper_model: str = "base"
+    whisper_backend: str = "whisper"
+    whisper_download_root: str | None = None
+    diarization_model: str = "pyannote/speaker-diarization-3.0"
+    preload: list[str] = Field(
+        default_factory=lambda: ["whisper", "diarization", "sentiment"],
+    )
+    warm_up: bool = True
+    offline: bool = False
+
+
+class TranscriptionConfigModel(BaseModel):
+    """Represents the TRANSCRIPTION CONFIG model."""
+
+    long_audio_threshold_seconds: float = 600
+    segment_seconds: float = 300
+    overlap_seconds: float = 2.0
+    split_search_seconds: float = 15
+    workers: int = 4
+    batching: bool = False
+    max_batch_size: int = 8
+    max_batch_wait_ms: float = 50
+
+
+class PipelineConfigModel(BaseModel):
+    """Represents the PIPELINE CONFIG model."""
+
+    max_workers: int = 8
+    process_workers: int = 2
+    default_stage_timeout: float | None = 900
+    stage_timeouts: dict[str, float] = Field(default_factory=dict)
+    stage_executors: dict[str, str] = Field(default_factory=dict)
+
+
+class JobsConfigModel(BaseModel):
+    """Represents the JOBS CONFIG model."""
+
+    max_workers: int = 2
+    max_queue_size: int = 8
+    retry_after_seconds: int = 30
+    result_ttl_seconds: int = 3600
+    upload_dir: str = "temp"
+    executor: str = "process"
+
+
+class BatchConfigModel(BaseModel):
+    """Represents the BATCH CONFIG model."""
+
+    workers: int = 4
+    input_root: str = "."
+    output_dir: str = "batch_results"
+
+
+class CacheConfigModel(BaseModel):
+    """Represents the CACHE CONFIG model."""
+
+    enabled: bool = True
+    directory: str = "cache/results"
+    max_size_mb: int = 512
+
+
+class SentimentConfigModel(BaseModel):
+    """Represents the SENTIMENT CONFIG model."""
+
+    timeline: bool = True
+    window_seconds: float = 60
+    step_seconds: float = 15
+
+
+class SpeakingSpeedConfigModel(BaseModel):
+    """Represents the SPEAKING SPEED CONFIG model."""
+
+    window_seconds: float = 30
+    step_seconds: float = 10
+    pause_seconds: float = 1.0
+    min_speech_seconds: float = 5
+
+
+class ProfilingConfigModel(BaseModel):
+    """Represents the PROFILING CONFIG model."""
+
+    enabled: bool = False
+    allow_request_flag: bool = True
+    sample_rate: float = Field(default=0.0, ge=0, le=1)
+    max_concurrent: int = 1
+    interval_ms: float = 10
+    track_allocations: bool = False
+    allocation_top: int = 25
+    directory: str = "profiles"
+    max_profiles: int = 100
 
 
 class TOMLConfigModel(BaseModel):
@@ -46,6 +176,20 @@ class TOMLConfigModel(BaseModel):
 
     logging: LoggingConfigModel
     server: ServerConfigModel
+    models: ModelsConfigModel = Field(default_factory=ModelsConfigModel)
+    transcription: TranscriptionConfigModel = Field(
+        default_factory=TranscriptionConfigModel,
+    )
+    pipeline: PipelineConfigModel = Field(default_factory=PipelineConfigModel)
+    uploads: UploadsConfigModel = Field(default_factory=UploadsConfigModel)
+    jobs: JobsConfigModel = Field(default_factory=JobsConfigModel)
+    batch: BatchConfigModel = Field(default_factory=BatchConfigModel)
+    cache: CacheConfigModel = Field(default_factory=CacheConfigModel)
+    sentiment: SentimentConfigModel = Field(default_factory=SentimentConfigModel)
+    speaking_speed: SpeakingSpeedConfigModel = Field(
+        default_factory=SpeakingSpeedConfigModel,
+    )
+    profiling: ProfilingConfigModel = Field(default_factory=ProfilingConfigModel)
 
 
 def load_yaml_config(yaml_path: str = "config/config.yaml") -> YAMLConfigModel:
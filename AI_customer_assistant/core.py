@@ -1,28 +1,58 @@
 """Core module for processing customer service audio files."""
 
+from __future__ import annotations
+
 import json
 import warnings
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+import numpy as np
 from loguru import logger
-from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
-
-from services.audio_preprocessing import get_audio_duration
-from services.basic_categorization import categorize_call
-from services.compliance import check_compliance, extract_timestamps
-from services.pii_check import check_pii, mask_pii
-from services.profanity_check import check_profanity, mask_profanity
-from services.sentimental_analysis import analyze_sentiment
-from services.speaking_speed import calculate_wpm
+
+import metrics
+from config_loader import (
+    PipelineConfigModel,
+    SentimentConfigModel,
+    SpeakingSpeedConfigModel,
+    TOMLConfigModel,
+)
+from result_cache import ResultCache, config_fingerprint
+from services.alignment import SpeakerAlignment, align_speakers
+from services.audio_context import AudioContext, AudioDecodeError
+from services.basic_categorization import (
+    CategorizationReport,
+    analyze_call_categories,
+)
+from services.compliance import ComplianceReport, analyze_compliance
+from services.model_registry import model_registry
+from services.pii_check import PIIReport, apply_masks, scan_pii
+from services.profanity_check import ProfanityReport, scan_profanity
+from services.sentimental_analysis import analyze_sentiment, sentiment_timeline
+from services.speaking_speed import (
+    speaking_rate,
+    speaking_rate_by_speaker,
+    word_counts,
+)
 from services.speech_diarization import analyze_speaker_diarization
-from services.transcription import transcribe_audio
-from services.utils import clean_text
+from services.transcript import Transcript, build_transcript
+from services.transcription import configure_transcription, transcribe_with_segments
+from stage_graph import (
+    COMPLETED,
+    FAILED,
+    RUNNING,
+    THREAD,
+    Stage,
+    StageGraph,
+    StageGraphResult,
+)
+
+if TYPE_CHECKING:
+    import threading
+    from collections.abc import Callable
+    from types import CodeType
 
 # Suppress warnings
-warnings.filterwarnings(
-    "ignore", category=UserWarning, message=".*FP16 is not supported on CPU.*",
-)
 warnings.filterwarnings(
     "ignore", category=UserWarning,
     message="The MPEG_LAYER_III subtype is unknown to TorchAudio",
@@ -42,143 +72,439 @@ logger.add(
     level=config["logging"]["min_log_level"],
 )
 
-def validate_audio_file(file_path: str, supported_formats: list) -> bool:
-    """Validate the audio file format and content."""
+# Stage executors and timeouts, overridden by main via configure
+pipeline_config = PipelineConfigModel()
+sentiment_config = SentimentConfigModel()
+speaking_speed_config = SpeakingSpeedConfigModel()
+
+# Result cache and the configuration it is keyed on, set up by configure
+result_cache: ResultCache | None = None
+_cache_config: tuple = ()
+
+BYTES_PER_MB = 1024 * 1024
+
+def validate_audio_file(
+        file_path: str, supported_formats: list) -> AudioContext | None:
+    """Validate the audio file format and decode its content once.
+
+    Returns the decoded audio so later stages can reuse it, or None if the
+    file is invalid.
+    """
     file_extension = Path(file_path).suffix.lower()
     if file_extension not in supported_formats:
         logger.error(f"Unsupported file extension: {file_extension}")
-        return False
+        return None
     try:
-        audio = AudioSegment.from_file(file_path)
+        audio = AudioContext.from_file(file_path)
         logger.info(f"Audio file loaded successfully: {file_path}")
-        logger.info(f"Audio duration: {len(audio)} ms")
-    except (CouldntDecodeError, ValueError, OSError) as e:
+        logger.info(f"Audio duration: {audio.duration_seconds:.2f} s")
+    except (AudioDecodeError, OSError) as e:
         logger.error(f"Error processing audio: {e}")
-        return False
-    return True
+        return None
+    return audio
 
-def _transcribe_and_clean(audio_file: str) -> str:
-    """Transcribe and clean the audio file."""
+def _transcribe_and_clean(audio: AudioContext) -> Transcript | None:
+    """Transcribe and clean the decoded audio, keeping word timings."""
     logger.info("Step 1: Transcribing Audio...")
-    transcription = transcribe_audio(audio_file)
+    result = transcribe_with_segments(audio.samples)
 
-    if not transcription:
-        logger.warning(f"Transcription failed for file: {audio_file}.")
-        return ""
+    if not result or not result["text"]:
+        logger.warning(f"Transcription failed for file: {audio.path}.")
+        return None
 
     logger.info("Cleaning Transcript...")
-    return clean_text(transcription)
+    transcript, usage = metrics.measure(build_transcript, result)
+    metrics.record_stage("cleaning", COMPLETED, usage)
+    return transcript
+
+def _transcription_stage(audio: AudioContext) -> Transcript:
+    """Produce the cleaned, timed transcript, failing the run if it is empty."""
+    logger.info("Starting transcription and cleaning process...")
+    transcript = _transcribe_and_clean(audio)
+    if transcript is None or not transcript.text:
+        error_msg = "Transcription failed"
+        raise ValueError(error_msg)
+    logger.info("Transcription completed.")
+    return transcript
 
-def sentimental_ana(cleaned_transcript: str) -> dict:
+def _compliance_stage(transcript: Transcript,
+        required_phrases: dict) -> ComplianceReport:
+    """Check which required phrase categories are present, in one pass."""
+    logger.info("Performing compliance check...")
+    report = analyze_compliance(transcript.text, required_phrases)
+    if report.compliance:
+        logger.warning(f"Compliance issues found: {report.compliance}")
+    return report
+
+def _timestamps_stage(transcript: Transcript, compliance: ComplianceReport) -> dict:
+    """Locate compliant phrases in the audio (ONLY for compliant categories)."""
+    logger.info("Extracting timestamps for found compliant phrases...")
+    found_phrases = compliance.timed_hits(transcript)
+    if found_phrases:
+        logger.info(f"Timestamps extracted: {found_phrases}")
+    else:
+        logger.info("No timestamps found for compliant phrases.")
+    return found_phrases
+
+def _profanity_stage(transcript: Transcript,
+        prohibited_phrases: set) -> ProfanityReport:
+    """Detect and mask prohibited words and phrases in one pass."""
+    logger.info("Checking for prohibited phrases...")
+    report = scan_profanity(transcript.text, prohibited_phrases)
+    if report.contains_prohibited:
+        logger.warning(f"Prohibited phrases detected: {report.counts}")
+        logger.info("Prohibited phrases masked.")
+    else:
+        logger.info("No prohibited phrases detected.")
+    return report
+
+def _timed_prohibited_hits(profanity: ProfanityReport,
+        transcript: Transcript) -> list[dict]:
+    """Return prohibited phrase hits with character offsets and audio time."""
+    hits = []
+    for match in profanity.matches:
+        start, end = transcript.time_index.span(match.char_start, match.char_end)
+        hits.append({
+            "phrase": match.phrase,
+            "start_char": match.char_start,
+            "end_char": match.char_end,
+            "start": start,
+            "end": end,
+        })
+    return hits
+
+def _pii_stage(transcript: Transcript) -> PIIReport:
+    """Detect PII spans in the cleaned transcript in a single scan."""
+    logger.info("Checking for PII...")
+    report = scan_pii(transcript.text)
+    if report.spans:
+        logger.warning(f"Detected PII: {report.counts}")
+    return report
+
+def _masking_stage(profanity: ProfanityReport, pii: PIIReport) -> str:
+    """Mask PII in the profanity-masked transcript.
+
+    Profanity masking keeps the text length, so the PII spans found in the
+    cleaned transcript are applied directly without scanning again.
+    """
+    masked_transcript = apply_masks(profanity.masked, pii.spans)
+    logger.info("PII masked if found.")
+    return masked_transcript
+
+def _timed_pii_spans(pii: PIIReport, transcript: Transcript) -> list[dict]:
+    """Return PII spans with character offsets and audio time, not values."""
+    spans = []
+    for span in pii.spans:
+        start, end = transcript.time_index.span(span.start, span.end)
+        spans.append({
+            "entity": span.entity,
+            "start_char": span.start,
+            "end_char": span.end,
+            "start": start,
+            "end": end,
+        })
+    return spans
+
+def sentimental_ana(transcript: Transcript) -> dict:
     """Perform sentiment analysis on the cleaned transcript."""
     logger.info("Performing sentiment analysis...")
-    return analyze_sentiment(cleaned_transcript)
+    sentiment_result = analyze_sentiment(transcript.text)
+    logger.info(f"Sentiment Analysis Result: {sentiment_result}")
+    return sentiment_result
+
+def _sentiment_timeline_stage(
+    transcript: Transcript, alignment: SpeakerAlignment | None,
+) -> dict:
+    """Score speaker turns (segments without diarization) in rolling windows."""
+    logger.info("Building sentiment timeline...")
+    segments = (
+        alignment.transcript(transcript.text)
+        if alignment is not None and alignment.utterances
+        else transcript.timed_segments()
+    )
+    timeline = sentiment_timeline(
+        segments,
+        sentiment_config.window_seconds,
+        sentiment_config.step_seconds,
+    )
+    logger.info(f"Most negative sentiment window: {timeline['worst_window']}")
+    return timeline
+
+def _duration_stage(audio: AudioContext) -> float:
+    """Return the audio duration in seconds from the sample count."""
+    return round(audio.duration_seconds, 2)
+
+def _word_timings(transcript: Transcript) -> tuple[np.ndarray, ...]:
+    """Return the char starts, start and end times and word counts per piece."""
+    char_starts, char_ends, starts, ends = (
+        np.frombuffer(column, dtype=column.typecode)
+        for column in transcript.time_index.columns()
+    )
+    counts = word_counts(transcript.text, char_starts, char_ends)
+    return char_starts, starts, ends, counts
 
-def call_category(cleaned_transcript: str) -> list:
-    """Categorize the call based on the cleaned transcript."""
+def _speaking_speed_stage(transcript: Transcript, audio_duration: float) -> dict:
+    """Calculate the speaking speed over speech time, with a windowed timeline."""
+    logger.info("Calculating speaking speed...")
+    _, starts, ends, counts = _word_timings(transcript)
+    rate = speaking_rate(starts, ends, counts, **speaking_speed_config.model_dump())
+    rate["silence_seconds"] = round(max(audio_duration - rate["speech_seconds"], 0), 2)
+    logger.info(f"Speaking Speed: {rate['wpm']} WPM ({rate['evaluation']}), "
+                f"percentiles {rate['percentiles']}")
+    return rate
+
+def _speaker_speed_stage(transcript: Transcript, alignment: SpeakerAlignment) -> dict:
+    """Calculate the speaking speed of each speaker from their own words."""
+    logger.info("Calculating speaking speed per speaker...")
+    char_starts, starts, ends, counts = _word_timings(transcript)
+    return speaking_rate_by_speaker(
+        starts, ends, counts, alignment.speakers_of(char_starts.tolist()),
+        **speaking_speed_config.model_dump(),
+    )
+
+def call_category(transcript: Transcript,
+        categories: dict | None) -> CategorizationReport:
+    """Categorize the call and score each category by its keyword hits."""
     logger.info("Categorizing the call...")
-    return categorize_call(cleaned_transcript)
+    report = analyze_call_categories(transcript.text, categories)
+    logger.info(f"Call categorized as: {report.categories} ({report.scores})")
+    return report
+
+def _diarization_stage(audio: AudioContext) -> dict:
+    """Perform speaker diarization on the in-memory waveform."""
+    logger.info("Performing speaker diarization...")
+    diarization_results = analyze_speaker_diarization(audio.waveform())
+    logger.info(f"Diarization results: {_diarization_summary(diarization_results)}")
+    return diarization_results
+
+def _diarization_summary(diarization: dict | None) -> dict | None:
+    """Return the diarization result without its per-turn list."""
+    if diarization is None:
+        return None
+    return {key: value for key, value in diarization.items() if key != "turns"}
+
+def _alignment_stage(transcript: Transcript, diarization: dict) -> SpeakerAlignment:
+    """Attribute the transcript to speakers using the diarization turns."""
+    logger.info("Aligning transcript with speaker turns...")
+    alignment = align_speakers(transcript, diarization)
+    logger.info(f"Speaker-attributed transcript has {len(alignment.utterances)} "
+                "utterances.")
+    return alignment
+
+def configure_pipeline(config: PipelineConfigModel) -> None:
+    """Set the executor and timeout configuration used by process_audio_file."""
+    global pipeline_config  # noqa: PLW0603
+    pipeline_config = config
+
+
+def configure(system_config: TOMLConfigModel) -> None:
+    """Apply the TOML configuration to the models, pipeline stages and cache."""
+    global result_cache, _cache_config  # noqa: PLW0603
+    global sentiment_config, speaking_speed_config  # noqa: PLW0603
+    model_registry.configure(system_config.models)
+    configure_transcription(system_config.transcription)
+    configure_pipeline(system_config.pipeline)
+    sentiment_config = system_config.sentiment
+    speaking_speed_config = system_config.speaking_speed
+
+    if system_config.cache.enabled:
+        result_cache = ResultCache(
+            system_config.cache.directory,
+            system_config.cache.max_size_mb * BYTES_PER_MB,
+        )
+        _cache_config = (
+            system_config.models.model_dump(),
+            system_config.transcription.model_dump(),
+            system_config.sentiment.model_dump(),
+            system_config.speaking_speed.model_dump(),
+            system_config.pipeline.model_dump(),
+        )
+    else:
+        result_cache = None
+
+
+def _stage(name: str, func: Callable[..., Any], *inputs: str,
+        critical: bool = False, optional: tuple[str, ...] = ()) -> Stage:
+    """Build a stage with the configured timeout and executor."""
+    return Stage(
+        name=name,
+        func=func,
+        inputs=inputs,
+        optional=optional,
+        timeout=pipeline_config.stage_timeouts.get(
+            name, pipeline_config.default_stage_timeout),
+        executor=pipeline_config.stage_executors.get(name, THREAD),
+        critical=critical,
+    )
+
+def build_stage_graph() -> StageGraph:
+    """Build the pipeline graph; each stage only waits for its own inputs."""
+    optional_stages = []
+    if sentiment_config.timeline:
+        optional_stages.append(_stage(
+            "sentiment_timeline", _sentiment_timeline_stage,
+            "transcription", "alignment", optional=("alignment",),
+        ))
+    return StageGraph(
+        [
+            _stage("transcription", _transcription_stage, "audio", critical=True),
+            _stage("diarization", _diarization_stage, "audio"),
+            _stage("alignment", _alignment_stage, "transcription", "diarization"),
+            _stage("duration", _duration_stage, "audio"),
+            _stage("compliance", _compliance_stage,
+                   "transcription", "required_phrases"),
+            _stage("timestamps", _timestamps_stage, "transcription", "compliance"),
+            _stage("profanity", _profanity_stage,
+                   "transcription", "prohibited_phrases"),
+            _stage("pii", _pii_stage, "transcription"),
+            _stage("masking", _masking_stage, "profanity", "pii"),
+            _stage("sentiment", sentimental_ana, "transcription"),
+            _stage("speaking_speed", _speaking_speed_stage,
+                   "transcription", "duration"),
+            _stage("speaker_speed", _speaker_speed_stage,
+                   "transcription", "alignment"),
+            _stage("categorization", call_category, "transcription", "categories"),
+            *optional_stages,
+        ],
+        max_workers=pipeline_config.max_workers,
+        process_workers=pipeline_config.process_workers,
+    )
 
-def process_audio_file(audio_file: str,
-        required_phrases: dict, prohibited_phrases: set) -> dict:
-    """Process the audio file and extract all possible information."""
+def profile_stage_names() -> dict[CodeType, str]:
+    """Return the stage name of each stage function's code, for profiling."""
+    names = {
+        stage.func.__code__: name
+        for name, stage in build_stage_graph().stages.items()
+        if hasattr(stage.func, "__code__")
+    }
+    names[validate_audio_file.__code__] = "decode"
+    return names
+
+def _compile_result(run: StageGraphResult) -> dict:
+    """Build the response from the stage outputs of a successful run."""
+    values = run.values
+    transcript = values["transcription"]
+    profanity = values.get("profanity")
+    compliance = values.get("compliance")
+    categorization = values.get("categorization")
+    pii = values.get("pii")
+    alignment = values.get("alignment")
+
+    # Compile results
+    result = {
+        "transcription": transcript.text,
+        "segments": transcript.timed_segments(),
+        "masked_transcription": values.get("masking"),
+        "compliance_issues": compliance.compliance if compliance else None,
+        "contains_prohibited": (
+            profanity.contains_prohibited if profanity else None),
+        "prohibited_counts": profanity.counts if profanity else None,
+        "prohibited_hits": (
+            _timed_prohibited_hits(profanity, transcript) if profanity else None),
+        "detected_pii": pii.entities if pii else None,
+        "pii_counts": pii.counts if pii else None,
+        "pii_spans": _timed_pii_spans(pii, transcript) if pii else None,
+        "timestamps": values.get("timestamps"),
+        "sentiment": values.get("sentiment"),
+        "sentiment_timeline": values.get("sentiment_timeline"),
+        "speaking_speed": values.get("speaking_speed"),
+        "speaker_speaking_speed": values.get("speaker_speed"),
+        "call_category": categorization.categories if categorization else None,
+        "category_scores": categorization.to_dict() if categorization else None,
+        "diarization": _diarization_summary(values.get("diarization")),
+        "speaker_transcript": (
+            alignment.transcript(transcript.text) if alignment else None),
+        "audio_duration_ms": values.get("duration"),
+    }
+    if alignment:
+        for hits in (result["timestamps"] or {}).values():
+            alignment.attribute(hits)
+        alignment.attribute(result["prohibited_hits"])
+        alignment.attribute(result["pii_spans"])
+    if run.errors:
+        result["stage_errors"] = {
+            name: str(error) for name, error in run.errors.items()
+        }
+    return result
+
+def process_audio_file(audio_file: str,  # noqa: PLR0913
+        required_phrases: dict, prohibited_phrases: set, *,
+        audio: AudioContext | None = None,
+        on_stage: Callable[[str, str], None] | None = None,
+        categories: dict | None = None,
+        cancel: threading.Event | None = None) -> dict:
+    """Process the audio file and extract all possible information.
+
+    ``audio`` is the already decoded file; when omitted the file is decoded
+    here. Every stage shares the same buffer, and stages run concurrently
+    as soon as their inputs are available. ``on_stage`` receives stage
+    progress events (see ``StageGraph.run``). ``categories`` maps call
+    categories to keywords; the built-in categories are used when omitted.
+    Setting ``cancel`` stops the run before any further stage starts.
+    """
     try:
         logger.info(f"Processing started for file: {audio_file}")
+        if audio is None:
+            audio = AudioContext.from_file(audio_file)
+
+        run = build_stage_graph().run({
+            "audio": audio,
+            "required_phrases": required_phrases,
+            "prohibited_phrases": prohibited_phrases,
+            "categories": categories,
+        }, on_event=on_stage, cancel=cancel)
+        logger.info(f"Stage timings (s): {run.timings}")
+        for name, outcome in run.outcomes.items():
+            metrics.record_stage(name, outcome, run.usage.get(name))
 
-        # Transcription & Cleaning
-        logger.info("Starting transcription and cleaning process...")
-        cleaned_transcript = _transcribe_and_clean(audio_file)
-        if not cleaned_transcript:
-            logger.error("Transcription failed.")
+        if run.cancelled:
+            logger.warning(f"Processing cancelled for file: {audio_file}")
+            return {"error": "Processing cancelled"}
+
+        if "transcription" in run.errors:
+            logger.error(f"Transcription failed: {run.errors['transcription']}")
             return {"error": "Transcription failed"}
-        logger.info("Transcription completed.")
-
-        logger.info("Performing compliance check...")
-        compliance_issues = check_compliance(cleaned_transcript, required_phrases)
-        compliant_categories = {k: v for k, v in compliance_issues.items() if v}
-        if compliance_issues:
-            logger.warning(f"Compliance issues found: {compliance_issues}")
-
-        logger.info("Checking for prohibited phrases...")
-        contains_prohibited = check_profanity(cleaned_transcript, prohibited_phrases)
-        if contains_prohibited:
-            logger.warning("Prohibited phrases detected.")
-            masked_transcript = mask_profanity(cleaned_transcript, prohibited_phrases)
-            logger.info("Prohibited phrases masked.")
-        else:
-            masked_transcript = cleaned_transcript
-            logger.info("No prohibited phrases detected.")
-
-        # PII Check
-        logger.info("Checking for PII...")
-        detected_pii = check_pii(cleaned_transcript)
-        if detected_pii:
-            logger.warning(f"Detected PII: {detected_pii}")
-        masked_transcript = mask_pii(masked_transcript)
-        logger.info("PII masked if found.")
-
-        # Extract timestamps (ONLY for compliant categories)
-        logger.info("Extracting timestamps for found compliant phrases...")
-        found_phrases = extract_timestamps(cleaned_transcript,
-                            required_phrases, compliant_categories)
-        if found_phrases:
-            logger.info(f"Timestamps extracted: {found_phrases}")
-        else:
-            logger.info("No timestamps found for compliant phrases.")
-
-        # Sentiment Analysis
-        sentiment_result = sentimental_ana(cleaned_transcript)
-        logger.info(f"Sentiment Analysis Result: {sentiment_result}")
-
-        # Speaking Speed Analysis
-        logger.info("Calculating speaking speed...")
-        audio_duration = get_audio_duration(audio_file)
-        wpm, evaluation = calculate_wpm(cleaned_transcript, audio_duration)
-        logger.info(f"Speaking Speed: {wpm} WPM ({evaluation})")
-
-        # Categorization
-        call_category11 = call_category(cleaned_transcript)
-        logger.info(f"Call categorized as: {call_category11}")
-
-        # Speaker Diarization
-        logger.info("Performing speaker diarization...")
-        diarization_results = analyze_speaker_diarization(audio_file)
-        logger.info(f"Diarization results: {diarization_results}")
-
-        # Compile results
-        result = {
-            "transcription": cleaned_transcript,
-            "masked_transcription": masked_transcript,
-            "compliance_issues": compliance_issues,
-            "contains_prohibited": contains_prohibited,
-            "detected_pii": detected_pii,
-            "timestamps": found_phrases,
-            "sentiment": sentiment_result,
-            "speaking_speed": {"wpm": wpm, "evaluation": evaluation},
-            "call_category": call_category11,
-            "diarization": diarization_results,
-            "audio_duration_ms": audio_duration,
-        }
+        for error in run.errors.values():
+            logger.error(str(error))
+
+        result = _compile_result(run)
+        metrics.record_audio(run.values.get("duration") or 0.0)
         logger.info("Processing completed successfully.")
 
     except FileNotFoundError:
         logger.error(f"File not found: {audio_file}")
         return {"error": "File not found"}
+    except AudioDecodeError as e:
+        logger.error(f"Error decoding audio: {e}")
+        return {"error": "Audio decoding failed"}
     else:
         return result
 
-def validate_and_process(audio_file: str,
-        required_phrases: dict, prohibited_phrases: set) -> dict:
+def validate_and_process(audio_file: str,  # noqa: PLR0913
+        required_phrases: dict, prohibited_phrases: set, *,
+        on_stage: Callable[[str, str], None] | None = None,
+        categories: dict | None = None,
+        cancel: threading.Event | None = None) -> dict:
     """Validate the audio file and process it."""
     logger.info(f"[START] Processing audio file: {audio_file}")
 
     supported_formats = [".wav", ".mp3"]
-    if not validate_audio_file(audio_file, supported_formats):
+    if on_stage is not None:
+        on_stage("decode", RUNNING)
+    audio, usage = metrics.measure(validate_audio_file, audio_file, supported_formats)
+    metrics.record_stage("decode", FAILED if audio is None else COMPLETED, usage)
+    if audio is None:
         logger.error("[ERROR] Invalid audio format. Aborting processing.")
+        if on_stage is not None:
+            on_stage("decode", FAILED)
         return {"error": "Invalid audio format"}
+    if on_stage is not None:
+        on_stage("decode", COMPLETED)
 
     logger.info("[STEP 1] Valid Audio File Confirmed. Proceeding with transcription...")
-    result = process_audio_file(audio_file, required_phrases, prohibited_phrases)
+    result = process_audio_file(audio_file, required_phrases, prohibited_phrases,
+                                audio=audio, on_stage=on_stage,
+                                categories=categories, cancel=cancel)
 
     if "error" in result:
         logger.error(f"[FAILURE] Processing failed: {result['error']}")
@@ -187,3 +513,27 @@ def validate_and_process(audio_file: str,
 
     return result
 
+
+def cached_validate_and_process(audio_file: str,  # noqa: PLR0913
+        required_phrases: dict, prohibited_phrases: set, *,
+        on_stage: Callable[[str, str], None] | None = None,
+        categories: dict | None = None,
+        cancel: threading.Event | None = None) -> dict:
+    """Return a cached result for identical audio and configuration.
+
+    Falls through to validate_and_process on a miss (or when the cache is
+    disabled); a hit does not decode the audio or touch any model.
+    """
+    if result_cache is None:
+        return validate_and_process(audio_file, required_phrases,
+                                    prohibited_phrases, on_stage=on_stage,
+                                    categories=categories, cancel=cancel)
+
+    fingerprint = config_fingerprint(required_phrases, prohibited_phrases,
+                                     categories, *_cache_config)
+    return result_cache.get_or_compute(
+        audio_file, fingerprint,
+        lambda: validate_and_process(audio_file, required_phrases,
+                                     prohibited_phrases, on_stage=on_stage,
+                                     categories=categories, cancel=cancel),
+    )
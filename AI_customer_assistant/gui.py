@@ -1,12 +1,16 @@
 """GUI module for interacting with the FastAPI backend."""
 
+import time
 from pathlib import Path
 
 import gradio as gr
 import httpx
 
-API_URL = "http://127.0.0.1:8000/process-audio/"
-status_code = 200
+API_URL = "http://127.0.0.1:8000/jobs"
+status_code = 202
+POLL_INTERVAL_SECONDS = 2.0
+MAX_WAIT_SECONDS = 1800.0
+FINISHED_STATUSES = {"completed", "failed"}
 
 def gradio_interface(audio_file: str) -> dict:
     """Call FastAPI backend to process the uploaded audio file.
@@ -25,13 +29,12 @@ def gradio_interface(audio_file: str) -> dict:
         with audio_path.open("rb") as file_data:
             files = {"audio_file": (audio_path.name, file_data, "audio/wav")}
 
-            # Increase timeout to prevent request failures
-            with httpx.Client(timeout=300.0) as client:  # 300 seconds (5 minutes)
+            # Submit a job, then poll with short requests until it finishes
+            with httpx.Client(timeout=30.0) as client:
                 response = client.post(API_URL, files=files)
-
-            if response.status_code == status_code:
-                return response.json()
-            return {"error": f"Backend error: {response.text}"}
+                if response.status_code != status_code:
+                    return {"error": f"Backend error: {response.text}"}
+                return _wait_for_job(client, response.json()["job_id"])
 
     except httpx.TimeoutException:
         return {"error": "Request timed out. Try again with a smaller file."}
@@ -45,6 +48,16 @@ def gradio_interface(audio_file: str) -> dict:
     except ValueError as error:
         return {"error": f"Invalid input: {error!s}"}
 
+def _wait_for_job(client: httpx.Client, job_id: str) -> dict:
+    """Poll the job endpoint until the job finishes or MAX_WAIT_SECONDS pass."""
+    deadline = time.monotonic() + MAX_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        job = client.get(f"{API_URL}/{job_id}").json()
+        if job.get("status") in FINISHED_STATUSES:
+            return job.get("result") or {"error": job.get("error")}
+        time.sleep(POLL_INTERVAL_SECONDS)
+    return {"error": "Request timed out. Try again with a smaller file."}
+
 # Create Gradio interface
 interface = gr.Interface(
     fn=gradio_interface,
@@ -0,0 +1,351 @@
+"""Asynchronous processing jobs backed by a bounded pool of worker processes.
+
+``POST /jobs`` hands an uploaded file to the ``JobManager`` and returns
+immediately; clients poll ``GET /jobs/{id}`` for status, per-stage progress
+and the final result. Each worker process loads the models once when it
+starts, and the manager refuses new jobs once the queue is full. With
+``[jobs] executor = "thread"``, jobs run on threads of the API process
+instead, sharing its models and its batched Whisper decoding.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+import metrics
+from resources import child_threads, set_thread_count
+from stage_graph import PROCESS, THREAD
+
+if TYPE_CHECKING:
+    from config_loader import JobsConfigModel, TOMLConfigModel
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+JOB_STAGE = "job"  # Progress events about the job itself rather than a stage
+METRICS_EVENT = "metrics"  # Observations forwarded to the parent's metrics
+
+# Set in each worker process by init_worker, or by the manager for job threads
+_progress_queue: Any = None
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue cannot accept more work."""
+
+
+@dataclass
+class Job:
+    """State of a single processing job."""
+
+    job_id: str
+    file_path: Path
+    filename: str
+    status: str = QUEUED
+    stages: dict[str, str] = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        """Return True once the job has completed or failed."""
+        return self.status in (COMPLETED, FAILED)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serialisable view of the job."""
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stages": dict(self.stages),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def init_worker(
+    progress_queue: Any,  # noqa: ANN401
+    system_config: TOMLConfigModel,
+    threads: int | None = None,
+) -> None:
+    """Configure a worker process and load its models once.
+
+    ``threads`` caps the torch and BLAS threads of the worker, so sibling
+    workers share the parent's CPU budget instead of each using every core.
+    Metrics observations are forwarded to the parent over the progress queue.
+    """
+    global _progress_queue  # noqa: PLW0603
+    _progress_queue = progress_queue
+    if progress_queue is not None:
+        metrics.forward_to(
+            lambda observation: progress_queue.put(
+                (METRICS_EVENT, None, observation),
+            ),
+        )
+
+    if threads is not None:
+        set_thread_count(threads)
+
+    from core import configure  # noqa: PLC0415
+    from services.model_registry import model_registry  # noqa: PLC0415
+
+    configure(system_config)
+    model_registry.warm_up()
+
+
+def _run_job(
+    job_id: str, file_path: str, required_phrases: dict, prohibited_phrases: set,
+    categories: dict | None,
+) -> dict:
+    """Process one job on a worker, reporting stage progress."""
+    from core import cached_validate_and_process  # noqa: PLC0415
+
+    def report(stage: str, status: str) -> None:
+        _progress_queue.put((job_id, stage, status))
+
+    report(JOB_STAGE, RUNNING)
+    return cached_validate_and_process(
+        file_path, required_phrases, prohibited_phrases, on_stage=report,
+        categories=categories,
+    )
+
+
+class JobManager:
+    """Admit jobs into a bounded queue and track them until they finish."""
+
+    def __init__(
+        self,
+        config: JobsConfigModel,
+        required_phrases: dict,
+        prohibited_phrases: set,
+        categories: dict | None = None,
+    ) -> None:
+        """Initialize the manager; call ``start`` before submitting jobs."""
+        self.config = config
+        self.required_phrases = required_phrases
+        self.prohibited_phrases = prohibited_phrases
+        self.categories = categories
+        self.upload_dir = Path(config.upload_dir)
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Executor | None = None
+        self._system_config: TOMLConfigModel | None = None
+        self._progress_queue: Any = None
+        self._listener: threading.Thread | None = None
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of unfinished jobs (running plus queued)."""
+        return self.config.max_workers + self.config.max_queue_size
+
+    def start(self, system_config: TOMLConfigModel) -> None:
+        """Start the workers and the progress listener.
+
+        Raises:
+            ValueError: If ``executor`` is neither "process" nor "thread".
+
+        """
+        global _progress_queue  # noqa: PLW0603
+        if self.config.executor == THREAD:
+            # Job threads use the models already configured in this process
+            self._progress_queue = _progress_queue = queue.Queue()
+        elif self.config.executor == PROCESS:
+            self._progress_queue = multiprocessing.get_context("spawn").Queue()
+        else:
+            error_msg = f"Unknown jobs executor: {self.config.executor}"
+            raise ValueError(error_msg)
+        self._system_config = system_config
+        self._executor = self._create_executor()
+        self._listener = threading.Thread(
+            target=self._listen, name="job-progress", daemon=True,
+        )
+        self._listener.start()
+        logger.info(
+            f"Job manager started with {self.config.max_workers} "
+            f"{self.config.executor} workers "
+            f"and a queue of {self.config.max_queue_size}.",
+        )
+
+    def _create_executor(self) -> Executor:
+        """Return a new pool of job workers."""
+        if self.config.executor == THREAD:
+            return ThreadPoolExecutor(
+                max_workers=self.config.max_workers, thread_name_prefix="job",
+            )
+        return ProcessPoolExecutor(
+            max_workers=self.config.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(
+                self._progress_queue, self._system_config,
+                child_threads(self.config.max_workers),
+            ),
+        )
+
+    def _replace_broken_executor(self, broken: Executor, keep: Job) -> None:
+        """Fail the jobs of a crashed pool (except ``keep``) and start a new one."""
+        with self._lock:
+            if self._executor is not broken:
+                return  # Another submission already replaced it
+            self._executor = self._create_executor()
+            lost = [
+                job for job in self._jobs.values()
+                if not job.finished and job is not keep
+            ]
+            for job in lost:
+                job.status, job.error = FAILED, "Job worker crashed"
+                job.finished_at = time.time()
+        broken.shutdown(wait=False, cancel_futures=True)
+        for job in lost:
+            job.file_path.unlink(missing_ok=True)
+        logger.error(
+            f"Job worker pool crashed; failed {len(lost)} jobs and restarted it.",
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, cancelling jobs that have not started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+
+    def submit(self, file_path: Path, filename: str) -> Job:
+        """Queue ``file_path`` for processing.
+
+        A crashed worker pool is replaced and the submission retried once.
+
+        Raises:
+            QueueFullError: If the number of unfinished jobs reached capacity.
+            RuntimeError: If the manager has not been started or no worker
+                pool accepts the job.
+
+        """
+        if self._executor is None:
+            error_msg = "Job manager is not running."
+            raise RuntimeError(error_msg)
+
+        with self._lock:
+            self._purge_expired()
+            unfinished = self._unfinished()
+            if unfinished >= self.capacity:
+                error_msg = f"Job queue is full ({unfinished} unfinished jobs)."
+                raise QueueFullError(error_msg)
+
+            job = Job(job_id=uuid.uuid4().hex, file_path=file_path, filename=filename)
+            self._jobs[job.job_id] = job
+
+        executor = self._executor
+        try:
+            future = self._submit_to(executor, job)
+        except BrokenExecutor:
+            self._replace_broken_executor(executor, keep=job)
+            try:
+                future = self._submit_to(self._executor, job)
+            except BrokenExecutor as e:
+                with self._lock:
+                    del self._jobs[job.job_id]
+                error_msg = f"Job workers are unavailable: {e}"
+                raise RuntimeError(error_msg) from e
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job
+
+    def _submit_to(self, executor: Executor, job: Job) -> Future:
+        """Hand ``job`` to ``executor``."""
+        return executor.submit(
+            _run_job, job.job_id, str(job.file_path),
+            self.required_phrases, self.prohibited_phrases, self.categories,
+        )
+
+    def is_full(self) -> bool:
+        """Return True if a new job would be rejected for lack of capacity."""
+        with self._lock:
+            self._purge_expired()
+            return self._unfinished() >= self.capacity
+
+    def get(self, job_id: str) -> Job | None:
+        """Return the job with the given id, if it is still known."""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        """Return the number of jobs waiting for a worker."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def _finish(self, job: Job, future: Future) -> None:
+        """Record the outcome of a job and remove its upload."""
+        with self._lock:
+            if job.finished:
+                return  # Already failed along with its crashed pool
+            if future.cancelled():
+                job.status, job.error = FAILED, "Job cancelled"
+            elif future.exception() is not None:
+                job.status, job.error = FAILED, str(future.exception())
+            else:
+                job.result = future.result()
+                if "error" in job.result:
+                    job.status, job.error = FAILED, job.result["error"]
+                else:
+                    job.status = COMPLETED
+            job.finished_at = time.time()
+        job.file_path.unlink(missing_ok=True)
+        logger.info(f"Job {job.job_id} finished with status '{job.status}'.")
+
+    def _listen(self) -> None:
+        """Apply progress events sent by the worker processes."""
+        while True:
+            event = self._progress_queue.get()
+            if event is None:
+                return
+            job_id, stage, status = event
+            if job_id == METRICS_EVENT:
+                metrics.replay(status)
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.finished:
+                    continue
+                if stage == JOB_STAGE:
+                    job.status = status
+                    job.started_at = time.time()
+                else:
+                    job.stages[stage] = status
+
+    def _unfinished(self) -> int:
+        """Return the number of running and queued jobs; hold ``_lock``."""
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _purge_expired(self) -> None:
+        """Forget finished jobs older than the configured TTL."""
+        cutoff = time.time() - self.config.result_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -1,60 +1,295 @@
 """Unified logging client that sends logs.
 
-To a centralized logging server using ZeroMQ.
+To a centralized logging server using ZeroMQ. Logging calls only put a record
+on a bounded in-process queue; a background thread formats the queued
+records, packs them into batch frames (see ``logging_protocol``) and sends
+them without blocking. When the queue is full the record is dropped, or with
+the ``block`` policy the caller waits up to ``block_timeout`` seconds first;
+when the server is slow or down, the socket's high-water mark is reached and
+whole batches are dropped. Either way request handling never waits on the
+logging server, and ``stats`` reports what was sent and dropped.
+
+Messages use loguru-style ``{}`` placeholders, formatted on the background
+thread only if the record is sent: ``log_info("Received {}", filename)``.
 """
 
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
 import zmq
 from loguru import logger
 
+from logging_protocol import encode_batch, level_code
+
+if TYPE_CHECKING:
+    from config_loader import LoggingConfigModel
+
 LOG_SERVER_ADDRESS: str = "localhost"
 LOG_SERVER_PORT: int = 5555
+DROP = "drop"
+BLOCK = "block"
+LINGER_MS = 1000  # How long closing the socket may wait to deliver queued frames
 
 
 class UnifiedLogger:
     """Client for sending log messages to a unified logging server."""
 
-    def __init__(self,
+    def __init__(self,  # noqa: PLR0913
             address: str = LOG_SERVER_ADDRESS,
             port: int = LOG_SERVER_PORT,
+            *,
+            min_level: str = "DEBUG",
+            queue_size: int = 10000,
+            batch_size: int = 256,
+            flush_interval: float = 0.05,
+            overflow: str = DROP,
+            block_timeout: float = 0.1,
+            send_high_water_mark: int = 100,
         ) -> None:
-        """Initialize the logging client."""
-        self.context: zmq.Context = zmq.Context()
-        self.socket: zmq.Socket = self.context.socket(zmq.PUSH)
-        self.socket.connect(f"tcp://{address}:{port}")
+        """Initialize the logging client.
+
+        Args:
+            address (str, optional): Logging server host.
+            port (int, optional): Logging server port.
+            min_level (str, optional): Records below this level are discarded
+                without being queued.
+            queue_size (int, optional): Records buffered before the overflow
+                policy applies.
+            batch_size (int, optional): Most records sent in one frame.
+            flush_interval (float, optional): Longest a record waits for a
+                batch to fill, in seconds.
+            overflow (str, optional): ``drop`` or ``block`` when the queue is
+                full.
+            block_timeout (float, optional): How long ``block`` waits before
+                dropping the record.
+            send_high_water_mark (int, optional): Frames ZeroMQ buffers for a
+                slow or absent server before batches are dropped.
+
+        """
+        if overflow not in (DROP, BLOCK):
+            error_msg = f"Unknown logging overflow policy: {overflow}"
+            raise ValueError(error_msg)
+        self.address = address
+        self.port = port
+        self.min_code = level_code(min_level)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.send_high_water_mark = send_high_water_mark
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+        self.sent = 0
+        self.batches = 0
+        self.dropped_queue_full = 0
+        self.dropped_send = 0
+        self.format_errors = 0
+        self.sender_errors = 0
+
+    def _reset_after_fork(self) -> None:
+        """Drop the parent's queue, lock and thread in a forked child."""
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def _ensure_started(self) -> None:
+        """Start the sender thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-sender", daemon=True,
+                )
+                self._thread.start()
+
+    def send_log(
+        self, level: str, message: str, *args: Any, **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Queue a log message for the logging server.
+
+        ``message`` is formatted with ``args`` and ``kwargs`` on the sender
+        thread; records below ``min_level`` are discarded here.
+        """
+        code = level_code(level)
+        if code < self.min_code:
+            return
+        self._ensure_started()
+        record = (time.time(), code, message, args, kwargs)
+        try:
+            if self.overflow == BLOCK:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_queue_full += 1
+
+    def _format(self, message: Any, args: tuple, kwargs: dict) -> str:  # noqa: ANN401
+        """Format a queued message, keeping it as-is if formatting fails.
 
-    def send_log(self, level: str, message: str) -> None:
-        """Send a log message to the logging server."""
+        Non-string messages (such as the dicts the old JSON client accepted)
+        are sent as their ``str``.
+        """
+        message = str(message)
+        if not args and not kwargs:
+            return message
         try:
-            self.socket.send_json({"level": level, "message": message})
+            return message.format(*args, **kwargs)
+        except Exception:  # noqa: BLE001
+            self.format_errors += 1
+            return f"{message} {args} {kwargs}"
+
+    def _next_batch(self) -> list[tuple[float, int, str]]:
+        """Wait for a record, then collect more until the batch is full or due."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        records = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                records.append(
+                    self._queue.get(timeout=remaining) if remaining > 0
+                    else self._queue.get_nowait(),
+                )
+            except queue.Empty:
+                break
+        return [
+            (created, code, self._format(message, args, kwargs))
+            for created, code, message, args, kwargs in records
+        ]
+
+    def _run(self) -> None:
+        """Send batches until stopped and the queue is drained."""
+        context = zmq.Context()
+        socket = context.socket(zmq.PUSH)
+        socket.setsockopt(zmq.SNDHWM, self.send_high_water_mark)
+        socket.setsockopt(zmq.LINGER, LINGER_MS)
+        socket.connect(f"tcp://{self.address}:{self.port}")
+        pid = os.getpid()
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = []
+                try:
+                    batch = self._next_batch()
+                    if batch:
+                        self._send(socket, batch, pid)
+                except Exception as e:  # noqa: BLE001
+                    # One bad record must not stop delivery for the process
+                    self.sender_errors += 1
+                    self.dropped_send += len(batch)
+                    logger.error(f"Logging error: {e}")
+        finally:
+            socket.close()
+            context.term()
+
+    def _send(
+        self, socket: zmq.Socket, batch: list[tuple[float, int, str]], pid: int,
+    ) -> None:
+        """Hand one batch to ZeroMQ, counting it as sent or dropped."""
+        try:
+            socket.send(encode_batch(batch, pid), zmq.NOBLOCK)
+        except zmq.Again:
+            self.dropped_send += len(batch)
         except zmq.ZMQError as e:
+            self.dropped_send += len(batch)
             logger.error(f"Logging error: {e}")
+        else:
+            self.sent += len(batch)
+            self.batches += 1
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """Wait until queued records have been handed to ZeroMQ.
+
+        Returns:
+            bool: False if records were still queued after ``timeout``.
+
+        """
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(self.flush_interval / 2)
+        return self._queue.empty()
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Send what is queued (for at most ``timeout`` seconds) and stop."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters of sent and dropped records."""
+        return {
+            "sent": self.sent,
+            "batches": self.batches,
+            "queued": self._queue.qsize(),
+            "dropped_queue_full": self.dropped_queue_full,
+            "dropped_send": self.dropped_send,
+            "format_errors": self.format_errors,
+            "sender_errors": self.sender_errors,
+            "overflow": self.overflow,
+        }
 
 
 # Initialize the logger instance
 unified_logger = UnifiedLogger()
+atexit.register(unified_logger.close)
+
+
+def configure(logging_config: LoggingConfigModel) -> None:
+    """Replace the client with one built from the ``[logging]`` configuration."""
+    global unified_logger  # noqa: PLW0603
+    unified_logger.close()
+    atexit.unregister(unified_logger.close)
+    unified_logger = UnifiedLogger(
+        address=logging_config.logging_server_address,
+        port=logging_config.logging_server_port_no,
+        min_level=logging_config.min_log_level,
+        queue_size=logging_config.client_queue_size,
+        batch_size=logging_config.client_batch_size,
+        flush_interval=logging_config.client_flush_interval_ms / 1000,
+        overflow=logging_config.client_overflow,
+        block_timeout=logging_config.client_block_timeout_ms / 1000,
+    )
+    atexit.register(unified_logger.close)
 
 
 # Helper functions for logging
-def log_info(message: str) -> None:
+def log_info(message: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
     """Log an informational message."""
-    unified_logger.send_log("INFO", message)
+    unified_logger.send_log("INFO", message, *args, **kwargs)
 
 
-def log_debug(message: str) -> None:
+def log_debug(message: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
     """Log a debug message."""
-    unified_logger.send_log("DEBUG", message)
+    unified_logger.send_log("DEBUG", message, *args, **kwargs)
 
 
-def log_warning(message: str) -> None:
+def log_warning(message: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
     """Log a warning message."""
-    unified_logger.send_log("WARNING", message)
+    unified_logger.send_log("WARNING", message, *args, **kwargs)
 
 
-def log_error(message: str) -> None:
+def log_error(message: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
     """Log an error message."""
-    unified_logger.send_log("ERROR", message)
+    unified_logger.send_log("ERROR", message, *args, **kwargs)
 
 
-def log_critical(message: str) -> None:
+def log_critical(message: str, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
     """Log a critical error message."""
-    unified_logger.send_log("CRITICAL", message)
+    unified_logger.send_log("CRITICAL", message, *args, **kwargs)
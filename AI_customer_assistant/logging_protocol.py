@@ -0,0 +1,109 @@
+"""Wire format shared by the unified logging client and server.
+
+A batch frame packs many records into one ZeroMQ message::
+
+    header:  magic b"ULOG" | version (u8) | pid (u32) | record count (u32)
+    record:  time (f64) | level code (u8) | message length (u32) | UTF-8 message
+
+all little-endian. Frames that do not start with the magic bytes are single
+``{"level", "message"}`` JSON records, the format of older clients.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+
+MAGIC = b"ULOG"
+VERSION = 1
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+DEFAULT_LEVEL = "INFO"
+
+HEADER = struct.Struct("<4sBII")
+RECORD = struct.Struct("<dBI")
+
+Record = tuple[float, str, str]  # (unix time, level name, message)
+
+
+class ProtocolError(ValueError):
+    """Raised when a frame cannot be decoded."""
+
+
+def level_code(level: str) -> int:
+    """Return the wire code of a level name, falling back to INFO."""
+    return LEVEL_CODES.get(level.upper(), LEVEL_CODES[DEFAULT_LEVEL])
+
+
+def encode_batch(records: list[tuple[float, int, str]], pid: int = 0) -> bytes:
+    """Pack ``(time, level code, message)`` records into one batch frame."""
+    parts = [HEADER.pack(MAGIC, VERSION, pid, len(records))]
+    for created, code, message in records:
+        payload = message.encode("utf-8", errors="replace")
+        parts.append(RECORD.pack(created, code, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def decode_batch(frame: bytes) -> tuple[int, list[Record]]:
+    """Unpack a batch frame.
+
+    Returns:
+        tuple[int, list[Record]]: The sender's pid and its records.
+
+    Raises:
+        ProtocolError: If the frame is truncated or has an unknown version.
+
+    """
+    try:
+        magic, version, pid, count = HEADER.unpack_from(frame)
+        if magic != MAGIC or version != VERSION:
+            error_msg = f"Unsupported log frame {magic!r} version {version}"
+            raise ProtocolError(error_msg)
+        records = []
+        offset = HEADER.size
+        view = memoryview(frame)
+        for _ in range(count):
+            created, code, length = RECORD.unpack_from(frame, offset)
+            offset += RECORD.size
+            message = str(view[offset:offset + length], "utf-8", errors="replace")
+            offset += length
+            level = LEVELS[code] if code < len(LEVELS) else DEFAULT_LEVEL
+            records.append((created, level, message))
+    except struct.error as e:
+        error_msg = f"Truncated log frame: {e}"
+        raise ProtocolError(error_msg) from e
+    return pid, records
+
+
+def decode_frame(frame: bytes, received: float) -> tuple[int, list[Record]]:
+    """Decode a batch frame or a legacy JSON record.
+
+    Args:
+        frame (bytes): Message received from the PULL socket.
+        received (float): Time stamped on legacy records, which carry none.
+
+    Returns:
+        tuple[int, list[Record]]: Sender pid (0 for legacy records) and
+        records.
+
+    Raises:
+        ProtocolError: If the frame is neither format.
+
+    """
+    if frame[:len(MAGIC)] == MAGIC:
+        return decode_batch(frame)
+    try:
+        record = json.loads(frame)
+    except ValueError as e:
+        error_msg = f"Undecodable log frame: {e}"
+        raise ProtocolError(error_msg) from e
+    if not isinstance(record, dict):
+        error_msg = "Legacy log frame is not a JSON object"
+        raise ProtocolError(error_msg)
+    level = str(record.get("level", DEFAULT_LEVEL)).upper()
+    return 0, [(
+        received,
+        level if level in LEVEL_CODES else DEFAULT_LEVEL,
+        str(record.get("message", "No message")),
+    )]
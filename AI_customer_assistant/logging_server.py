@@ -1,56 +1,322 @@
-"""ZeroMQ-based unified logging server to collect logs from multiple services."""
+"""ZeroMQ-based unified logging server to collect logs from multiple services.
+
+Accepts the batch frames of the current ``logging_client`` as well as the
+single JSON records of older clients (see ``logging_protocol``). The
+receiving thread drains every frame waiting on the PULL socket (up to
+``drain_batch``) before decoding them, and hands the decoded records to a
+writer thread in one queue operation. The writer formats them into a large
+file buffer, flushes it every ``flush_interval`` seconds and rotates (and
+optionally zips) the file once it reaches the configured size, so neither
+thread goes through a logging framework per record.
+"""
+
+from __future__ import annotations
+
+import queue
+import re
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
 
 import zmq
 from loguru import logger
 
+from config_loader import load_toml_config
+from logging_protocol import LEVEL_CODES, ProtocolError, decode_frame, level_code
+
+if TYPE_CHECKING:
+    from logging_protocol import Record
+
 # Configuration
 LOG_FILE = "logs/unified_logs.log"
 LOG_LEVEL = "INFO"
 LOG_ROTATION = "10MB"
 LOG_COMPRESSION = "zip"
 LOG_SERVER_PORT = 5555  # Port for the logging server
+DRAIN_BATCH = 1000  # Most frames received before handing them to the writer
+WRITE_BUFFER_BYTES = 256 * 1024
+FLUSH_INTERVAL = 0.2  # Seconds between writer flushes
+WRITE_QUEUE_SIZE = 1024  # Decoded batches waiting for the writer
+POLL_TIMEOUT_MS = 200
+
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*$", re.IGNORECASE)
+
+
+def parse_size(size: str | int) -> int:
+    """Return the bytes of a rotation size such as ``"10MB"`` or ``"512 KB"``.
+
+    Raises:
+        ValueError: If the size cannot be parsed.
+
+    """
+    if isinstance(size, int):
+        return size
+    match = SIZE_PATTERN.match(size)
+    if match is None:
+        error_msg = f"Invalid log rotation size: {size}"
+        raise ValueError(error_msg)
+    value, unit = match.groups()
+    return int(float(value) * SIZE_UNITS[unit.upper()])
+
+
+def _compress(path: Path) -> None:
+    """Zip a rotated log file next to it and remove the original."""
+    with zipfile.ZipFile(path.with_name(f"{path.name}.zip"), "w",
+                         compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.write(path, arcname=path.name)
+    path.unlink()
+
+
+class RotatingLogWriter:
+    """Buffered log file that rotates once it exceeds ``max_bytes``."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int,
+        compression: str | None = LOG_COMPRESSION,
+        buffer_bytes: int = WRITE_BUFFER_BYTES,
+    ) -> None:
+        """Open (or append to) the log file."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.buffer_bytes = buffer_bytes
+        self._file: IO[str] = self._open()
+        self._size = self.path.stat().st_size
+        self._prefix_second = -1
+        self._prefix = ""
+
+    def _open(self) -> IO[str]:
+        """Open the current log file for buffered appending."""
+        return self.path.open("a", encoding="utf-8", buffering=self.buffer_bytes)
 
-# Setup logging
-logger.remove()
-logger.add(
-    LOG_FILE,
-    rotation=LOG_ROTATION,
-    compression=LOG_COMPRESSION,
-    level=LOG_LEVEL,
-)
+    def _time_prefix(self, created: float) -> str:
+        """Format a record time, reusing the formatted second."""
+        second = int(created)
+        if second != self._prefix_second:
+            self._prefix_second = second
+            self._prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return f"{self._prefix}.{int((created - second) * 1000):03d}"
+
+    def write(self, records: list[tuple[int, Record]]) -> None:
+        """Append ``(pid, record)`` lines, rotating first if the file is full."""
+        lines = "".join(
+            f"{self._time_prefix(created)} | {level: <8} | {pid} - {message}\n"
+            for pid, (created, level, message) in records
+        )
+        if self._size >= self.max_bytes:
+            self.rotate()
+        self._file.write(lines)
+        # The limit is in bytes; str.isascii is constant time, encoding is not
+        self._size += len(lines) if lines.isascii() else len(lines.encode("utf-8"))
+
+    def rotate(self) -> None:
+        """Move the current file aside (zipped in the background) and reopen."""
+        self._file.close()
+        stamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+        rotated = self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}")
+        counter = 1
+        while rotated.exists() or rotated.with_name(f"{rotated.name}.zip").exists():
+            rotated = self.path.with_name(
+                f"{self.path.stem}.{stamp}.{counter}{self.path.suffix}",
+            )
+            counter += 1
+        self.path.rename(rotated)
+        if self.compression == "zip":
+            threading.Thread(
+                target=_compress, args=(rotated,), name="log-compress",
+            ).start()
+        self._file = self._open()
+        self._size = 0
+
+    def flush(self) -> None:
+        """Write the buffer to disk."""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self._file.close()
+
+
+class LoggingServer:
+    """PULL socket receiver feeding a writer thread."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        writer: RotatingLogWriter,
+        port: int = LOG_SERVER_PORT,
+        *,
+        min_level: str = LOG_LEVEL,
+        drain_batch: int = DRAIN_BATCH,
+        flush_interval: float = FLUSH_INTERVAL,
+        track_lag: bool = False,
+    ) -> None:
+        """Configure the server; ``serve_forever`` binds and runs it.
+
+        Args:
+            writer (RotatingLogWriter): Destination of the records.
+            port (int, optional): Port to bind the PULL socket on.
+            min_level (str, optional): Records below this level are not written.
+            drain_batch (int, optional): Most frames received per hand-off.
+            flush_interval (float, optional): Seconds between writer flushes.
+            track_lag (bool, optional): Keep every record's delay from its
+                creation to its write, for benchmarks.
+
+        """
+        self.writer = writer
+        self.port = port
+        self.min_code = level_code(min_level)
+        self.drain_batch = drain_batch
+        self.flush_interval = flush_interval
+        self.lag_samples: list[float] | None = [] if track_lag else None
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._stopping = threading.Event()
+        self.frames = 0
+        self.received = 0
+        self.written = 0
+        self.filtered = 0
+        self.decode_errors = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def serve_forever(self) -> None:
+        """Bind the socket and receive until ``stop`` is called."""
+        context = zmq.Context()
+        socket = context.socket(zmq.PULL)
+        writer_thread = threading.Thread(
+            target=self._write_loop, name="log-writer", daemon=True,
+        )
+        try:
+            socket.bind(f"tcp://0.0.0.0:{self.port}")
+            logger.info(f"Logging server started on port {self.port}")
+            writer_thread.start()
+            while not self._stopping.is_set():
+                if not socket.poll(POLL_TIMEOUT_MS):
+                    continue
+                frames = [socket.recv()]
+                while len(frames) < self.drain_batch:
+                    try:
+                        frames.append(socket.recv(zmq.NOBLOCK))
+                    except zmq.Again:
+                        break
+                self._queue.put(self._decode(frames))
+        except zmq.ZMQError as e:
+            logger.error(f"Logging server error: {e}")
+        finally:
+            self._stopping.set()
+            if writer_thread.is_alive():
+                writer_thread.join()
+            socket.close()
+            context.term()
+
+    def _decode(self, frames: list[bytes]) -> list[tuple[int, Record]]:
+        """Decode drained frames into ``(pid, record)`` pairs at or above the level."""
+        received = time.time()
+        records: list[tuple[int, Record]] = []
+        for frame in frames:
+            try:
+                pid, frame_records = decode_frame(frame, received)
+            except ProtocolError as e:
+                self.decode_errors += 1
+                logger.warning(f"Dropped undecodable log frame: {e}")
+                continue
+            kept = [
+                (pid, record) for record in frame_records
+                if LEVEL_CODES[record[1]] >= self.min_code
+            ]
+            self.received += len(frame_records)
+            self.filtered += len(frame_records) - len(kept)
+            records.extend(kept)
+        self.frames += len(frames)
+        return records
+
+    def _write_loop(self) -> None:
+        """Write queued batches, flushing the buffer periodically."""
+        next_flush = time.monotonic() + self.flush_interval
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                try:
+                    records = self._queue.get(
+                        timeout=max(next_flush - time.monotonic(), 0),
+                    )
+                except queue.Empty:
+                    records = []
+                if records:
+                    self.writer.write(records)
+                    self._account(records)
+                if time.monotonic() >= next_flush:
+                    self.writer.flush()
+                    next_flush = time.monotonic() + self.flush_interval
+        finally:
+            self.writer.close()
+
+    def _account(self, records: list[tuple[int, Record]]) -> None:
+        """Update write counters and lag statistics for written records."""
+        written = time.time()
+        lags = [written - created for _, (created, _, _) in records]
+        self.written += len(records)
+        self.lag_total += sum(lags)
+        self.lag_max = max(self.lag_max, *lags)
+        if self.lag_samples is not None:
+            self.lag_samples.extend(lags)
+
+    def stop(self) -> None:
+        """Stop receiving; queued records are still written."""
+        self._stopping.set()
+
+    def stats(self) -> dict[str, Any]:
+        """Return frame and record counters and the write lag."""
+        mean_lag = self.lag_total / self.written if self.written else 0.0
+        return {
+            "frames": self.frames,
+            "received": self.received,
+            "written": self.written,
+            "filtered": self.filtered,
+            "decode_errors": self.decode_errors,
+            "mean_lag_ms": round(mean_lag * 1000, 3),
+            "max_lag_ms": round(self.lag_max * 1000, 3),
+        }
 
 
 def start_logging_server() -> None:
-    """Start the ZeroMQ logging server to collect and store logs."""
-    context = zmq.Context()
-    socket = context.socket(zmq.PULL)
+    """Start the ZeroMQ logging server to collect and store logs.
 
+    Settings come from the ``[logging]`` section of ``config/config.toml``
+    when it is readable, and from the module constants otherwise.
+    """
+    settings = {
+        "log_file_name": LOG_FILE,
+        "log_rotation": LOG_ROTATION,
+        "log_compression": LOG_COMPRESSION,
+        "min_log_level": LOG_LEVEL,
+        "logging_server_port_no": LOG_SERVER_PORT,
+        "server_drain_batch": DRAIN_BATCH,
+        "server_buffer_kb": WRITE_BUFFER_BYTES // 1024,
+        "server_flush_interval_ms": FLUSH_INTERVAL * 1000,
+    }
     try:
-        socket.bind(f"tcp://0.0.0.0:{LOG_SERVER_PORT}")
-        logger.info(f"Logging server started on port {LOG_SERVER_PORT}")
-
-        while True:
-            log_message: dict = socket.recv_json()
-            level: str = log_message.get("level", "INFO")
-            message: str = log_message.get("message", "No message")
-
-            if level == "DEBUG":
-                logger.debug(message)
-            elif level == "WARNING":
-                logger.warning(message)
-            elif level == "ERROR":
-                logger.error(message)
-            elif level == "CRITICAL":
-                logger.critical(message)
-            else:
-                logger.info(message)
-
-
-    except (zmq.ZMQError, ValueError) as e:
-        logger.error(f"Logging server error: {e}")
-    finally:
-        socket.close()
-        context.term()
+        settings.update(load_toml_config().logging.model_dump())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Using default logging server settings: {e}")
+
+    writer = RotatingLogWriter(
+        settings["log_file_name"],
+        parse_size(settings["log_rotation"]),
+        compression=settings["log_compression"],
+        buffer_bytes=settings["server_buffer_kb"] * 1024,
+    )
+    LoggingServer(
+        writer,
+        port=settings["logging_server_port_no"],
+        min_level=settings["min_log_level"],
+        drain_batch=settings["server_drain_batch"],
+        flush_interval=settings["server_flush_interval_ms"] / 1000,
+    ).serve_forever()
 
 
 if __name__ == "__main__":
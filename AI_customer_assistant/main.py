@@ -1,16 +1,50 @@
 """Main entry point for the FastAPI application."""
 from __future__ import annotations
 
-import shutil
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 
+import core
+import logging_client
+import metrics
+from batch import BatchRequestModel, is_within, run_batch
 from config_loader import load_toml_config, load_yaml_config
-from core import validate_and_process
+from core import cached_validate_and_process, configure
+from jobs import JobManager, QueueFullError
 from logging_client import log_error, log_info
+from profiling import RequestProfiler, folded
+from resources import configure_worker_resources
+from services.basic_categorization import get_categorization_engine
+from services.compliance import get_compliance_engine
+from services.model_registry import model_registry
+from services.profanity_check import get_profanity_engine
+from uploads import (
+    BYTES_PER_KB,
+    BYTES_PER_MB,
+    ClientDisconnectedError,
+    RequestExecutor,
+    StoredUpload,
+    UploadRejectedError,
+    declared_size_exceeds,
+    has_declared_size,
+    receive_upload,
+    wait_for_disconnect,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
 
 # ✅ Load and validate configurations
 try:
@@ -20,66 +54,387 @@ except ValueError as e:
     error_message = f"Configuration Error: {e}"
     raise SystemExit(error_message) from e
 
+logging_client.configure(system_config.logging)
+
 # ✅ Extract configurations
 REQUIRED_PHRASES = app_config.required_phrases.model_dump()
-PROHIBITED_PHRASES = set(app_config.prohibited_phrases)
+PROHIBITED_PHRASES = frozenset(app_config.prohibited_phrases)
+CALL_CATEGORIES = app_config.categories
+
+# ✅ Compile the phrase and keyword matchers once per process
+get_compliance_engine(REQUIRED_PHRASES)
+get_profanity_engine(PROHIBITED_PHRASES)
+get_categorization_engine(CALL_CATEGORIES)
+log_info("Loaded {} required phrase categories, {} prohibited phrases and {} "
+         "call categories", len(REQUIRED_PHRASES), len(PROHIBITED_PHRASES),
+         len(CALL_CATEGORIES))
 
 PORT = system_config.server.port_no
 WORKERS = system_config.server.number_of_workers
 TIMEOUT = system_config.server.timeout_keep_alive
 
-app = FastAPI(title="Customer Service AI")
+budget = configure_worker_resources(system_config.server)
+configure(system_config)
 
-ALLOWED_EXTENSIONS = {".wav", ".mp3"}  # Add allowed extensions here
+job_manager = JobManager(
+    system_config.jobs, REQUIRED_PHRASES, PROHIBITED_PHRASES, CALL_CATEGORIES,
+)
 
-@app.post("/process-audio/")
-async def process_audio(
-    audio_file: Annotated[UploadFile | None, File()] = None,
-) -> JSONResponse:
-    """Handle audio file upload and processing."""
-    if audio_file is None:
-        return JSONResponse(content={"error": "No file uploaded"}, status_code=400)
-    file_extension = Path(audio_file.filename).suffix.lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
-        allowed_formats = ", ".join(ALLOWED_EXTENSIONS)
-        raise HTTPException(
-            status_code=400,
-            detail=f"File format not supported. Allowed formats: {allowed_formats}",
+# ✅ Uploads are written to disk as they arrive; processing runs on its own bounded pool
+MAX_UPLOAD_BYTES = system_config.uploads.max_upload_mb * BYTES_PER_MB
+UPLOAD_CHUNK_BYTES = system_config.uploads.chunk_size_kb * BYTES_PER_KB
+UPLOAD_PATHS = {"/process-audio/", "/jobs"}
+UPLOAD_FIELD = "audio_file"
+UPLOAD_OPENAPI = {  # The form is parsed by hand, so describe it for the docs
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": [UPLOAD_FIELD],
+            "properties": {UPLOAD_FIELD: {"type": "string", "format": "binary"}},
+        }}},
+    },
+}
+CLIENT_CLOSED_REQUEST = 499  # Non-standard status logged for disconnected clients
+request_executor = RequestExecutor(
+    system_config.server.max_concurrent_requests,
+    system_config.server.request_timeout_seconds,
+)
+
+# ✅ Opt-in request profiling, restricted by the [profiling] section
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+request_profiler = RequestProfiler(
+    system_config.profiling, stage_names=core.profile_stage_names,
+)
+
+# ✅ Scrape-time gauges for GET /metrics
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+metrics.registry.add(metrics.Gauge(
+    "requests_in_flight", "Requests being processed.",
+    lambda: request_executor.in_flight,
+))
+metrics.registry.add(metrics.Gauge(
+    "requests_waiting", "Requests waiting for a processing slot.",
+    lambda: request_executor.waiting,
+))
+metrics.registry.add(metrics.Gauge(
+    "job_queue_depth", "Jobs waiting for a worker.", job_manager.queue_depth,
+))
+metrics.registry.add(metrics.CallbackCounter(
+    "log_records_dropped_total", "Log records the logging client dropped.",
+    lambda: (logging_client.unified_logger.dropped_queue_full
+             + logging_client.unified_logger.dropped_send),
+))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Warm up the configured models and start the job workers."""
+    threading.Thread(
+        target=model_registry.warm_up, name="model-warm-up", daemon=True,
+    ).start()
+    job_manager.start(system_config)
+    yield
+    job_manager.shutdown()
+    request_executor.shutdown()
+
+
+app = FastAPI(title="Customer Service AI", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def limit_upload_size(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """Reject uploads without a declared size or over the limit before reading.
+
+    Requiring ``Content-Length`` lets an oversized upload be refused before
+    any of its body is read.
+    """
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        if not has_declared_size(request.headers):
+            return JSONResponse(
+                content={"error": "Content-Length required"}, status_code=411,
+            )
+        if declared_size_exceeds(request.headers, MAX_UPLOAD_BYTES):
+            return JSONResponse(
+                content={"error": "Upload too large",
+                         "max_upload_mb": system_config.uploads.max_upload_mb},
+                status_code=413,
+            )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_latency(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """Observe the latency of every routed request by route and status."""
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None:
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start_time, route.path, str(response.status_code),
         )
+    return response
 
-    temp_dir = Path("temp")
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    temp_audio_path = temp_dir / audio_file.filename
 
+async def _receive_upload(
+    request: Request, directory: str | Path,
+) -> StoredUpload | None:
+    """Store a request's audio upload, turning rejections into HTTP errors."""
     try:
-        with temp_audio_path.open("wb") as buffer:
-            shutil.copyfileobj(audio_file.file, buffer)
+        return await receive_upload(
+            request, directory, field=UPLOAD_FIELD,
+            max_bytes=MAX_UPLOAD_BYTES, chunk_bytes=UPLOAD_CHUNK_BYTES,
+        )
+    except UploadRejectedError as e:
+        log_error("Rejected upload: {}", e)
+        raise HTTPException(status_code=e.status_code, detail=str(e)) from e
+    except OSError as e:
+        log_error("File handling error: {}", e)
+        raise HTTPException(status_code=500, detail="File handling error") from e
+
+
+def _run_pipeline(upload_path: Path, cancel: threading.Event) -> dict:
+    """Run the pipeline on a stored upload unless the request was cancelled."""
+    if cancel.is_set():
+        return {"error": "Processing cancelled"}
+    return cached_validate_and_process(str(upload_path), REQUIRED_PHRASES,
+                                       PROHIBITED_PHRASES,
+                                       categories=CALL_CATEGORIES,
+                                       cancel=cancel)
+
+
+def _process_upload(
+    upload_path: Path, filename: str, profile_id: str | None,
+    cancel: threading.Event,
+) -> dict:
+    """Process a stored upload on a request thread, then delete it.
+
+    With a ``profile_id`` the run is captured by the request profiler.
+    """
+    try:
+        if profile_id is None:
+            return _run_pipeline(upload_path, cancel)
+        return request_profiler.capture(
+            profile_id, {"endpoint": "/process-audio/", "filename": filename},
+            _run_pipeline, upload_path, cancel,
+        )
+    finally:
+        upload_path.unlink(missing_ok=True)
+
+
+def _retry_later(error: str, status_code: int) -> JSONResponse:
+    """Return an error response asking the client to retry after a while."""
+    return JSONResponse(
+        content={"error": error},
+        status_code=status_code,
+        headers={"Retry-After": str(system_config.jobs.retry_after_seconds)},
+    )
+
+
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Report readiness once model warm-up has finished."""
+    status = model_registry.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/resources")
+async def resource_budget() -> JSONResponse:
+    """Report the CPU budget applied to this worker process."""
+    return JSONResponse(content=budget.describe())
+
 
-        log_info(f"Received file: {audio_file.filename}")
-        log_info(f"Required Phrases: {REQUIRED_PHRASES}")
-        log_info(f"Prohibited Phrases: {PROHIBITED_PHRASES}")
+@app.get("/logging/stats")
+async def logging_stats() -> JSONResponse:
+    """Report sent and dropped log records for this worker process."""
+    return JSONResponse(content=logging_client.unified_logger.stats())
 
+
+@app.get("/metrics")
+async def prometheus_metrics() -> PlainTextResponse:
+    """Expose this worker's metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.registry.render(), media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
+@app.get("/profiles/{profile_id}", response_model=None)
+async def get_profile(
+    profile_id: str, output_format: str = "json",
+) -> JSONResponse | PlainTextResponse:
+    """Return a stored request profile, as JSON or as folded stacks.
+
+    ``?output_format=folded`` returns one ``stack count`` line per stack,
+    ready for flamegraph.pl or speedscope.
+    """
+    artifact = (
+        request_profiler.load(profile_id) if system_config.profiling.enabled else None
+    )
+    if artifact is None:
+        return JSONResponse(content={"error": "Profile not found"}, status_code=404)
+    if output_format == "folded":
+        return PlainTextResponse(folded(artifact))
+    return JSONResponse(content=artifact)
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> JSONResponse:
+    """Report result cache counters for this worker process."""
+    if core.result_cache is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content={"enabled": True, **core.result_cache.stats()})
+
+
+def _processing_error(
+    error: Exception, filename: str, headers: dict[str, str] | None,
+) -> JSONResponse | dict:
+    """Return the response for a request whose processing raised ``error``."""
+    if isinstance(error, TimeoutError):
+        log_error("Processing timed out for {}: {}", filename, error)
+        return JSONResponse(
+            content={"error": "Processing timed out", "message": str(error)},
+            status_code=504, headers=headers,
+        )
+    if isinstance(error, ClientDisconnectedError):
+        log_error("Cancelled processing of {}: {}", filename, error)
+        return JSONResponse(
+            content={"error": "Client disconnected"},
+            status_code=CLIENT_CLOSED_REQUEST, headers=headers,
+        )
+    if isinstance(error, OSError):
+        log_error("File handling error: {}", error)
+        return {"error": "File handling error", "message": str(error)}
+    log_error("Value error during processing: {}", error)
+    return {"error": "Value error during processing", "message": str(error)}
+
+
+@app.post("/process-audio/", openapi_extra=UPLOAD_OPENAPI)
+async def process_audio(request: Request) -> JSONResponse:
+    """Handle audio file upload and processing.
+
+    The upload is written to a unique file as it arrives and processed on
+    the request executor; the request is cancelled after the configured
+    timeout or when the client disconnects. With profiling enabled, a
+    request sent with the ``X-Profile: 1`` header or ``?profile=1`` (or
+    picked by the configured sample rate) is profiled, and
+    ``X-Profile-Id`` names its artifact.
+    """
+    upload = await _receive_upload(request, system_config.uploads.directory)
+    if upload is None:
+        return JSONResponse(content={"error": "No file uploaded"}, status_code=400)
+    log_info("Received file: {}", upload.filename)
+
+    profile_id = None
+    headers = None
+    flag = request.headers.get(PROFILE_HEADER, request.query_params.get("profile"))
+    if request_profiler.wants(flag):
+        profile_id = request_profiler.reserve()
+    if profile_id is not None:
+        headers = {PROFILE_ID_HEADER: profile_id}
+
+    try:
         # ✅ Process using core function with validated configurations
-        result = validate_and_process(temp_audio_path, REQUIRED_PHRASES,
-                                      PROHIBITED_PHRASES)
+        result = await request_executor.run(
+            _process_upload, upload.path, upload.filename, profile_id,
+            disconnected=lambda: wait_for_disconnect(request),
+        )
+    except (TimeoutError, ClientDisconnectedError, OSError, ValueError) as e:
+        return _processing_error(e, upload.filename, headers)
 
-        if not result:
-            return JSONResponse(
-                content={"error": "Processing returned empty response"},
-                status_code=500,
-            )  # ✅ E501 Fix - Line wrapped
-        return JSONResponse(content=result)
-
-    except HTTPException as e:
-        log_error(f"HTTP error: {e.detail}")
-        return {"error": f"HTTP error: {e.detail}"}
+    if not result:
+        return JSONResponse(
+            content={"error": "Processing returned empty response"},
+            status_code=500, headers=headers,
+        )  # ✅ E501 Fix - Line wrapped
+    return JSONResponse(content=result, headers=headers)
+
+
+@app.post("/jobs", status_code=202, openapi_extra=UPLOAD_OPENAPI)
+async def create_job(request: Request) -> JSONResponse:
+    """Queue an uploaded audio file for processing and return its job id."""
+    # Checked again on submit; this spares receiving an upload that cannot queue
+    if job_manager.is_full():
+        log_error("Rejected job: job queue is full")
+        return _retry_later("Job queue is full, retry later", 429)
+
+    upload = await _receive_upload(request, job_manager.upload_dir)
+    if upload is None:
+        return JSONResponse(content={"error": "No file uploaded"}, status_code=400)
+    try:
+        job = job_manager.submit(upload.path, upload.filename)
+    except QueueFullError as e:
+        upload.path.unlink(missing_ok=True)
+        log_error("Rejected job for {}: {}", upload.filename, e)
+        return _retry_later("Job queue is full, retry later", 429)
+    except RuntimeError as e:
+        upload.path.unlink(missing_ok=True)
+        log_error("Could not queue job for {}: {}", upload.filename, e)
+        return _retry_later("Job workers are unavailable, retry later", 503)
     except OSError as e:
-        log_error(f"File handling error: {e}")
-        return {"error": "File handling error", "message": str(e)}
-    except ValueError as e:
-        log_error(f"Value error during processing: {e}")
-        return {"error": "Value error during processing", "message": str(e)}
+        upload.path.unlink(missing_ok=True)
+        log_error("File handling error: {}", e)
+        return JSONResponse(
+            content={"error": "File handling error", "message": str(e)},
+            status_code=500,
+        )
 
-    finally:
-        temp_audio_path.unlink(missing_ok=True)
-        log_info(f"Deleted temp file: {temp_audio_path}")
+    log_info("Queued job {} for file: {}", job.job_id, upload.filename)
+    return JSONResponse(
+        content={"job_id": job.job_id, "status": job.status}, status_code=202,
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> JSONResponse:
+    """Return the status, per-stage progress and result of a job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Job not found"}, status_code=404)
+    return JSONResponse(content=job.to_dict())
+
+
+@app.post("/process-audio/batch", response_model=None)
+async def process_batch(request: BatchRequestModel) -> StreamingResponse | JSONResponse:
+    """Process server-side recordings in bulk, streaming JSONL as files finish.
+
+    ``source`` must lie inside the configured batch input root. ``output``
+    names a file in the batch output directory; it must not exist yet unless
+    ``resume`` is set. ``workers`` is capped at the configured batch workers.
+    """
+    input_root = Path(system_config.batch.input_root)
+    if not is_within(Path(request.source), input_root):
+        return JSONResponse(
+            content={"error": "Batch source must be inside the batch input root"},
+            status_code=400,
+        )
+    output = None
+    if request.output:
+        output = Path(system_config.batch.output_dir) / request.output
+        output.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if not request.resume:
+                output.open("x").close()  # Claim the name; never overwrite
+        except FileExistsError:
+            return JSONResponse(
+                content={"error": f"Batch output {request.output} already exists"},
+                status_code=409,
+            )
+    workers = min(
+        request.workers or system_config.batch.workers, system_config.batch.workers,
+    )
+
+    log_info("Starting batch for source: {}", request.source)
+    records = run_batch(
+        request.source, output, workers,
+        REQUIRED_PHRASES, PROHIBITED_PHRASES, system_config=system_config,
+        resume=request.resume, input_root=input_root, categories=CALL_CATEGORIES,
+    )
+    return StreamingResponse(
+        (json.dumps(record) + "\n" for record in records),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,336 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Every pipeline stage reports its wall time, the process CPU time and the
+growth of the process's peak RSS while it ran into fixed-bucket histograms;
+requests report their latency and the audio seconds they processed. CPU
+time is measured for the whole process because Whisper and pyannote do
+their work on torch's intra-op threads, so stages that run at the same time
+(within one request or across requests) each count the others' CPU too.
+Cleaning, which runs inside the transcription stage, is also reported on
+its own as ``cleaning``. Recording is a lock and a binary search per
+observation, cheap enough to leave on. ``render`` produces the
+``GET /metrics`` payload.
+
+Each process keeps its own registry. Job worker processes forward their
+observations to the API process over the job progress queue (see
+``forward_to`` and ``replay``); with several uvicorn workers, each scrape
+sees the worker that answered it, identified by the ``process_id`` gauge.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+PREFIX = "assistant"
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300,
+    600, 1800,
+)
+BYTES_BUCKETS = tuple(2**power for power in range(20, 34, 2))  # 1 MiB .. 8 GiB
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+RATE_WINDOW_SECONDS = 60
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+T = TypeVar("T")
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    """Format a Prometheus label set."""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = SECONDS_BUCKETS,
+    ) -> None:
+        """Create an empty histogram."""
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Iterator[str]:
+        """Yield the exposition lines of every series."""
+        with self._lock:
+            series_list = [
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            ]
+        names = (*self.label_names, "le")
+        for labels, counts, total, count in sorted(series_list):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket{_labels(names, (*labels, f'{bound:g}'))} "
+                       f"{cumulative}")
+            yield f"{self.name}_bucket{_labels(names, (*labels, '+Inf'))} {count}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {total:g}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, help_text: str, label_names: tuple[str, ...] = (),
+    ) -> None:
+        """Create a counter with no series."""
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        """Add ``amount`` to the series of ``labels``."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        """Yield the exposition lines of every series."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value:g}"
+
+
+class Gauge:
+    """Value read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        """Create a gauge that reports ``read()``."""
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        """Yield the current value."""
+        yield f"{self.name} {self.read():g}"
+
+
+class CallbackCounter(Gauge):
+    """Cumulative total read from a callback at scrape time."""
+
+    kind = "counter"
+
+
+class RateWindow:
+    """Sum of recent amounts per second over a sliding window."""
+
+    def __init__(self, window_seconds: float = RATE_WINDOW_SECONDS) -> None:
+        """Create an empty window."""
+        self.window_seconds = window_seconds
+        self._events: deque[tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+
+    def add(self, amount: float) -> None:
+        """Record ``amount`` now."""
+        with self._lock:
+            self._events.append((time.monotonic(), amount))
+
+    def rate(self) -> float:
+        """Return the amount per second over the window."""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._events and self._events[0][0] < cutoff:
+                self._events.popleft()
+            return sum(amount for _, amount in self._events) / self.window_seconds
+
+
+class Registry:
+    """Named metrics rendered together."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._metrics: dict[str, Histogram | Counter | Gauge] = {}
+
+    def add(self, metric: T) -> T:
+        """Register ``metric`` (replacing one with the same name) and return it."""
+        if not metric.name.startswith(f"{PREFIX}_"):
+            metric.name = f"{PREFIX}_{metric.name}"
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+STAGE_WALL_SECONDS = registry.add(Histogram(
+    "stage_wall_seconds", "Wall time of pipeline stages.", ("stage",),
+))
+STAGE_CPU_SECONDS = registry.add(Histogram(
+    "stage_cpu_seconds",
+    "Process CPU time while each pipeline stage ran (overlaps across stages).",
+    ("stage",),
+))
+STAGE_PEAK_RSS_BYTES = registry.add(Histogram(
+    "stage_peak_rss_increase_bytes",
+    "Growth of the process peak RSS while a stage ran.", ("stage",), BYTES_BUCKETS,
+))
+STAGE_OUTCOMES = registry.add(Counter(
+    "stage_outcomes_total", "Pipeline stage outcomes.", ("stage", "status"),
+))
+REQUEST_SECONDS = registry.add(Histogram(
+    "request_seconds", "Latency of HTTP requests by route.", ("endpoint", "status"),
+))
+AUDIO_SECONDS = registry.add(Counter(
+    "audio_seconds_processed_total", "Seconds of audio run through the pipeline.",
+))
+_audio_rate = RateWindow()
+registry.add(Gauge(
+    "audio_seconds_processed_per_second",
+    f"Audio seconds processed per second over the last {RATE_WINDOW_SECONDS} s.",
+    _audio_rate.rate,
+))
+WHISPER_BATCH_WINDOWS = registry.add(Histogram(
+    "whisper_batch_windows", "Mel windows decoded per batched Whisper call.",
+    buckets=BATCH_BUCKETS,
+))
+registry.add(Gauge("process_id", "Process id of the answering worker.", os.getpid))
+
+_forward: Callable[[tuple], None] | None = None
+
+
+@dataclass(frozen=True)
+class Usage:
+    """Resources used by one call."""
+
+    wall: float
+    cpu: float
+    peak_rss_increase: int
+
+
+def peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process so far."""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+def _start() -> tuple[float, float, int]:
+    """Return the wall clock, process CPU time and peak RSS now."""
+    return time.perf_counter(), time.process_time(), peak_rss_bytes()
+
+
+def _usage_since(start: tuple[float, float, int]) -> Usage:
+    """Return the resources used since ``_start`` returned ``start``."""
+    start_wall, start_cpu, start_rss = start
+    return Usage(
+        wall=time.perf_counter() - start_wall,
+        cpu=time.process_time() - start_cpu,
+        peak_rss_increase=peak_rss_bytes() - start_rss,
+    )
+
+
+def measure(func: Callable[..., T], *args: Any) -> tuple[T, Usage]:  # noqa: ANN401
+    """Call ``func(*args)`` and return its result with the resources it used."""
+    start = _start()
+    result = func(*args)
+    return result, _usage_since(start)
+
+
+def forward_to(send: Callable[[tuple], None] | None) -> None:
+    """Send observations to ``send`` instead of the local registry.
+
+    Used by job worker processes, whose registry nobody scrapes.
+    """
+    global _forward  # noqa: PLW0603
+    _forward = send
+
+
+def record_stage(stage: str, status: str, usage: Usage | None = None) -> None:
+    """Record the outcome of a stage and, when it ran, its usage."""
+    if _forward is not None:
+        _forward(("stage", stage, status, usage))
+        return
+    STAGE_OUTCOMES.inc(1, stage, status)
+    if usage is not None:
+        STAGE_WALL_SECONDS.observe(usage.wall, stage)
+        STAGE_CPU_SECONDS.observe(usage.cpu, stage)
+        STAGE_PEAK_RSS_BYTES.observe(max(usage.peak_rss_increase, 0), stage)
+
+
+def record_audio(seconds: float) -> None:
+    """Record audio that went through the pipeline."""
+    if _forward is not None:
+        _forward(("audio", seconds))
+        return
+    AUDIO_SECONDS.inc(seconds)
+    _audio_rate.add(seconds)
+
+
+def record_whisper_batch(windows: int) -> None:
+    """Record the size of a batched Whisper decoding call."""
+    if _forward is not None:
+        _forward(("whisper_batch", windows))
+        return
+    WHISPER_BATCH_WINDOWS.observe(windows)
+
+
+def replay(observation: tuple) -> None:
+    """Record an observation forwarded by another process."""
+    kind, *args = observation
+    if kind == "stage":
+        record_stage(*args)
+    elif kind == "audio":
+        record_audio(*args)
+    elif kind == "whisper_batch":
+        record_whisper_batch(*args)
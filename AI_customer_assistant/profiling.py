@@ -0,0 +1,323 @@
+"""Opt-in sampling profiles of individual requests.
+
+A profiled request runs as usual while a sampler thread reads the stacks of
+the threads working on it every ``interval_ms`` (``sys._current_frames``),
+so the cost is a stack walk per interval rather than a hook on every call.
+Each sample is tagged with the pipeline stage it falls in, found by the
+stage function's code object on the stack; stage threads join the profile
+of the request that started their stage graph (see ``adopt``). With
+``track_allocations``, ``tracemalloc`` records which source lines grew the
+heap while the request ran.
+
+The artifact, written to ``<directory>/<profile_id>.json``, holds the
+sample counts per stage, the stacks in the folded format read by
+flamegraph.pl and speedscope, and the allocation growth.
+
+Limits: samples are wall-clock (a thread waiting on a lock is sampled like
+one computing); stages run in a process pool, transcription segments and
+the shared Whisper batcher thread are not sampled; tracemalloc is
+process-wide and traces every allocation, so allocations of requests
+running at the same time are included and every thread allocates more
+slowly while it is on; it is off by default.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from concurrent.futures import thread as thread_pool
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import CodeType, FrameType
+
+    from config_loader import ProfilingConfigModel
+
+T = TypeVar("T")
+
+MAX_STACK_DEPTH = 128
+OTHER_STAGE = "other"  # Samples outside any pipeline stage
+TRUTHY = frozenset({"1", "true", "yes", "on"})
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+BYTES_PER_KB = 1024
+# Idle pool threads wait for work directly in this loop; they are not sampled
+IDLE_CODES = frozenset({thread_pool._worker.__code__})  # noqa: SLF001
+
+# Thread ident -> profiler sampling that thread
+_profilers: dict[int, SamplingProfiler] = {}
+_profilers_lock = threading.Lock()
+
+
+def active() -> SamplingProfiler | None:
+    """Return the profiler sampling the calling thread, if any."""
+    return _profilers.get(threading.get_ident())
+
+
+def adopt(profiler: SamplingProfiler | None) -> None:
+    """Add the calling thread to ``profiler``; a thread pool initializer."""
+    if profiler is not None:
+        profiler.watch(threading.get_ident())
+
+
+def _label(code: CodeType) -> str:
+    """Return a frame label: function name and source location."""
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Periodically sample the stacks of a set of threads."""
+
+    def __init__(
+        self, interval: float, stage_names: dict[CodeType, str] | None = None,
+    ) -> None:
+        """Create a profiler sampling every ``interval`` seconds.
+
+        Args:
+            interval (float): Seconds between samples.
+            stage_names (dict[CodeType, str], optional): Stage name of each
+                stage function's code; samples under one are tagged with it.
+
+        """
+        self.interval = interval
+        self.stage_names = stage_names or {}
+        self.stacks: Counter[str] = Counter()
+        self.stage_samples: Counter[str] = Counter()
+        self.samples = 0
+        self._threads: set[int] = set()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, ident: int) -> None:
+        """Sample the thread ``ident`` until the profiler stops."""
+        with _profilers_lock:
+            self._threads.add(ident)
+            _profilers[ident] = self
+
+    def start(self) -> None:
+        """Watch the calling thread and start sampling."""
+        self.watch(threading.get_ident())
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and release the watched threads."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        with _profilers_lock:
+            for ident in self._threads:
+                if _profilers.get(ident) is self:
+                    del _profilers[ident]
+
+    def _run(self) -> None:
+        """Take a sample every interval until stopped."""
+        while not self._stopping.wait(self.interval):
+            with _profilers_lock:
+                threads = list(self._threads)
+            frames = sys._current_frames()  # noqa: SLF001
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._sample(frame)
+            self.samples += 1
+
+    def _sample(self, frame: FrameType) -> None:
+        """Record the stack ending at ``frame`` unless the thread is idle."""
+        if frame.f_code in IDLE_CODES:
+            return
+        codes = []
+        while frame is not None and len(codes) < MAX_STACK_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        stage = next(
+            (self.stage_names[code] for code in codes if code in self.stage_names),
+            OTHER_STAGE,
+        )
+        self.stage_samples[stage] += 1
+        self.stacks[";".join([stage, *map(_label, codes)])] += 1
+
+
+class AllocationTracker:
+    """Heap growth by source line while a request runs, via tracemalloc.
+
+    Tracing is started by the first tracker and stopped by the last, so
+    overlapping profiles share it.
+    """
+
+    _users = 0
+    _lock = threading.Lock()
+
+    def __init__(self, top: int) -> None:
+        """Create a tracker reporting the ``top`` growing lines."""
+        self.top = top
+        self._before: tracemalloc.Snapshot | None = None
+        self.report: dict[str, Any] = {}
+
+    def start(self) -> None:
+        """Start tracing (if needed) and take the baseline snapshot."""
+        with AllocationTracker._lock:
+            if AllocationTracker._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            AllocationTracker._users += 1
+        self._before = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        """Compare with the baseline, then stop tracing if no one else uses it."""
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        with AllocationTracker._lock:
+            AllocationTracker._users -= 1
+            if AllocationTracker._users == 0:
+                tracemalloc.stop()
+        growth = after.compare_to(self._before, "lineno")[:self.top]
+        self.report = {
+            "traced_kb": round(current / BYTES_PER_KB, 1),
+            "traced_peak_kb": round(peak / BYTES_PER_KB, 1),
+            "top_growth": [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff_kb": round(stat.size_diff / BYTES_PER_KB, 1),
+                    "count_diff": stat.count_diff,
+                }
+                for stat in growth
+            ],
+        }
+
+
+class RequestProfiler:
+    """Decide which requests to profile, profile them and store the artifacts."""
+
+    def __init__(
+        self,
+        config: ProfilingConfigModel,
+        stage_names: Callable[[], dict[CodeType, str]] | None = None,
+    ) -> None:
+        """Configure profiling.
+
+        Args:
+            config (ProfilingConfigModel): The ``[profiling]`` configuration.
+            stage_names (Callable[[], dict[CodeType, str]], optional): Returns
+                the stage name of each stage function's code, per profile.
+
+        """
+        self.config = config
+        self.directory = Path(config.directory)
+        self.stage_names = stage_names
+        self._slots = threading.BoundedSemaphore(max(config.max_concurrent, 1))
+
+    def wants(self, flagged: str | None) -> bool:
+        """Return True if a request (with its flag value, if any) is profiled."""
+        if not self.config.enabled:
+            return False
+        if self.config.allow_request_flag and flagged is not None:
+            # An explicit flag decides, so "X-Profile: 0" opts out of sampling
+            return flagged.lower() in TRUTHY
+        return random.random() < self.config.sample_rate  # noqa: S311
+
+    def reserve(self) -> str | None:
+        """Take a profiling slot and return a new profile id, or None if full."""
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Profiling slots busy; running request unprofiled")
+            return None
+        return uuid.uuid4().hex
+
+    def capture(
+        self, profile_id: str, metadata: dict[str, Any],
+        func: Callable[..., T], *args: Any, **kwargs: Any,  # noqa: ANN401
+    ) -> T:
+        """Call ``func`` under the profiler and store the artifact.
+
+        The slot taken by ``reserve`` is released when the call returns.
+        """
+        sampler = SamplingProfiler(
+            self.config.interval_ms / 1000,
+            self.stage_names() if self.stage_names else None,
+        )
+        allocations = (
+            AllocationTracker(self.config.allocation_top)
+            if self.config.track_allocations else None
+        )
+        if allocations is not None:
+            allocations.start()
+        sampler.start()
+        start_time = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "completed"
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            wall = time.perf_counter() - start_time
+            cpu = time.process_time() - cpu_start
+            sampler.stop()
+            if allocations is not None:
+                allocations.stop()
+            self._slots.release()
+            self._store(profile_id, {
+                **metadata,
+                "profile_id": profile_id,
+                "status": status,
+                "started_at": time.time() - wall,
+                "wall_seconds": round(wall, 3),
+                "process_cpu_seconds": round(cpu, 3),
+                "interval_ms": self.config.interval_ms,
+                "sampling_rounds": sampler.samples,
+                "stage_samples": dict(sampler.stage_samples.most_common()),
+                "folded": dict(sampler.stacks.most_common()),
+                "allocations": allocations.report if allocations else None,
+            })
+
+    def _store(self, profile_id: str, artifact: dict[str, Any]) -> None:
+        """Write an artifact and delete the oldest beyond ``max_profiles``."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.path(profile_id).write_text(json.dumps(artifact), encoding="utf-8")
+            artifacts = sorted(
+                self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime,
+            )
+            for old in artifacts[:-self.config.max_profiles]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            logger.error(f"Could not store profile {profile_id}: {e}")
+        else:
+            logger.info(f"Stored profile {profile_id} ({artifact['wall_seconds']} s)")
+
+    def path(self, profile_id: str) -> Path:
+        """Return the artifact path of ``profile_id``.
+
+        Raises:
+            ValueError: If ``profile_id`` is not a profile id.
+
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            error_msg = f"Invalid profile id: {profile_id}"
+            raise ValueError(error_msg)
+        return self.directory / f"{profile_id}.json"
+
+    def load(self, profile_id: str) -> dict[str, Any] | None:
+        """Return a stored artifact, or None if there is none."""
+        try:
+            return json.loads(self.path(profile_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+
+def folded(artifact: dict[str, Any]) -> str:
+    """Return an artifact's stacks as ``stack count`` lines."""
+    return "".join(f"{stack} {count}\n" for stack, count in artifact["folded"].items())
@@ -0,0 +1,190 @@
+"""CPU thread budgeting for server workers and their model backends.
+
+Every uvicorn worker loads its own torch, BLAS and onnxruntime thread
+pools, and by default each of them sizes itself to all cores of the node,
+so a few concurrent requests oversubscribe the CPU many times over. This
+module splits the CPUs between the workers configured in ``[server]``:
+
+* each worker gets ``cpus // number_of_workers`` threads (or the
+  configured ``threads_per_worker``), applied through the usual thread
+  environment variables, torch and, when installed, threadpoolctl;
+* with ``cpu_affinity`` enabled each worker claims a slot and is pinned to
+  its own disjoint set of cores, which child processes inherit;
+* processes started by a worker (job and batch workers) split the
+  worker's threads between them.
+
+Torch is imported lazily by the model registry, after the budget is
+applied, so it sizes its thread pool from the environment variables.
+onnxruntime (used internally by the pyannote 3.0 pipeline) ignores them and
+sizes its pool from the core count; CPU pinning is what bounds it.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+if TYPE_CHECKING:
+    from config_loader import ServerConfigModel
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+SLOT_LOCK_PREFIX = "ai-customer-assistant-cpu-slot"
+
+_budget: ResourceBudget | None = None
+_slot_file: IO[str] | None = None  # Held open to keep the slot lock
+
+
+@dataclass(frozen=True)
+class ResourceBudget:
+    """CPU share of one worker process."""
+
+    cpus: int
+    workers: int
+    threads: int
+    slot: int | None = None
+    affinity: tuple[int, ...] | None = None
+
+    def describe(self) -> dict[str, Any]:
+        """Return a JSON-serialisable summary of the budget."""
+        summary = asdict(self)
+        summary["affinity"] = list(self.affinity) if self.affinity else None
+        return summary
+
+
+def available_cpus() -> list[int]:
+    """Return the CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def claim_worker_slot(workers: int) -> int | None:
+    """Claim the first free worker slot on this node, or None if none is free.
+
+    Slots are advisory file locks, released when the process exits, so
+    sibling uvicorn workers each pin themselves to a different core set.
+    """
+    global _slot_file  # noqa: PLW0603
+    if fcntl is None:
+        return None
+
+    for slot in range(workers):
+        path = Path(tempfile.gettempdir()) / f"{SLOT_LOCK_PREFIX}-{slot}.lock"
+        lock_file = path.open("w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+        _slot_file = lock_file
+        return slot
+    return None
+
+
+def plan_budget(
+    server_config: ServerConfigModel, slot: int | None = None,
+) -> ResourceBudget:
+    """Split the available CPUs between the configured server workers.
+
+    Args:
+        server_config (ServerConfigModel): Worker count, thread and affinity
+            settings.
+        slot (int | None, optional): This worker's slot; required for CPU
+            pinning.
+
+    Returns:
+        ResourceBudget: Threads (and optionally cores) for this worker.
+
+    """
+    cpus = available_cpus()
+    workers = max(server_config.number_of_workers, 1)
+    share = max(len(cpus) // workers, 1)
+    affinity = None
+    if server_config.cpu_affinity and slot is not None and len(cpus) >= workers:
+        affinity = tuple(cpus[slot * share:(slot + 1) * share])
+    return ResourceBudget(
+        cpus=len(cpus),
+        workers=workers,
+        threads=server_config.threads_per_worker or share,
+        slot=slot,
+        affinity=affinity,
+    )
+
+
+def set_thread_count(threads: int) -> None:
+    """Limit torch, BLAS and OpenMP thread pools to ``threads``.
+
+    Libraries imported later read the environment variables; those already
+    loaded are limited at runtime where possible.
+    """
+    for env_var in THREAD_ENV_VARS:
+        os.environ[env_var] = str(threads)
+
+    if threadpool_limits is None:
+        logger.debug("threadpoolctl not installed; BLAS limited via environment only")
+    else:
+        threadpool_limits(threads)
+
+    if "torch" in sys.modules:
+        torch = sys.modules["torch"]
+        torch.set_num_threads(threads)
+
+
+def apply_budget(budget: ResourceBudget) -> ResourceBudget:
+    """Apply a budget to the current process and remember it."""
+    global _budget  # noqa: PLW0603
+    if budget.affinity:
+        os.sched_setaffinity(0, budget.affinity)
+    set_thread_count(budget.threads)
+    _budget = budget
+    logger.info(f"CPU budget: {budget.describe()}")
+    return budget
+
+
+def configure_worker_resources(server_config: ServerConfigModel) -> ResourceBudget:
+    """Plan and apply the budget of a server worker process."""
+    slot = (
+        claim_worker_slot(server_config.number_of_workers)
+        if server_config.cpu_affinity else None
+    )
+    return apply_budget(plan_budget(server_config, slot))
+
+
+def child_threads(processes: int) -> int:
+    """Return the threads each of ``processes`` child processes should use.
+
+    The process's own budget is split between them; without one, the
+    inherited ``OMP_NUM_THREADS`` limit or else every available CPU is.
+    """
+    if _budget is not None:
+        threads = _budget.threads
+    else:
+        threads = int(os.environ.get("OMP_NUM_THREADS", "0")) or len(available_cpus())
+    return max(threads // max(processes, 1), 1)
+
+
+def current_budget() -> ResourceBudget | None:
+    """Return the budget applied to this process, if any."""
+    return _budget
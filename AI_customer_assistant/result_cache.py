@@ -0,0 +1,186 @@
+"""Content-addressed on-disk cache of processing results.
+
+Results are keyed by a hash of the audio bytes plus a fingerprint of the
+active configuration (required and prohibited phrases, model settings and
+library versions), so re-uploading the same recording returns the stored
+result without running any model. The cache is bounded in size and evicts
+the least recently used entries first.
+
+The size bound is enforced per process: each process tracks the entries it
+knows of, so several workers sharing one directory can together exceed
+``max_size_mb`` until one of them evicts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from importlib import metadata
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+CACHE_FORMAT_VERSION = 4  # Bump when the shape of cached results changes
+HASH_CHUNK_BYTES = 1024 * 1024
+FINGERPRINT_PACKAGES = ("openai-whisper", "pyannote.audio", "textblob")
+
+
+def _package_version(name: str) -> str:
+    """Return the installed version of a package, or "missing"."""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "missing"
+
+
+def config_fingerprint(*parts: Any) -> str:  # noqa: ANN401
+    """Hash configuration values and model library versions into one string.
+
+    Args:
+        *parts: JSON-serialisable values (sets are sorted) that affect results.
+
+    Returns:
+        str: Hex digest identifying the configuration.
+
+    """
+    payload = {
+        "version": CACHE_FORMAT_VERSION,
+        "parts": parts,
+        "packages": {name: _package_version(name) for name in FINGERPRINT_PACKAGES},
+    }
+    encoded = json.dumps(
+        payload, sort_keys=True,
+        default=lambda value: sorted(value) if isinstance(value, (set, frozenset))
+        else str(value),
+    )
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def hash_file(file_path: str | Path) -> str:
+    """Return the SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as audio_file:
+        while chunk := audio_file.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of JSON results stored one file per key."""
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        """Open (or create) the cache directory and index existing entries."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # Oldest access first; file mtimes carry the LRU order across restarts
+        entries = sorted(
+            (path.stat().st_mtime, path.stem, path.stat().st_size)
+            for path in self.directory.glob("*.json")
+        )
+        self._index: OrderedDict[str, int] = OrderedDict(
+            (key, size) for _, key, size in entries
+        )
+        self._size = sum(self._index.values())
+
+    def _path(self, key: str) -> Path:
+        """Return the file that stores ``key``."""
+        return self.directory / f"{key}.json"
+
+    def key_for(self, audio_file: str | Path, fingerprint: str) -> str:
+        """Return the cache key for an audio file under a configuration."""
+        return hashlib.sha256(
+            f"{hash_file(audio_file)}:{fingerprint}".encode(),
+        ).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached result for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            encoded = path.read_bytes()
+            result = json.loads(encoded)
+            path.touch()
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+                if key in self._index:
+                    self._size -= self._index.pop(key)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:  # Written by another worker process
+                self._index[key] = len(encoded)
+                self._size += len(encoded)
+        return result
+
+    def put(self, key: str, result: dict) -> None:
+        """Store ``result`` under ``key`` and evict old entries if needed."""
+        path = self._path(key)
+        encoded = json.dumps(result).encode("utf-8")
+        # Unique per writer, so concurrent writes of one key never share a file
+        temp_path = path.with_suffix(f".{os.getpid()}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_bytes(encoded)
+        temp_path.replace(path)
+
+        with self._lock:
+            self._size += len(encoded) - self._index.pop(key, 0)
+            self._index[key] = len(encoded)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until under ``max_bytes``."""
+        while self._size > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            self._size -= size
+            self.evictions += 1
+
+    def get_or_compute(
+        self, audio_file: str | Path, fingerprint: str, compute: Callable[[], dict],
+    ) -> dict:
+        """Return the cached result for ``audio_file`` or compute and store it.
+
+        Failed results (with an ``error`` key) and partial ones (with
+        ``stage_errors``) are returned but not cached, so a later upload of
+        the same audio runs the pipeline again.
+        """
+        key = self.key_for(audio_file, fingerprint)
+        result = self.get(key)
+        if result is not None:
+            logger.info(f"Result cache hit for {audio_file}")
+            return result
+
+        result = compute()
+        if result and "error" not in result and "stage_errors" not in result:
+            self.put(key, result)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
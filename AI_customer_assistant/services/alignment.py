@@ -0,0 +1,183 @@
+"""Speaker attribution of the transcript from diarization turns.
+
+Every timed piece of the transcript (a word, or a segment without word
+timings) is assigned the speaker whose turn overlaps it most, using one
+sweep over both lists sorted by start time: turns enter a heap ordered by
+end time as the sweep reaches them and leave it once they end, so each
+piece is only compared with the turns active at that moment. Consecutive
+pieces of the same speaker are merged into utterances, which form the
+speaker-attributed transcript and let any character span of the
+transcript (a compliance, profanity or PII hit) be attributed to a speaker
+with a binary search.
+"""
+
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from services.transcript import Transcript
+
+
+@dataclass(frozen=True)
+class SpeakerAlignment:
+    """Speaker-attributed utterances of a transcript."""
+
+    utterances: list[dict[str, Any]]
+    roles: dict[str, str] = field(default_factory=dict)
+    char_starts: list[int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Index the utterances by their first character."""
+        object.__setattr__(self, "char_starts", [
+            utterance["char_start"] for utterance in self.utterances
+        ])
+
+    def speaker_at(self, char_start: int, char_end: int) -> str | None:
+        """Return the speaker of the utterance containing most of a span."""
+        if not self.utterances:
+            return None
+        starts = self.char_starts
+        first = max(bisect_right(starts, char_start) - 1, 0)
+        last = max(bisect_right(starts, max(char_end - 1, char_start)) - 1, 0)
+        best = max(
+            self.utterances[first:last + 1],
+            key=lambda utterance: min(utterance["char_end"], char_end)
+            - max(utterance["char_start"], char_start),
+        )
+        return best["speaker"]
+
+    def speakers_of(self, char_starts: Iterable[int]) -> list[str | None]:
+        """Return the speaker of the utterance containing each character."""
+        if not self.utterances:
+            return [None for _ in char_starts]
+        return [
+            self.utterances[max(bisect_right(self.char_starts, offset) - 1, 0)][
+                "speaker"
+            ]
+            for offset in char_starts
+        ]
+
+    def attribute(self, hits: list[dict[str, Any]] | None) -> None:
+        """Add ``speaker`` and ``role`` to hits with ``start_char``/``end_char``."""
+        for hit in hits or []:
+            speaker = self.speaker_at(hit["start_char"], hit["end_char"])
+            hit["speaker"] = speaker
+            hit["role"] = self.roles.get(speaker) if speaker is not None else None
+
+    def transcript(self, text: str) -> list[dict[str, Any]]:
+        """Return ``{"speaker", "role", "start", "end", "text"}`` per utterance."""
+        return [
+            {
+                "speaker": utterance["speaker"],
+                "role": self.roles.get(utterance["speaker"]),
+                "start": utterance["start"],
+                "end": utterance["end"],
+                "text": text[utterance["char_start"]:utterance["char_end"]],
+            }
+            for utterance in self.utterances
+        ]
+
+
+def assign_speakers(
+    pieces: list[tuple[float, float]], turns: list[dict[str, Any]],
+) -> list[str | None]:
+    """Return the speaker overlapping each ``(start, end)`` piece the most.
+
+    Pieces that overlap no turn get the speaker of the nearest turn. Both
+    lists are swept in start order, so the cost is O((n + m) log m) for n
+    pieces and m turns.
+    """
+    if not turns:
+        return [None] * len(pieces)
+
+    ordered_turns = sorted(turns, key=lambda turn: turn["start"])
+    piece_order = sorted(range(len(pieces)), key=lambda index: pieces[index][0])
+    speakers: list[str | None] = [None] * len(pieces)
+    active: list[tuple[float, int]] = []  # (end, turn index) heap
+    last_ended: int | None = None
+    next_turn = 0
+
+    for index in piece_order:
+        start, end = pieces[index]
+        while (
+            next_turn < len(ordered_turns)
+            and ordered_turns[next_turn]["start"] < end
+        ):
+            heapq.heappush(active, (ordered_turns[next_turn]["end"], next_turn))
+            next_turn += 1
+        while active and active[0][0] <= start:
+            _, ended = heapq.heappop(active)
+            if last_ended is None or ordered_turns[ended]["end"] >= (
+                ordered_turns[last_ended]["end"]
+            ):
+                last_ended = ended
+
+        if active:
+            _, best = max(
+                (min(turn_end, end) - max(ordered_turns[turn]["start"], start), turn)
+                for turn_end, turn in active
+            )
+        else:
+            best = _nearest_turn(ordered_turns, last_ended, next_turn, start, end)
+        speakers[index] = ordered_turns[best]["speaker"]
+    return speakers
+
+
+def _nearest_turn(
+    turns: list[dict[str, Any]],
+    previous: int | None,
+    following: int,
+    start: float,
+    end: float,
+) -> int:
+    """Return the closer of the last ended turn and the next turn to start."""
+    if previous is None:
+        return following
+    if following >= len(turns):
+        return previous
+    gap_before = start - turns[previous]["end"]
+    gap_after = turns[following]["start"] - end
+    return previous if gap_before <= gap_after else following
+
+
+def align_speakers(
+    transcript: Transcript, diarization: dict[str, Any],
+) -> SpeakerAlignment:
+    """Attribute the transcript to the speakers of the diarization turns.
+
+    Args:
+        transcript (Transcript): Cleaned transcript with its time index.
+        diarization (dict[str, Any]): Diarization result with ``turns`` and
+            ``roles``.
+
+    Returns:
+        SpeakerAlignment: Utterances of consecutive pieces by one speaker.
+
+    """
+    pieces = list(transcript.time_index.pieces())
+    speakers = assign_speakers(
+        [(start, end) for _, _, start, end in pieces], diarization.get("turns", []),
+    )
+
+    utterances: list[dict[str, Any]] = []
+    for (char_start, char_end, start, end), speaker in zip(
+        pieces, speakers, strict=True,
+    ):
+        if utterances and utterances[-1]["speaker"] == speaker:
+            utterances[-1]["end"] = round(end, 2)
+            utterances[-1]["char_end"] = char_end
+        else:
+            utterances.append({
+                "speaker": speaker,
+                "start": round(start, 2),
+                "end": round(end, 2),
+                "char_start": char_start,
+                "char_end": char_end,
+            })
+    return SpeakerAlignment(utterances, diarization.get("roles", {}))
@@ -0,0 +1,87 @@
+"""Decode an audio file once and share the samples across pipeline stages."""
+
+from __future__ import annotations
+
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper and pyannote both work on 16 kHz mono audio
+INT16_SCALE = 32768.0
+
+
+class AudioDecodeError(ValueError):
+    """Raised when ffmpeg cannot decode an audio file."""
+
+
+def decode_audio(file_path: str | Path, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode an audio file into a mono float32 buffer using ffmpeg.
+
+    Args:
+        file_path (str | Path): Path to the audio file.
+        sample_rate (int, optional): Target sample rate. Defaults to 16000.
+
+    Returns:
+        np.ndarray: Samples in the range [-1, 1].
+
+    Raises:
+        AudioDecodeError: If ffmpeg fails or the file contains no audio.
+
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", str(file_path),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-",
+    ]
+    try:
+        raw = subprocess.run(cmd, capture_output=True, check=True).stdout  # noqa: S603
+    except subprocess.CalledProcessError as e:
+        error_msg = f"Failed to decode audio: {e.stderr.decode(errors='ignore')}"
+        raise AudioDecodeError(error_msg) from e
+
+    if not raw:
+        error_msg = f"No audio samples decoded from {file_path}"
+        raise AudioDecodeError(error_msg)
+
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    samples /= INT16_SCALE
+    return samples
+
+
+@dataclass
+class AudioContext:
+    """Decoded audio shared by every stage of a single request."""
+
+    path: Path
+    samples: np.ndarray
+    sample_rate: int = SAMPLE_RATE
+
+    @classmethod
+    def from_file(cls, file_path: str | Path) -> AudioContext:
+        """Decode ``file_path`` once into a 16 kHz mono float32 buffer."""
+        return cls(path=Path(file_path), samples=decode_audio(file_path))
+
+    @property
+    def duration_seconds(self) -> float:
+        """Duration derived from the sample count."""
+        return len(self.samples) / self.sample_rate
+
+    def waveform(self) -> dict[str, Any]:
+        """Return the in-memory waveform dict accepted by pyannote pipelines.
+
+        The ``(1, samples)`` waveform shares memory with ``samples``; nothing
+        is copied. It is a torch tensor, or a NumPy view where torch is not
+        installed (pyannote needs torch, so only stand-in models see that).
+        """
+        try:
+            import torch  # noqa: PLC0415
+        except ImportError:
+            waveform = self.samples[np.newaxis]
+        else:
+            waveform = torch.from_numpy(self.samples).unsqueeze(0)
+        return {"waveform": waveform, "sample_rate": self.sample_rate}
@@ -1,29 +1,119 @@
-"""Module for call categorization based on transcript keywords."""
-import re
+"""Module for call categorization based on transcript keywords.
 
+Categories and their keywords come from ``config.yaml`` and are compiled
+once into a single token automaton, so categorizing a transcript is one
+scan whose cost does not grow with the number of keywords.
+"""
 
-def categorize_call(transcript: str) -> list[str]:
-    """Categorizes a call transcript into predefined categories.
+from __future__ import annotations
 
-    Uses keyword matching to classify the transcript.
+from collections import Counter
+from dataclasses import dataclass
+
+from config_loader import DEFAULT_CALL_CATEGORIES
+from services.phrase_matcher import PhraseAutomaton, cached_engine
+
+UNCATEGORIZED = "Uncategorized"
+
+
+@dataclass(frozen=True)
+class CategorizationReport:
+    """Keyword hits per category for one transcript."""
+
+    keyword_hits: dict[str, dict[str, int]]
+
+    @property
+    def hits(self) -> dict[str, int]:
+        """Total keyword hits per matched category."""
+        return {
+            category: sum(keywords.values())
+            for category, keywords in self.keyword_hits.items()
+        }
+
+    @property
+    def scores(self) -> dict[str, float]:
+        """Share of all keyword hits per matched category, highest first."""
+        hits = self.hits
+        total = sum(hits.values())
+        return {
+            category: round(count / total, 3)
+            for category, count in sorted(hits.items(), key=lambda item: -item[1])
+        }
+
+    @property
+    def categories(self) -> list[str]:
+        """Matched category names, sorted, or ``["Uncategorized"]``."""
+        return sorted(self.keyword_hits) or [UNCATEGORIZED]
+
+    def to_dict(self) -> dict[str, dict]:
+        """Return hits, score and keyword counts per matched category."""
+        hits = self.hits
+        return {
+            category: {
+                "hits": hits[category],
+                "score": score,
+                "keywords": self.keyword_hits[category],
+            }
+            for category, score in self.scores.items()
+        }
+
+
+class CategorizationEngine:
+    """Category keywords compiled into a single-pass token matcher."""
+
+    def __init__(self, categories: dict[str, list[str]]) -> None:
+        """Compile every keyword of every category into one automaton."""
+        self._automaton = PhraseAutomaton(
+            (category, keyword)
+            for category, keywords in categories.items()
+            for keyword in keywords
+        )
+
+    def analyze(self, transcript: str) -> CategorizationReport:
+        """Count keyword hits per category in one scan of the transcript."""
+        counters: dict[str, Counter[str]] = {}
+        for match in self._automaton.find(transcript):
+            counters.setdefault(match.label, Counter())[match.phrase] += 1
+        return CategorizationReport(
+            {category: dict(counter) for category, counter in counters.items()},
+        )
+
+
+def get_categorization_engine(
+    categories: dict[str, list[str]] | None = None,
+) -> CategorizationEngine:
+    """Return the compiled engine for ``categories``, building it once.
+
+    The built-in categories are used when ``categories`` is None.
     """
-    categories: dict[str, list[str]] = {
-        "Billing Issue": ["bill", "charge", "payment", "refund", "overcharged"],
-        "Order Return": ["return", "exchange", "replace", "wrong item"],
-        "Technical Support": ["error", "not working", "issue", "troubleshoot", "fix"],
-        "Account Support": ["login", "password", "account locked", "reset"],
-        "General Inquiry": ["information", "details", "help", "assist"],
-    }
+    categories = DEFAULT_CALL_CATEGORIES if categories is None else categories
+    return cached_engine(CategorizationEngine, categories)
 
-    if not transcript.strip():
-        return ["Uncategorized"]
 
-    detected_categories: set[str] = set()
-    for category, keywords in categories.items():
-        if any(
-            re.search(rf"\b{re.escape(kw)}\b", transcript, re.IGNORECASE)
-            for kw in keywords
-        ):
-            detected_categories.add(category)
+def analyze_call_categories(
+    transcript: str, categories: dict[str, list[str]] | None = None,
+) -> CategorizationReport:
+    """Count keyword hits and score every category in a single pass.
+
+    Args:
+        transcript (str): The call transcript.
+        categories (dict[str, list[str]] | None, optional): Keywords per
+            category. Defaults to the built-in categories.
+
+    Returns:
+        CategorizationReport: Per-category keyword hits and scores.
+
+    """
+    return get_categorization_engine(categories).analyze(transcript)
+
+
+def categorize_call(
+    transcript: str, categories: dict[str, list[str]] | None = None,
+) -> list[str]:
+    """Categorizes a call transcript into predefined categories.
 
-    return sorted(detected_categories) if detected_categories else ["Uncategorized"]
+    Uses keyword matching to classify the transcript.
+    """
+    if not transcript.strip():
+        return [UNCATEGORIZED]
+    return analyze_call_categories(transcript, categories).categories
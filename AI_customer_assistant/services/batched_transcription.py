@@ -0,0 +1,418 @@
+"""Micro-batched Whisper inference shared by concurrent transcriptions.
+
+Whisper's own ``transcribe`` decodes one 30-second mel window at a time, so
+concurrent requests each run small forward passes that leave most of the
+CPU's matrix throughput unused. With ``[transcription] batching``, each
+recording is instead split at quiet points into overlapping windows of at
+most 30 seconds, and the windows of every transcription in flight in the
+process are queued on one ``WhisperBatcher``. Its thread takes up to
+``max_batch_size`` windows, waiting at most ``max_batch_wait_ms`` after the
+first, and decodes them with a single ``whisper.decode`` call: the encoder,
+language detection and greedy decoder all run on the whole batch. Each
+caller gets its windows back through futures.
+
+Word timestamps come from Whisper's cross-attention alignment, one pass per
+window as in ``transcribe(word_timestamps=True)``. It runs on the caller's
+thread under the batcher's model lock, since the alignment hooks the shared
+model's attention layers and no batch may run meanwhile.
+
+Compared with ``model.transcribe``, windows are decoded independently (not
+conditioned on the previous window's text), a window whose text repeats
+itself is decoded once more at a higher temperature instead of stepping
+through Whisper's whole fallback schedule, and segments end at sentence
+punctuation rather than at Whisper's timestamp tokens. Job worker
+processes each batch their own windows; ``[jobs] executor = "thread"``
+runs jobs in the API process so they share its batcher.
+
+Callers wait for their windows in short polls. They give up when their
+cancel event is set (windows not yet decoded are then dropped) or when the
+batcher thread has died; the batcher fails the windows still queued when
+it stops, and ``get_batcher`` starts a new one.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+import metrics
+from services.audio_context import SAMPLE_RATE
+from services.segmented_transcription import (
+    find_split_points,
+    plan_segments,
+    stitch_segments,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from config_loader import TranscriptionConfigModel
+    from services.transcription_backends import WhisperBackend
+
+logger = logging.getLogger(__name__)
+
+# Target window length; with the split search and the overlap on both sides
+# a window stays within Whisper's 30-second input.
+WINDOW_SECONDS = 26.0
+SPLIT_SEARCH_SECONDS = 1.0
+OVERLAP_SECONDS = 1.0
+
+# Whisper's transcribe defaults
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+FALLBACK_TEMPERATURE = 0.4
+RESULT_POLL_SECONDS = 0.5  # How often waiting callers check cancel and the thread
+# Word timing punctuation, copied from transcribe so whisper is not imported
+# to read them; the fullwidth marks are meant to match CJK transcripts
+PREPEND_PUNCTUATIONS = "\"'“¿([{-"
+APPEND_PUNCTUATIONS = "\"'.。,，!！?？:：”)]}、"  # noqa: RUF001
+SENTENCE_ENDINGS = (".", "?", "!", "。", "？", "！")  # noqa: RUF001
+
+_batcher: WhisperBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+class _Window(NamedTuple):
+    """A mel window waiting to be decoded."""
+
+    mel: Any
+    options: Any
+    future: Future
+
+
+class WhisperBatcher:
+    """Decode the mel windows submitted by any thread in shared batches."""
+
+    def __init__(
+        self, backend: WhisperBackend, max_batch_size: int, max_wait: float,
+    ) -> None:
+        """Start the batching thread.
+
+        Args:
+            backend (WhisperBackend): The loaded Whisper backend.
+            max_batch_size (int): Most windows decoded in one call.
+            max_wait (float): Seconds to wait for more windows after the
+                first one arrives.
+
+        """
+        self.backend = backend
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.model_lock = threading.Lock()
+        self._queue: queue.Queue[_Window | None] = queue.Queue()
+        self._deferred: list[_Window] = []  # Windows with other decoding options
+        self._tokenizers: dict[str | None, Any] = {}
+        self._thread = threading.Thread(
+            target=self._run, name="whisper-batcher", daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, mel: Any, temperature: float = 0.0) -> Future:  # noqa: ANN401
+        """Queue a ``(n_mels, 3000)`` mel window; the future gets its result."""
+        import whisper  # noqa: PLC0415
+
+        options = whisper.DecodingOptions(
+            task="transcribe",
+            temperature=temperature,
+            without_timestamps=True,
+            fp16=self.backend.fp16,
+        )
+        future: Future = Future()
+        self._queue.put(_Window(mel, options, future))
+        return future
+
+    def close(self) -> None:
+        """Stop the batching thread once the queued windows are decoded."""
+        self._queue.put(None)
+
+    def is_alive(self) -> bool:
+        """Return True while the batching thread is running."""
+        return self._thread.is_alive()
+
+    def result(
+        self, future: Future, cancel: threading.Event | None = None,
+    ) -> Any:  # noqa: ANN401
+        """Wait for a submitted window's result.
+
+        Raises:
+            RuntimeError: If ``cancel`` is set or the batching thread stops
+                before the window is decoded.
+
+        """
+        while True:
+            try:
+                return future.result(timeout=RESULT_POLL_SECONDS)
+            except FutureTimeoutError:
+                if cancel is not None and cancel.is_set():
+                    error_msg = "Batched transcription cancelled"
+                    raise RuntimeError(error_msg) from None
+                if not self.is_alive():
+                    error_msg = "Whisper batcher stopped"
+                    raise RuntimeError(error_msg) from None
+
+    def tokenizer(self, language: str | None) -> Any:  # noqa: ANN401
+        """Return the Whisper tokenizer for transcribing ``language``."""
+        from whisper.tokenizer import get_tokenizer  # noqa: PLC0415
+
+        if language not in self._tokenizers:
+            model = self.backend.model
+            self._tokenizers[language] = get_tokenizer(
+                model.is_multilingual,
+                num_languages=model.num_languages,
+                language=language,
+                task="transcribe",
+            )
+        return self._tokenizers[language]
+
+    def align(
+        self, tokenizer: Any, text_tokens: list[int],  # noqa: ANN401
+        mel: Any, num_frames: int,  # noqa: ANN401
+    ) -> list[Any]:
+        """Return the word timings of ``text_tokens`` within a mel window."""
+        import torch  # noqa: PLC0415
+        from whisper.timing import find_alignment  # noqa: PLC0415
+
+        dtype = torch.float16 if self.backend.fp16 else torch.float32
+        mel = mel.to(device=self.backend.device, dtype=dtype)
+        with self.model_lock:
+            return find_alignment(
+                self.backend.model, tokenizer, text_tokens, mel, num_frames,
+            )
+
+    def _collect(self) -> list[_Window] | None:
+        """Return the next batch, or None once closed.
+
+        A batch holds windows with the same decoding options; others are
+        deferred to a later batch.
+        """
+        first = self._deferred.pop(0) if self._deferred else self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        for window in list(self._deferred):
+            if len(batch) == self.max_batch_size:
+                return batch
+            if window.options == first.options:
+                self._deferred.remove(window)
+                batch.append(window)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                window = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if window is None:
+                self._queue.put(None)  # Stop after this batch
+                break
+            if window.options == first.options:
+                batch.append(window)
+            else:
+                self._deferred.append(window)
+        return batch
+
+    def _run(self) -> None:
+        """Decode batches until closed, failing queued windows on the way out."""
+        batch: list[_Window] | None = []
+        try:
+            while True:
+                batch = []
+                try:
+                    batch = self._collect()
+                    if batch is None:
+                        break
+                    self._decode(batch)
+                except Exception as e:
+                    logger.exception("Batched Whisper decoding failed")
+                    self._fail(batch or [], e)
+        finally:
+            self._fail(batch or [], RuntimeError("Whisper batcher stopped"))
+            self._fail_queued()
+
+    def _decode(self, batch: list[_Window]) -> None:
+        """Decode one batch and hand each window its result."""
+        import torch  # noqa: PLC0415
+        import whisper  # noqa: PLC0415
+
+        # Windows whose caller gave up are dropped
+        batch = [w for w in batch if w.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        mels = torch.stack([window.mel for window in batch])
+        with self.model_lock:
+            results = whisper.decode(
+                self.backend.model, mels.to(self.backend.device), batch[0].options,
+            )
+        metrics.record_whisper_batch(len(batch))
+        for window, result in zip(batch, results, strict=True):
+            window.future.set_result(result)
+
+    @staticmethod
+    def _fail(windows: list[_Window], error: BaseException) -> None:
+        """Set ``error`` on the windows that have no result yet."""
+        for window in windows:
+            if window.future.done():
+                continue
+            if window.future.running() or window.future.set_running_or_notify_cancel():
+                window.future.set_exception(error)
+
+    def _fail_queued(self) -> None:
+        """Fail the windows left when the batching thread stops."""
+        windows = self._deferred
+        self._deferred = []
+        while True:
+            try:
+                window = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if window is not None:
+                windows.append(window)
+        self._fail(windows, RuntimeError("Whisper batcher stopped"))
+
+
+def get_batcher(
+    backend: WhisperBackend, config: TranscriptionConfigModel,
+) -> WhisperBatcher:
+    """Return the process's batcher for ``backend``, starting it on first use."""
+    global _batcher  # noqa: PLW0603
+    with _batcher_lock:
+        if (
+            _batcher is None
+            or _batcher.backend is not backend
+            or not _batcher.is_alive()
+        ):
+            if _batcher is not None:
+                _batcher.close()
+            _batcher = WhisperBatcher(
+                backend, config.max_batch_size, config.max_batch_wait_ms / 1000,
+            )
+        return _batcher
+
+
+class _WindowTimes(NamedTuple):
+    """Where a decoded window sits in the recording."""
+
+    num_frames: int  # Mel frames holding audio rather than padding
+    offset_seconds: float
+    keep: tuple[float, float]  # Interval whose words the window contributes
+
+
+def _segment(words: list[dict[str, Any]]) -> dict[str, Any]:
+    """Return a Whisper-style segment made of ``words``."""
+    return {
+        "start": words[0]["start"],
+        "end": words[-1]["end"],
+        "text": "".join(word["word"] for word in words),
+        "words": words,
+    }
+
+
+def _window_segments(
+    batcher: WhisperBatcher, result: Any, mel: Any,  # noqa: ANN401
+    times: _WindowTimes,
+) -> list[dict[str, Any]]:
+    """Return the sentence segments of one decoded window in absolute time.
+
+    Windows Whisper judges silent are dropped, as are words starting outside
+    the ``keep`` interval (the overlap with the neighbouring windows).
+    """
+    num_frames, offset_seconds, keep = times
+    from whisper.timing import merge_punctuations  # noqa: PLC0415
+
+    if (
+        result.no_speech_prob > NO_SPEECH_THRESHOLD
+        and result.avg_logprob < LOGPROB_THRESHOLD
+    ):
+        return []
+    tokenizer = batcher.tokenizer(result.language)
+    text_tokens = [token for token in result.tokens if token < tokenizer.eot]
+    alignment = batcher.align(tokenizer, text_tokens, mel, num_frames)
+    merge_punctuations(alignment, PREPEND_PUNCTUATIONS, APPEND_PUNCTUATIONS)
+
+    segments, words = [], []
+    for timing in alignment:
+        start = offset_seconds + timing.start
+        if not timing.word or not keep[0] <= start < keep[1]:
+            continue
+        words.append({
+            "word": timing.word,
+            "start": round(start, 2),
+            "end": round(offset_seconds + timing.end, 2),
+            "probability": timing.probability,
+        })
+        if timing.word.rstrip().endswith(SENTENCE_ENDINGS):
+            segments.append(_segment(words))
+            words = []
+    if words:
+        segments.append(_segment(words))
+    return segments
+
+
+def transcribe_batched(
+    samples: np.ndarray, batcher: WhisperBatcher, sample_rate: int = SAMPLE_RATE,
+    cancel: threading.Event | None = None,
+) -> dict[str, Any]:
+    """Transcribe a recording through the shared batcher.
+
+    Setting ``cancel`` stops waiting and drops the windows not yet decoded.
+
+    Returns:
+        dict[str, Any]: ``{"text", "segments", "language"}`` with segment and
+        word timestamps relative to the start of the recording.
+
+    """
+    import whisper  # noqa: PLC0415
+    from whisper.audio import HOP_LENGTH, N_FRAMES  # noqa: PLC0415
+
+    splits = find_split_points(
+        samples, WINDOW_SECONDS, SPLIT_SEARCH_SECONDS, sample_rate,
+    )
+    plan = plan_segments(len(samples), splits, OVERLAP_SECONDS, sample_rate)
+    n_mels = batcher.backend.model.dims.n_mels
+    mels = [
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(samples[start:end]), n_mels)
+        for start, end, _, _ in plan
+    ]
+    logger.info("Transcribing %.0f s of audio as %d batched windows...",
+                len(samples) / sample_rate, len(plan))
+
+    futures = [batcher.submit(mel) for mel in mels]
+    try:
+        results = [batcher.result(future, cancel) for future in futures]
+        retries = {
+            index: batcher.submit(mels[index], FALLBACK_TEMPERATURE)
+            for index, result in enumerate(results)
+            if result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        }
+        futures.extend(retries.values())
+        for index, future in retries.items():
+            results[index] = batcher.result(future, cancel)
+    finally:
+        for future in futures:
+            future.cancel()  # No-op for decoded windows
+
+    times = [
+        _WindowTimes(
+            min((end - start) // HOP_LENGTH, N_FRAMES), start / sample_rate,
+            (keep_start / sample_rate, keep_end / sample_rate),
+        )
+        for start, end, keep_start, keep_end in plan
+    ]
+    parts = [
+        _window_segments(batcher, result, mel, window)
+        for mel, result, window in zip(mels, results, times, strict=True)
+    ]
+    transcript = stitch_segments(parts)
+    languages = Counter(result.language for result in results)
+    transcript["language"] = languages.most_common(1)[0][0] if languages else None
+    return transcript
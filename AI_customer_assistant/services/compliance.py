@@ -2,27 +2,111 @@
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
-import spacy
-from spacy.matcher import PhraseMatcher
+from services.phrase_matcher import PhraseAutomaton, PhraseMatch, cached_engine
+
+if TYPE_CHECKING:
+    from services.transcript import Transcript
 
-nlp = spacy.load("en_core_web_sm")
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class ComplianceReport:
+    """Compliance of each category plus every required phrase occurrence."""
+
+    compliance: dict[str, bool]
+    matches: list[PhraseMatch]
+
+    def timestamps(
+        self, transcript: str, categories: dict[str, bool] | None = None,
+    ) -> dict[str, list[tuple[str, int, int]]]:
+        """Group matches as ``(phrase, start_token, end_token)`` per category.
+
+        Only categories that are truthy in ``categories`` are included; all
+        compliant categories are used when it is omitted.
+        """
+        categories = self.compliance if categories is None else categories
+        found_phrases: dict[str, list[tuple[str, int, int]]] = {}
+        for match in self.matches:
+            if categories.get(match.label):
+                found_phrases.setdefault(match.label, []).append(
+                    (transcript[match.char_start:match.char_end],
+                     match.start, match.end),
+                )
+        return found_phrases
+
+    def timed_hits(self, transcript: Transcript) -> dict[str, list[dict[str, Any]]]:
+        """Group matches of compliant categories with their audio time.
+
+        Each hit carries the matched phrase, its token and character ranges
+        and its ``start``/``end`` seconds looked up in the transcript's time index.
+        """
+        found_phrases: dict[str, list[dict[str, Any]]] = {}
+        for match in self.matches:
+            if self.compliance.get(match.label):
+                start, end = transcript.time_index.span(
+                    match.char_start, match.char_end,
+                )
+                found_phrases.setdefault(match.label, []).append({
+                    "phrase": transcript.text[match.char_start:match.char_end],
+                    "start_token": match.start,
+                    "end_token": match.end,
+                    "start_char": match.char_start,
+                    "end_char": match.char_end,
+                    "start": start,
+                    "end": end,
+                })
+        return found_phrases
+
+
+class ComplianceEngine:
+    """Required phrases compiled into a single-pass token matcher."""
+
+    def __init__(self, required_phrases: dict[str, list[str]]) -> None:
+        """Compile every phrase of every category into one automaton."""
+        self.categories = list(required_phrases)
+        self._automaton = PhraseAutomaton(
+            (category, phrase)
+            for category, phrases in required_phrases.items()
+            for phrase in phrases
+        )
+
+    def analyze(self, transcript: str) -> ComplianceReport:
+        """Find all required phrases in one scan of the transcript."""
+        matches = self._automaton.find(transcript)
+        compliance = dict.fromkeys(self.categories, False)
+        for match in matches:
+            compliance[match.label] = True
+        return ComplianceReport(compliance=compliance, matches=matches)
+
+
+def get_compliance_engine(
+    required_phrases: dict[str, list[str]],
+) -> ComplianceEngine:
+    """Return the compiled engine for ``required_phrases``, building it once."""
+    return cached_engine(ComplianceEngine, required_phrases)
+
+
+def analyze_compliance(
+    transcript: str, required_phrases: dict[str, list[str]],
+) -> ComplianceReport:
+    """Check compliance and locate every required phrase in a single pass."""
+    logger.info("Starting compliance check...")
+    report = get_compliance_engine(required_phrases).analyze(transcript)
+    logger.info("Compliance check completed: %s", report.compliance)
+    return report
+
+
 def check_compliance(
     transcript: str, required_phrases: dict[str, list[str]],
 ) -> dict[str, bool]:
     """Check if all required categories are present in the transcript."""
-    transcript = transcript.lower()
-    compliance_issues = {}
-
-    logger.info("Starting compliance check...")
-    for category, phrases in required_phrases.items():
-        found = any(phrase.lower() in transcript for phrase in phrases)
-        compliance_issues[category] = found  # True if category is compliant
+    compliance_issues = analyze_compliance(transcript, required_phrases).compliance
+    for category, found in compliance_issues.items():
         logger.debug("Category: %s, Found: %s", category, found)
-
-    logger.info("Compliance check completed: %s", compliance_issues)
     return compliance_issues
 
 
@@ -32,36 +116,17 @@ def extract_timestamps(
     compliant_categories: dict[str, bool],
 ) -> dict[str, list[tuple[str, int, int]]]:
     """Extract timestamps of required phrases in the transcript."""
-    found_phrases: dict[str, list[tuple[str, int, int]]] = {}
-
-    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-    for category, phrases in required_phrases.items():
-        if compliant_categories.get(category):  # Only process compliant categories
-            patterns = [nlp(phrase) for phrase in phrases]
-            matcher.add(category, patterns)
-
-    doc = nlp(transcript)
-    matches = matcher(doc)
-    for match_id, start, end in matches:
-        category = nlp.vocab.strings[match_id]
-        phrase = doc[start:end].text
-        if category not in found_phrases:
-            found_phrases[category] = []
-        found_phrases[category].append((phrase, start, end))
-
-    return found_phrases
+    report = get_compliance_engine(required_phrases).analyze(transcript)
+    return report.timestamps(transcript, compliant_categories)
 
 
 def analyze_transcript(
     transcript: str, required_phrases: dict[str, list[str]],
 ) -> dict[str, dict]:
     """Analyze compliance and return timestamps only for found compliances."""
-    compliance_issues = check_compliance(transcript, required_phrases)
-
-    # Extract timestamps only for compliant phrases
-    found_phrases = extract_timestamps(transcript, required_phrases, compliance_issues)
+    report = analyze_compliance(transcript, required_phrases)
 
     return {
-        "compliance_issues": compliance_issues,
-        "found_phrases": found_phrases,
+        "compliance_issues": report.compliance,
+        "found_phrases": report.timestamps(transcript),
     }
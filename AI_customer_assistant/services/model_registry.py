@@ -0,0 +1,266 @@
+"""Process-wide registry that loads each heavy model once.
+
+Whisper, the pyannote diarization pipeline and the TextBlob sentiment
+analyzer are expensive to import and load, so services fetch them from here
+instead of loading them per call. Their libraries are only imported by the
+loaders, so importing the services stays cheap. Models can be loaded lazily
+on first use or eagerly at startup through ``ModelRegistry.warm_up``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import psutil
+
+from config_loader import ModelsConfigModel
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_SAMPLE_RATE = 16000
+WARM_UP_SECONDS = 1
+BYTES_PER_MB = 1024 * 1024
+OFFLINE_ENV_VARS = ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE")
+
+
+def resolve_device(device: str) -> str:
+    """Resolve the configured device, mapping "auto" to cuda when available."""
+    if device != "auto":
+        return device
+
+    import torch  # noqa: PLC0415
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _warm_up_audio() -> np.ndarray:
+    """Return a short silent buffer used for warm-up inference."""
+    return np.zeros(WARM_UP_SAMPLE_RATE * WARM_UP_SECONDS, dtype=np.float32)
+
+
+def _load_whisper(config: ModelsConfigModel) -> Any:  # noqa: ANN401
+    """Load the Whisper model with the configured transcription backend."""
+    from services.transcription_backends import load_backend  # noqa: PLC0415
+
+    return load_backend(config)
+
+
+def _warm_up_whisper(model: Any) -> None:  # noqa: ANN401
+    """Run one transcription over silence to initialise kernels."""
+    model.transcribe(_warm_up_audio())
+
+
+def _load_diarization(config: ModelsConfigModel) -> Any:  # noqa: ANN401
+    """Load the pyannote speaker diarization pipeline."""
+    import torch  # noqa: PLC0415
+    from dotenv import load_dotenv  # noqa: PLC0415
+    from pyannote.audio.pipelines import SpeakerDiarization  # noqa: PLC0415
+
+    load_dotenv()
+    hf_token = os.getenv("HUGGINGFACE_AUTH_TOKEN")
+    # A local pipeline config, or offline mode, needs no Hugging Face token
+    from_hub = not config.offline and not Path(config.diarization_model).exists()
+    if hf_token is None and from_hub:
+        error_msg = "HUGGINGFACE_AUTH_TOKEN is not set. Please check your .env file."
+        raise ValueError(error_msg)
+
+    pipeline = SpeakerDiarization.from_pretrained(
+        config.diarization_model, use_auth_token=hf_token,
+    )
+    pipeline.to(torch.device(resolve_device(config.device)))
+    return pipeline
+
+
+def _warm_up_diarization(pipeline: Any) -> None:  # noqa: ANN401
+    """Run the diarization pipeline over a short silent waveform."""
+    import torch  # noqa: PLC0415
+
+    waveform = torch.from_numpy(_warm_up_audio()).unsqueeze(0)
+    pipeline({"waveform": waveform, "sample_rate": WARM_UP_SAMPLE_RATE})
+
+
+def _load_sentiment(_config: ModelsConfigModel) -> Any:  # noqa: ANN401
+    """Create the TextBlob pattern sentiment analyzer."""
+    from textblob.en.sentiments import PatternAnalyzer  # noqa: PLC0415
+
+    return PatternAnalyzer()
+
+
+def _warm_up_sentiment(analyzer: Any) -> None:  # noqa: ANN401
+    """Analyze a short text so the sentiment lexicon is loaded."""
+    analyzer.analyze("thank you for calling")
+
+
+def _resident_bytes() -> int:
+    """Return the resident set size of the current process."""
+    return psutil.Process().memory_info().rss
+
+
+@dataclass
+class ModelEntry:
+    """A loaded model together with its load statistics."""
+
+    name: str
+    model: Any
+    load_seconds: float
+    resident_bytes: int
+    warm_up_seconds: float | None = None
+
+    def describe(self) -> dict[str, Any]:
+        """Return a JSON-serialisable summary of the entry."""
+        return {
+            "load_seconds": round(self.load_seconds, 2),
+            "warm_up_seconds": (
+                None if self.warm_up_seconds is None
+                else round(self.warm_up_seconds, 2)
+            ),
+            "resident_mb": round(self.resident_bytes / BYTES_PER_MB, 1),
+        }
+
+
+class ModelRegistry:
+    """Load heavy models once per process and hand out shared instances."""
+
+    def __init__(self, config: ModelsConfigModel | None = None) -> None:
+        """Initialize the registry with the built-in model loaders."""
+        self.config = config or ModelsConfigModel()
+        self._loaders: dict[str, Callable[[ModelsConfigModel], Any]] = {}
+        self._warmers: dict[str, Callable[[Any], None]] = {}
+        self._entries: dict[str, ModelEntry] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warm_up_error: str | None = None
+
+        self.register("whisper", _load_whisper, _warm_up_whisper)
+        self.register("diarization", _load_diarization, _warm_up_diarization)
+        self.register("sentiment", _load_sentiment, _warm_up_sentiment)
+
+    def configure(self, config: ModelsConfigModel) -> None:
+        """Replace the model configuration used for subsequent loads.
+
+        In offline mode the Hugging Face libraries are told not to reach the
+        hub, which only takes effect if they have not been imported yet.
+        """
+        if self._entries:
+            logger.warning(
+                "Reconfiguring model registry after loading: %s",
+                ", ".join(self._entries),
+            )
+        if config.offline:
+            for env_var in OFFLINE_ENV_VARS:
+                os.environ[env_var] = "1"
+        self.config = config
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[ModelsConfigModel], Any],
+        warmer: Callable[[Any], None] | None = None,
+    ) -> None:
+        """Register (or replace) the loader for a named model."""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            if warmer is not None:
+                self._warmers[name] = warmer
+            else:
+                self._warmers.pop(name, None)
+            self._locks.setdefault(name, threading.Lock())
+            self._entries.pop(name, None)
+
+    def get(self, name: str) -> Any:  # noqa: ANN401
+        """Return the named model, loading it on first use."""
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry.model
+
+        if name not in self._loaders:
+            error_msg = f"Unknown model: {name}"
+            raise KeyError(error_msg)
+
+        with self._locks[name]:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._load(name)
+        return entry.model
+
+    def _load(self, name: str) -> ModelEntry:
+        """Load a model and record its load time and memory footprint."""
+        logger.info("Loading model '%s'...", name)
+        rss_before = _resident_bytes()
+        start_time = time.perf_counter()
+        model = self._loaders[name](self.config)
+        entry = ModelEntry(
+            name=name,
+            model=model,
+            load_seconds=time.perf_counter() - start_time,
+            resident_bytes=max(_resident_bytes() - rss_before, 0),
+        )
+        self._entries[name] = entry
+        logger.info(
+            "Model '%s' loaded in %.2f seconds (%.1f MB resident).",
+            name, entry.load_seconds, entry.resident_bytes / BYTES_PER_MB,
+        )
+        return entry
+
+    def warm_up(self, names: list[str] | None = None) -> None:
+        """Load the given (or configured) models and run warm-up inference.
+
+        A failure is recorded in ``status`` and keeps the registry from
+        reporting ready.
+        """
+        names = self.config.preload if names is None else names
+        try:
+            for name in names:
+                self.get(name)
+                warmer = self._warmers.get(name)
+                if self.config.warm_up and warmer is not None:
+                    entry = self._entries[name]
+                    start_time = time.perf_counter()
+                    warmer(entry.model)
+                    entry.warm_up_seconds = time.perf_counter() - start_time
+                    logger.info(
+                        "Model '%s' warmed up in %.2f seconds.",
+                        name, entry.warm_up_seconds,
+                    )
+        except Exception as e:
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                raise
+            logger.exception("❌ Model warm-up failed")
+            self._warm_up_error = str(e)
+        finally:
+            self._ready.set()
+
+    def is_ready(self) -> bool:
+        """Return True once warm-up finished without errors."""
+        return self._ready.is_set() and self._warm_up_error is None
+
+    def status(self) -> dict[str, Any]:
+        """Return readiness and per-model statistics."""
+        return {
+            "ready": self.is_ready(),
+            "warm_up_finished": self._ready.is_set(),
+            "error": self._warm_up_error,
+            "models": {
+                name: entry.describe() for name, entry in self._entries.items()
+            },
+        }
+
+
+# Initialize the registry instance
+model_registry = ModelRegistry()
+
+
+def get_model(name: str) -> Any:  # noqa: ANN401
+    """Return a shared model instance from the process-wide registry."""
+    return model_registry.get(name)
@@ -0,0 +1,180 @@
+"""Token-level Aho-Corasick matcher for finding many phrases in one pass.
+
+Phrases and text are split into lowercase word tokens with the same
+tokenizer, and a trie of phrase tokens with failure links finds every
+occurrence of every phrase in a single left-to-right scan. The cost of a
+scan grows with the length of the text, not with the number of phrases.
+
+Engines built on the automaton are compiled once per phrase configuration
+through ``cached_engine``.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Collection, Hashable, Iterable
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_CACHED_ENGINES = 32  # Distinct (engine, configuration) pairs kept compiled
+
+T = TypeVar("T")
+
+# The configuration object last passed for each engine type, and its engine
+_last_engines: dict[Callable[..., Any], tuple[object, Any]] = {}
+
+
+@dataclass(frozen=True)
+class Tokens:
+    """Lowercase word tokens of a text with their character offsets."""
+
+    words: list[str]
+    starts: list[int]
+    ends: list[int]
+
+
+def tokenize(text: str) -> Tokens:
+    """Split ``text`` into lowercase word tokens, keeping character offsets."""
+    words, starts, ends = [], [], []
+    for match in TOKEN_PATTERN.finditer(text):
+        words.append(match.group(0).lower())
+        starts.append(match.start())
+        ends.append(match.end())
+    return Tokens(words, starts, ends)
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    """One occurrence of a phrase.
+
+    ``start``/``end`` are token indices (end exclusive) and
+    ``char_start``/``char_end`` are character offsets into the text.
+    """
+
+    label: str
+    phrase: str
+    start: int
+    end: int
+    char_start: int
+    char_end: int
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over word tokens."""
+
+    def __init__(self, phrases: Iterable[tuple[str, str]]) -> None:
+        """Build the automaton from ``(label, phrase)`` pairs.
+
+        Phrases without any word token are ignored.
+        """
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # (label, phrase, token length) emitted when a node is reached
+        self._outputs: list[list[tuple[str, str, int]]] = [[]]
+        self.size = 0
+
+        for label, phrase in phrases:
+            words = tokenize(phrase).words
+            if not words:
+                continue
+            node = 0
+            for word in words:
+                next_node = self._goto[node].get(word)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][word] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                node = next_node
+            self._outputs[node].append((label, phrase, len(words)))
+            self.size += 1
+
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        """Compute failure links breadth-first and merge suffix outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                suffix_outputs = self._outputs[self._fail[child]]
+                if suffix_outputs:
+                    self._outputs[child] = self._outputs[child] + suffix_outputs
+
+    def find_tokens(self, tokens: Tokens) -> list[PhraseMatch]:
+        """Return every phrase occurrence in already tokenized text."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches = []
+        node = 0
+        for index, word in enumerate(tokens.words):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for label, phrase, length in outputs[node]:
+                start = index + 1 - length
+                matches.append(PhraseMatch(
+                    label=label,
+                    phrase=phrase,
+                    start=start,
+                    end=index + 1,
+                    char_start=tokens.starts[start],
+                    char_end=tokens.ends[index],
+                ))
+        return matches
+
+    def find(self, text: str) -> list[PhraseMatch]:
+        """Return every phrase occurrence in ``text``, ordered by end token."""
+        return self.find_tokens(tokenize(text))
+
+
+def freeze_phrases(
+    phrases: Mapping[str, Iterable[str]] | Collection[str],
+) -> Hashable:
+    """Return a hashable copy of a phrase configuration.
+
+    A mapping of labels to phrases becomes a tuple of ``(label, phrases)``
+    pairs; a plain collection of phrases becomes a frozenset.
+    """
+    if isinstance(phrases, Mapping):
+        return tuple((label, tuple(values)) for label, values in phrases.items())
+    return frozenset(phrases)
+
+
+@lru_cache(maxsize=MAX_CACHED_ENGINES)
+def _compiled_engine(build: Callable[[Any], T], frozen: Hashable) -> T:
+    """Build (once per distinct configuration) the engine for ``frozen``."""
+    if isinstance(frozen, tuple):
+        return build({label: list(values) for label, values in frozen})
+    return build(frozen)
+
+
+def cached_engine(
+    build: Callable[[Any], T],
+    phrases: Mapping[str, Iterable[str]] | Collection[str],
+) -> T:
+    """Return ``build(phrases)``, compiling it once per distinct configuration.
+
+    Configured phrases are long-lived objects, so passing the same object
+    as last time costs an identity check. Another object is frozen with
+    ``freeze_phrases`` and hashed (O(phrases)) to find its engine; ``build``
+    then receives an equal copy of ``phrases``.
+    """
+    last = _last_engines.get(build)
+    if last is not None and last[0] is phrases:
+        return last[1]
+    engine = _compiled_engine(build, freeze_phrases(phrases))
+    _last_engines[build] = (phrases, engine)
+    return engine
@@ -1,12 +1,22 @@
-"""Module for detecting and masking (PII) in text."""
+"""Module for detecting and masking (PII) in text.
+
+All patterns are compiled once into a single alternation of named groups,
+so one left-to-right scan finds every PII span and produces the masked text.
+Where patterns overlap, the leftmost match wins, and at the same position
+the pattern listed first in ``PII_PATTERNS`` wins.
+"""
+
+from __future__ import annotations
 
 import re
+from collections import Counter
+from dataclasses import dataclass
 
 # Define refined PII patterns
 PII_PATTERNS: dict[str, str] = {
     "PHONE_NUMBER": r"\+?\d{1,2}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}",
     "SSN": r"\b\d{3}-\d{2}-\d{4}\b",
-    "EMAIL": r"\b([a-zA-Z0-9._%+-]+)@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b",
+    "EMAIL": r"\b(?P<email_user>[a-zA-Z0-9._%+-]+)@(?P<email_domain>[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b",  # noqa: E501
     "CREDIT_CARD": r"\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b",
     "PIN": r"\b(?!\d{2}[-/]\d{2}[-/])\d{4,6}\b",
     "IP_ADDRESS": r"\b(?:\d{1,3}\.){3}\d{1,3}\b",
@@ -22,6 +32,111 @@ MASKING_RULES: dict[str, str] = {
 }
 
 
+@dataclass(frozen=True)
+class PIISpan:
+    """One PII occurrence: entity, character offsets and its masked form."""
+
+    entity: str
+    start: int
+    end: int
+    replacement: str
+
+
+@dataclass(frozen=True)
+class PIIReport:
+    """Every PII span found in a text, and the text with them masked."""
+
+    spans: list[PIISpan]
+    masked: str
+
+    @property
+    def entities(self) -> list[str]:
+        """Names of detected entities, in ``PII_PATTERNS`` order."""
+        found = {span.entity for span in self.spans}
+        return [entity for entity in PII_PATTERNS if entity in found]
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """Number of occurrences per detected entity."""
+        return dict(Counter(span.entity for span in self.spans))
+
+
+def _replacement(entity: str, match: re.Match[str]) -> str:
+    """Return the masked form of a matched PII value."""
+    if entity in MASKING_RULES:
+        return MASKING_RULES[entity]
+    if entity == "EMAIL":
+        # Keep first letter
+        return f"{match.group('email_user')[0]}****@{match.group('email_domain')}"
+    if entity == "PIN":
+        return "*" * (match.end() - match.start())  # Fully mask PIN
+    return match.group(0)  # Default: return unchanged
+
+
+# Every pattern starts with a digit, "+" or "(", except emails, which start
+# a word that runs up to an "@". Checking this first lets the scanner skip
+# most positions without trying each alternative.
+CANDIDATE_GATE = r"(?=[\d+(]|\b[\w.%+-]+@)"
+
+
+class PIIScanner:
+    """PII patterns compiled into one named-group scanner."""
+
+    def __init__(self, patterns: dict[str, str], gate: str = CANDIDATE_GATE) -> None:
+        """Combine ``patterns`` into a single alternation, in priority order."""
+        alternatives = "|".join(
+            f"(?P<{entity}>{pattern})" for entity, pattern in patterns.items()
+        )
+        self._pattern = re.compile(f"{gate}(?:{alternatives})")
+
+    def scan(self, text: str) -> PIIReport:
+        """Find and mask every PII span of ``text`` in a single pass."""
+        spans = []
+        pieces = []
+        position = 0
+        for match in self._pattern.finditer(text):
+            entity = match.lastgroup  # The outer, per-entity group closes last
+            replacement = _replacement(entity, match)
+            spans.append(PIISpan(entity, match.start(), match.end(), replacement))
+            pieces.append(text[position:match.start()])
+            pieces.append(replacement)
+            position = match.end()
+        pieces.append(text[position:])
+        return PIIReport(spans=spans, masked="".join(pieces))
+
+
+_scanner = PIIScanner(PII_PATTERNS)
+
+
+def scan_pii(text: str) -> PIIReport:
+    """Detect and mask PII in one pass.
+
+    Args:
+        text (str): The input text to analyze.
+
+    Returns:
+        PIIReport: Typed spans with character offsets, and the masked text.
+
+    """
+    return _scanner.scan(text)
+
+
+def apply_masks(text: str, spans: list[PIISpan]) -> str:
+    """Replace the given spans of ``text`` with their masked form.
+
+    Used to mask a same-length rewrite of the scanned text (for example the
+    profanity-masked transcript) without scanning it again.
+    """
+    pieces = []
+    position = 0
+    for span in spans:
+        pieces.append(text[position:span.start])
+        pieces.append(span.replacement)
+        position = span.end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
 def check_pii(text: str) -> list[str]:
     """Identify PII in the given text.
 
@@ -32,9 +147,7 @@ def check_pii(text: str) -> list[str]:
         list[str]: Names of detected PII entities.
 
     """
-    return [
-        entity for entity, pattern in PII_PATTERNS.items() if re.search(pattern, text)
-    ]
+    return scan_pii(text).entities
 
 
 def mask_pii(text: str) -> str:
@@ -47,20 +160,4 @@ def mask_pii(text: str) -> str:
         str: The masked text with PII replaced.
 
     """
-
-    def replace_match(match: re.Match[str], entity: str) -> str:
-        """Replace matched PII with masked values."""
-        text_match = match.group(0)
-        if entity in MASKING_RULES:
-            return MASKING_RULES[entity]
-        if entity == "EMAIL":
-            return f"{match.group(1)[0]}****@{match.group(2)}"  # Keep first letter
-        if entity == "PIN":
-            return "*" * len(text_match)  # Fully mask PIN
-        return text_match  # Default: return unchanged
-
-    # Mask PII
-    for entity, pattern in PII_PATTERNS.items():
-        text = re.sub(pattern, lambda m, e=entity: replace_match(m, e), text)
-
-    return text
+    return scan_pii(text).masked
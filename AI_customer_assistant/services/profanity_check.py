@@ -1,7 +1,99 @@
-"""Module for detecting and masking profanity in text."""
+"""Module for detecting and masking profanity in text.
 
-import re
-from collections.abc import Sequence
+Prohibited words and multi-word phrases are compiled once into a token
+automaton, so one scan of the transcript finds every occurrence and the
+masked text is built from the same matches.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from services.phrase_matcher import (
+    TOKEN_PATTERN,
+    PhraseAutomaton,
+    PhraseMatch,
+    cached_engine,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Sequence
+
+MASK_CHAR = "*"
+
+
+@dataclass(frozen=True)
+class ProfanityReport:
+    """Every prohibited phrase occurrence and the masked text."""
+
+    matches: list[PhraseMatch]
+    masked: str
+
+    @property
+    def contains_prohibited(self) -> bool:
+        """Whether any prohibited phrase occurred."""
+        return bool(self.matches)
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """Number of occurrences per prohibited phrase."""
+        return dict(Counter(match.phrase for match in self.matches))
+
+
+class ProfanityEngine:
+    """Prohibited phrases compiled into a single-pass token matcher."""
+
+    def __init__(self, prohibited_phrases: Collection[str]) -> None:
+        """Compile every prohibited word or phrase into one automaton."""
+        self._automaton = PhraseAutomaton(
+            (phrase, phrase) for phrase in prohibited_phrases
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of compiled phrases."""
+        return self._automaton.size
+
+    def scan(self, text: str) -> ProfanityReport:
+        """Find and mask every prohibited phrase of ``text`` in one pass.
+
+        Word characters of each match are replaced by ``MASK_CHAR`` while
+        spaces and punctuation are kept, so the masked text has the same
+        length as ``text`` and character offsets stay valid.
+        """
+        matches = self._automaton.find(text)
+        if not matches:
+            return ProfanityReport(matches=matches, masked=text)
+
+        characters = list(text)
+        for match in matches:
+            characters[match.char_start:match.char_end] = TOKEN_PATTERN.sub(
+                lambda word: MASK_CHAR * len(word.group(0)),
+                text[match.char_start:match.char_end],
+            )
+        return ProfanityReport(matches=matches, masked="".join(characters))
+
+
+def get_profanity_engine(prohibited_phrases: Collection[str]) -> ProfanityEngine:
+    """Return the compiled engine for ``prohibited_phrases``, building it once."""
+    return cached_engine(ProfanityEngine, prohibited_phrases)
+
+
+def scan_profanity(text: str, prohibited_phrases: Collection[str]) -> ProfanityReport:
+    """Detect and mask prohibited words and phrases in a single pass.
+
+    Args:
+        text (str): The input text to check.
+        prohibited_phrases (Collection[str]): Prohibited words/phrases.
+
+    Returns:
+        ProfanityReport: Matches with token and character offsets, and the
+        masked text.
+
+    """
+    return get_profanity_engine(prohibited_phrases).scan(text)
 
 
 def check_profanity(text: str, prohibited_phrases: Sequence[str]) -> bool:
@@ -15,8 +107,7 @@ def check_profanity(text: str, prohibited_phrases: Sequence[str]) -> bool:
         bool: True if profanity is detected, otherwise False.
 
     """
-    words = re.findall(r"\b\w+\b", text.lower())  # Extract words, ignoring punctuation
-    return any(word in prohibited_phrases for word in words)
+    return scan_profanity(text, prohibited_phrases).contains_prohibited
 
 
 def mask_profanity(text: str, prohibited_phrases: Sequence[str]) -> str:
@@ -32,10 +123,4 @@ def mask_profanity(text: str, prohibited_phrases: Sequence[str]) -> str:
         str: The text with profane words masked.
 
     """
-
-    def mask_word(match: re.Match[str]) -> str:
-        """Replace profane words with asterisks."""
-        word = match.group(0)
-        return "*" * len(word) if word.lower() in prohibited_phrases else word
-
-    return re.sub(r"\b\w+\b", mask_word, text)
+    return scan_profanity(text, prohibited_phrases).masked
@@ -0,0 +1,243 @@
+"""Parallel transcription of long recordings.
+
+Whisper decodes its 30-second windows one after another, so a long call is
+transcribed sequentially. This module splits the decoded audio at quiet
+points into segments that overlap slightly, transcribes the segments in
+parallel on a process pool and stitches the words and segment timestamps
+back together.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from resources import child_threads
+from services.audio_context import SAMPLE_RATE
+from services.model_registry import get_model, model_registry
+
+if TYPE_CHECKING:
+    from config_loader import ModelsConfigModel, TranscriptionConfigModel
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.02
+SMOOTHING_SECONDS = 0.4  # Window for the energy curve used to pick quiet points
+MAX_SEAM_WORDS = 6  # Longest repeated word run removed at a segment boundary
+WORKER_START_SECONDS = 1.0
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def find_split_points(
+    samples: np.ndarray,
+    segment_seconds: float,
+    search_seconds: float,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[int]:
+    """Choose split points near every ``segment_seconds`` at the quietest frame.
+
+    Args:
+        samples (np.ndarray): Mono audio samples.
+        segment_seconds (float): Target segment length.
+        search_seconds (float): How far either side of each target to search.
+        sample_rate (int, optional): Sample rate of ``samples``.
+
+    Returns:
+        list[int]: Sample indices of the interior split points, ascending.
+
+    """
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return []
+
+    frames = samples[: n_frames * frame].reshape(n_frames, frame)
+    energy = np.square(frames).mean(axis=1)
+    width = max(int(SMOOTHING_SECONDS / FRAME_SECONDS), 1)
+    energy = np.convolve(energy, np.ones(width) / width, mode="same")
+
+    frames_per_segment = int(segment_seconds / FRAME_SECONDS)
+    search = int(search_seconds / FRAME_SECONDS)
+    splits = []
+    for target in range(frames_per_segment, n_frames - search, frames_per_segment):
+        low = max(target - search, 0)
+        high = min(target + search, n_frames)
+        splits.append((low + int(np.argmin(energy[low:high]))) * frame)
+    return splits
+
+
+def plan_segments(
+    n_samples: int, splits: list[int], overlap_seconds: float,
+    sample_rate: int = SAMPLE_RATE,
+) -> list[tuple[int, int, int, int]]:
+    """Return ``(start, end, keep_start, keep_end)`` sample ranges per segment.
+
+    Each segment covers ``[keep_start, keep_end)`` plus ``overlap_seconds`` on
+    either side; only words starting inside the keep range are retained.
+    """
+    overlap = int(overlap_seconds * sample_rate)
+    bounds = [0, *splits, n_samples]
+    return [
+        (max(keep_start - overlap, 0), min(keep_end + overlap, n_samples),
+         keep_start, keep_end)
+        for keep_start, keep_end in pairwise(bounds)
+    ]
+
+
+def _init_segment_worker(models_config: ModelsConfigModel, threads: int) -> None:
+    """Limit torch threads and load Whisper once in a segment worker."""
+    import torch  # noqa: PLC0415
+
+    torch.set_num_threads(threads)
+    model_registry.configure(models_config)
+    model_registry.get("whisper")
+
+
+def _get_pool(workers: int, models_config: ModelsConfigModel) -> ProcessPoolExecutor:
+    """Return the shared segment worker pool, creating it on first use."""
+    global _pool  # noqa: PLW0603
+    if _pool is None:
+        threads = child_threads(workers)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_segment_worker,
+            initargs=(models_config, threads),
+        )
+    return _pool
+
+
+def start_segment_workers(workers: int, models_config: ModelsConfigModel) -> None:
+    """Start every segment worker now so they load Whisper ahead of use.
+
+    Each worker is kept busy briefly, which makes the pool spawn all of its
+    processes instead of growing on demand.
+    """
+    pool = _get_pool(workers, models_config)
+    list(pool.map(time.sleep, [WORKER_START_SECONDS] * workers))
+
+
+def transcribe_segment(
+    samples: np.ndarray, offset_seconds: float, keep: tuple[float, float],
+) -> list[dict[str, Any]]:
+    """Transcribe one segment and return its segments in absolute time.
+
+    Words starting outside the ``keep`` interval (the overlap with the
+    neighbouring segments) are dropped.
+    """
+    model = get_model("whisper")
+    result = model.transcribe(samples, word_timestamps=True)
+
+    kept = []
+    for segment in result["segments"]:
+        words = []
+        for word in segment.get("words", []):
+            start = word["start"] + offset_seconds
+            if keep[0] <= start < keep[1]:
+                end = word["end"] + offset_seconds
+                words.append({**word, "start": start, "end": end})
+        if words:
+            kept.append({
+                "start": words[0]["start"],
+                "end": words[-1]["end"],
+                "text": "".join(word["word"] for word in words),
+                "words": words,
+            })
+    return kept
+
+
+def _normalize(word: str) -> str:
+    """Normalize a word for duplicate detection at segment seams."""
+    return re.sub(r"\W+", "", word).lower()
+
+
+def _drop_seam_duplicates(
+    previous: list[dict[str, Any]], following: list[dict[str, Any]],
+) -> int:
+    """Return how many leading words of ``following`` repeat ``previous``.
+
+    A run only counts as a duplicate if it overlaps the matching words in
+    time, so genuine repetitions ("no, no") survive.
+    """
+    tail = [_normalize(word["word"]) for word in previous[-MAX_SEAM_WORDS:]]
+    head = [_normalize(word["word"]) for word in following[:MAX_SEAM_WORDS]]
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if (
+            tail[-size:] == head[:size]
+            and following[0]["start"] < previous[-size]["end"]
+        ):
+            return size
+    return 0
+
+
+def stitch_segments(parts: list[list[dict[str, Any]]]) -> dict[str, Any]:
+    """Join per-segment results into one Whisper-style result dict.
+
+    Word runs repeated on both sides of a seam (a word straddling the split
+    point is sometimes heard by both segments) are removed from the later
+    segment.
+    """
+    segments: list[dict[str, Any]] = []
+    for part in parts:
+        if segments and part:
+            duplicates = _drop_seam_duplicates(segments[-1]["words"], part[0]["words"])
+            if duplicates:
+                first = part[0]
+                words = first["words"][duplicates:]
+                part = part[1:] if not words else [{  # noqa: PLW2901
+                    **first,
+                    "start": words[0]["start"],
+                    "text": "".join(word["word"] for word in words),
+                    "words": words,
+                }, *part[1:]]
+        segments.extend(part)
+
+    for index, segment in enumerate(segments):
+        segment["id"] = index
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+    }
+
+
+def transcribe_long_audio(
+    samples: np.ndarray,
+    config: TranscriptionConfigModel,
+    models_config: ModelsConfigModel,
+    sample_rate: int = SAMPLE_RATE,
+) -> dict[str, Any]:
+    """Transcribe a long recording in parallel segments.
+
+    Returns:
+        dict[str, Any]: ``{"text": ..., "segments": [...]}`` with segment and
+        word timestamps relative to the start of the recording.
+
+    """
+    splits = find_split_points(
+        samples, config.segment_seconds, config.split_search_seconds, sample_rate,
+    )
+    plan = plan_segments(len(samples), splits, config.overlap_seconds, sample_rate)
+    logger.info(
+        "Transcribing %.0f s of audio in %d segments on %d workers...",
+        len(samples) / sample_rate, len(plan), config.workers,
+    )
+
+    pool = _get_pool(config.workers, models_config)
+    futures = [
+        pool.submit(
+            transcribe_segment,
+            samples[start:end],
+            start / sample_rate,
+            (keep_start / sample_rate, keep_end / sample_rate),
+        )
+        for start, end, keep_start, keep_end in plan
+    ]
+    return stitch_segments([future.result() for future in futures])
@@ -1,12 +1,28 @@
-"""Module for call categorization based on transcript keywords."""
+"""Module for performing sentiment analysis on text using TextBlob.
+
+One pattern analyzer, held by the model registry, is shared by every call,
+so TextBlob is imported and its lexicon loaded once per process, on first
+use or at warm-up. The timeline mode scores every transcript segment (or
+speaker turn) and aggregates the scores over rolling time windows with
+NumPy.
+"""
 
 from __future__ import annotations
 
-from textblob import TextBlob
+from typing import Any
 
-"""
-Module for performing sentiment analysis on text using TextBlob.
-"""
+import numpy as np
+
+from services.model_registry import get_model
+
+
+def _label(polarity: float) -> str:
+    """Return the sentiment label for a polarity."""
+    if polarity > 0:
+        return "positive"
+    if polarity < 0:
+        return "negative"
+    return "neutral"
 
 
 def analyze_sentiment(text: str) -> dict[str, float | str]:
@@ -19,20 +35,126 @@ def analyze_sentiment(text: str) -> dict[str, float | str]:
         dict[str, Union[float, str]]: Sentiment results
 
     """
-    blob = TextBlob(text)
-    polarity: float = blob.sentiment.polarity  # Range: [-1, 1]
-    subjectivity: float = blob.sentiment.subjectivity  # Range: [0, 1]
-
-    # Determine sentiment label
-    if polarity > 0:
-        sentiment_label = "positive"
-    elif polarity < 0:
-        sentiment_label = "negative"
-    else:
-        sentiment_label = "neutral"
-
+    polarity, subjectivity = get_model("sentiment").analyze(text)  # [-1, 1], [0, 1]
     return {
         "polarity": polarity,
         "subjectivity": subjectivity,
-        "sentiment": sentiment_label,
+        "sentiment": _label(polarity),
+    }
+
+
+def score_segments(texts: list[str]) -> np.ndarray:
+    """Score many texts with the shared analyzer.
+
+    Returns:
+        np.ndarray: ``(len(texts), 2)`` array of polarity and subjectivity.
+
+    """
+    analyze = get_model("sentiment").analyze
+    scores = np.zeros((len(texts), 2))
+    for index, text in enumerate(texts):
+        scores[index] = analyze(text)
+    return scores
+
+
+def _weighted_means(
+    weights: np.ndarray, values: np.ndarray, low: np.ndarray, high: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return weighted means of ``values[low:high]`` per range via cumsums.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Per-range total weight and the
+        ``(n_ranges, n_columns)`` means (NaN where the weight is zero).
+
+    """
+    cumulative_weight = np.concatenate(([0.0], np.cumsum(weights)))
+    cumulative_values = np.vstack((
+        np.zeros(values.shape[1]), np.cumsum(values * weights[:, None], axis=0),
+    ))
+    total = cumulative_weight[high] - cumulative_weight[low]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (cumulative_values[high] - cumulative_values[low]) / total[:, None]
+    return total, means
+
+
+def sentiment_timeline(
+    segments: list[dict[str, Any]],
+    window_seconds: float = 60,
+    step_seconds: float = 15,
+) -> dict[str, Any]:
+    """Score every segment and aggregate the scores over rolling windows.
+
+    Args:
+        segments (list[dict[str, Any]]): Segments or speaker turns with
+            ``start``, ``end`` and ``text``, and optionally ``speaker``.
+        window_seconds (float, optional): Length of each rolling window.
+        step_seconds (float, optional): Distance between window starts.
+
+    Returns:
+        dict[str, Any]: Per-segment scores, per-window means (weighted by
+        word count, each segment assigned by its midpoint), the most
+        negative window and, when segments carry speakers, per-speaker
+        means.
+
+    """
+    if not segments:
+        return {"segments": [], "windows": [], "worst_window": None, "speakers": {}}
+
+    scores = score_segments([segment["text"] for segment in segments])
+    starts = np.array([segment["start"] for segment in segments], dtype=float)
+    ends = np.array([segment["end"] for segment in segments], dtype=float)
+    weights = np.array(
+        [max(len(segment["text"].split()), 1) for segment in segments], dtype=float,
+    )
+
+    order = np.argsort((starts + ends) / 2, kind="stable")
+    midpoints = ((starts + ends) / 2)[order]
+    window_starts = np.arange(
+        0.0, max(ends.max() - window_seconds, 0.0) + step_seconds, step_seconds,
+    )
+    low = np.searchsorted(midpoints, window_starts, side="left")
+    high = np.searchsorted(midpoints, window_starts + window_seconds, side="left")
+    totals, means = _weighted_means(weights[order], scores[order], low, high)
+
+    windows = [
+        {
+            "start": round(float(start), 2),
+            "end": round(float(start + window_seconds), 2),
+            "polarity": round(float(polarity), 3),
+            "subjectivity": round(float(subjectivity), 3),
+        }
+        for start, total, (polarity, subjectivity)
+        in zip(window_starts, totals, means, strict=True)
+        if total > 0
+    ]
+    worst_window = min(windows, key=lambda window: window["polarity"], default=None)
+
+    speakers = {}
+    labels = [segment.get("speaker") for segment in segments]
+    if any(label is not None for label in labels):
+        names, codes = np.unique(
+            np.array([str(label) for label in labels]), return_inverse=True,
+        )
+        speaker_weight = np.bincount(codes, weights=weights)
+        for column, key in enumerate(("polarity", "subjectivity")):
+            sums = np.bincount(codes, weights=weights * scores[:, column])
+            for name, value in zip(names, sums / speaker_weight, strict=True):
+                speakers.setdefault(str(name), {})[key] = round(float(value), 3)
+        speakers.pop("None", None)
+
+    return {
+        "segments": [
+            {
+                "start": round(float(start), 2),
+                "end": round(float(end), 2),
+                "polarity": round(float(polarity), 3),
+                "subjectivity": round(float(subjectivity), 3),
+                **({"speaker": label} if label is not None else {}),
+            }
+            for start, end, (polarity, subjectivity), label
+            in zip(starts, ends, scores, labels, strict=True)
+        ],
+        "windows": windows,
+        "worst_window": worst_window,
+        "speakers": speakers,
     }
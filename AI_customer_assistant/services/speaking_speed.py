@@ -1,10 +1,34 @@
-"""Module for calculating speaking speed in Words Per Minute (WPM)."""
+"""Module for calculating speaking speed in Words Per Minute (WPM).
+
+``calculate_wpm`` divides the word count by the whole call duration, so holds
+and silences make a rushed call look slow. ``speaking_rate`` works from the
+word timings instead: words closer together than ``pause_seconds`` are merged
+into stretches of speech, and the rate is words per minute of speech, overall
+and over sliding windows. Every step is a NumPy array operation (a running
+maximum to merge intervals, a cumulative sum of speech time and binary
+searches for the window edges), so an hour-long call takes milliseconds.
+"""
 
 from __future__ import annotations  # Ensure list[str] works in older Python versions
 
+from typing import Any
+
+import numpy as np
+
 # Constants for speaking speed thresholds
 SLOW_WPM_THRESHOLD = 125
 OPTIMAL_WPM_THRESHOLD = 175
+SECONDS_PER_MINUTE = 60
+PERCENTILES = (10, 50, 90)
+
+
+def _evaluate(wpm: float) -> str:
+    """Return the speed evaluation of a WPM value."""
+    if wpm < SLOW_WPM_THRESHOLD:
+        return "Too Slow 🐢"
+    if wpm <= OPTIMAL_WPM_THRESHOLD:
+        return "Optimal ✅"
+    return "Too Fast 🚀"
 
 
 def calculate_wpm(transcript: str, call_duration_seconds: float) -> tuple[float, str]:
@@ -22,13 +46,165 @@ def calculate_wpm(transcript: str, call_duration_seconds: float) -> tuple[float,
     """
     word_count = len(transcript.split())
     wpm = round((word_count / call_duration_seconds) * 60, 2)
+    return wpm, _evaluate(wpm)
 
-    # Define speaking speed evaluation
-    if wpm < SLOW_WPM_THRESHOLD:
-        speed_evaluation = "Too Slow 🐢"
-    elif SLOW_WPM_THRESHOLD <= wpm <= OPTIMAL_WPM_THRESHOLD:
-        speed_evaluation = "Optimal ✅"
-    else:
-        speed_evaluation = "Too Fast 🚀"
 
-    return wpm, speed_evaluation
+def word_counts(
+    text: str, char_starts: np.ndarray, char_ends: np.ndarray,
+) -> np.ndarray:
+    """Count the space-separated words of each ``text[char_start:char_end]``.
+
+    A cumulative count of spaces over the UTF-32 code points of the text
+    gives every piece's count with two lookups; pieces are words when
+    Whisper reported word timings and whole segments otherwise.
+    """
+    if not len(char_starts):
+        return np.zeros(0)
+    is_space = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32) == ord(" ")
+    spaces = np.concatenate(([0], np.cumsum(is_space)))
+    counts = spaces[char_ends] - spaces[char_starts] + 1
+    return np.where(char_ends > char_starts, counts, 0).astype(float)
+
+
+def speech_intervals(
+    starts: np.ndarray, ends: np.ndarray, pause_seconds: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge word intervals separated by less than ``pause_seconds``.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Start and end of each stretch of
+        speech, sorted and disjoint.
+
+    """
+    if not len(starts):
+        return np.zeros(0), np.zeros(0)
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    reach = np.maximum.accumulate(ends[order])
+    breaks = np.flatnonzero(starts[1:] - reach[:-1] >= pause_seconds) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(starts) - 1]))
+    return starts[first], reach[last]
+
+
+def _speech_before(
+    times: np.ndarray, interval_starts: np.ndarray, interval_ends: np.ndarray,
+) -> np.ndarray:
+    """Return the seconds of speech before each of ``times``."""
+    lengths = interval_ends - interval_starts
+    before = np.concatenate(([0.0], np.cumsum(lengths)))
+    index = np.searchsorted(interval_starts, times, side="right") - 1
+    inside = np.clip(times - interval_starts[index], 0.0, lengths[index])
+    return np.where(index >= 0, before[np.maximum(index, 0)] + inside, 0.0)
+
+
+def speaking_rate(  # noqa: PLR0913
+    starts: np.ndarray,
+    ends: np.ndarray,
+    counts: np.ndarray | None = None,
+    *,
+    window_seconds: float = 30,
+    step_seconds: float = 10,
+    pause_seconds: float = 1.0,
+    min_speech_seconds: float = 5,
+) -> dict[str, Any]:
+    """Compute the speaking rate over speech time, overall and per window.
+
+    Args:
+        starts (np.ndarray): Start time of each word (or timed piece).
+        ends (np.ndarray): End time of each word.
+        counts (np.ndarray | None, optional): Words per piece; one each by
+            default.
+        window_seconds (float, optional): Length of each sliding window.
+        step_seconds (float, optional): Distance between window starts.
+        pause_seconds (float, optional): Gaps at least this long are silence
+            and excluded from the speech time.
+        min_speech_seconds (float, optional): Windows with less speech are
+            left out of the timeline and percentiles.
+
+    Returns:
+        dict[str, Any]: ``wpm`` and its ``evaluation`` over speech time, the
+        ``words`` and ``speech_seconds`` counted, WPM ``percentiles`` across
+        windows and the ``timeline`` of windows with enough speech.
+
+    """
+    starts = np.asarray(starts, dtype=float)
+    ends = np.maximum(np.asarray(ends, dtype=float), starts)
+    counts = np.ones(len(starts)) if counts is None else np.asarray(counts, float)
+    interval_starts, interval_ends = speech_intervals(starts, ends, pause_seconds)
+    speech_seconds = float(np.sum(interval_ends - interval_starts))
+    words = float(counts.sum())
+    wpm = round(words * SECONDS_PER_MINUTE / speech_seconds, 2) if speech_seconds else 0
+    summary: dict[str, Any] = {
+        "wpm": wpm,
+        "evaluation": _evaluate(wpm) if speech_seconds else None,
+        "words": int(words),
+        "speech_seconds": round(speech_seconds, 2),
+        "percentiles": None,
+        "timeline": [],
+    }
+    if not speech_seconds:
+        return summary
+
+    # Words count towards the window holding their midpoint
+    order = np.argsort((starts + ends) / 2, kind="stable")
+    midpoints = ((starts + ends) / 2)[order]
+    cumulative_words = np.concatenate(([0.0], np.cumsum(counts[order])))
+    window_starts = np.arange(
+        0.0, max(ends.max() - window_seconds, 0.0) + step_seconds, step_seconds,
+    )
+    window_ends = window_starts + window_seconds
+    low = np.searchsorted(midpoints, window_starts, side="left")
+    high = np.searchsorted(midpoints, window_ends, side="left")
+    window_words = cumulative_words[high] - cumulative_words[low]
+    window_speech = (
+        _speech_before(window_ends, interval_starts, interval_ends)
+        - _speech_before(window_starts, interval_starts, interval_ends)
+    )
+    valid = window_speech >= min(min_speech_seconds, speech_seconds)
+    window_wpm = window_words[valid] * SECONDS_PER_MINUTE / window_speech[valid]
+
+    if len(window_wpm):
+        summary["percentiles"] = {
+            f"p{percentile}": round(float(value), 2)
+            for percentile, value in zip(
+                PERCENTILES, np.percentile(window_wpm, PERCENTILES), strict=True,
+            )
+        }
+    summary["timeline"] = [
+        {
+            "start": round(float(start), 2),
+            "end": round(float(end), 2),
+            "wpm": round(float(rate), 2),
+            "speech_seconds": round(float(speech), 2),
+        }
+        for start, end, rate, speech in zip(
+            window_starts[valid], window_ends[valid], window_wpm, window_speech[valid],
+            strict=True,
+        )
+    ]
+    return summary
+
+
+def speaking_rate_by_speaker(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    counts: np.ndarray,
+    speakers: list[str | None],
+    **options: float,
+) -> dict[str, dict[str, Any]]:
+    """Compute ``speaking_rate`` separately over the words of each speaker.
+
+    Pauses are measured between a speaker's own words, so the other party
+    talking counts as silence rather than speech for that speaker.
+    """
+    labels = np.array([str(speaker) for speaker in speakers])
+    rates = {}
+    for speaker in np.unique(labels):
+        if speaker == "None":
+            continue
+        own = labels == speaker
+        rates[str(speaker)] = speaking_rate(
+            starts[own], ends[own], counts[own], **options,
+        )
+    return rates
@@ -1,44 +1,36 @@
 """Speech Diarization Module."""
 
-import os
+from __future__ import annotations
+
 from collections import defaultdict
 from typing import Any
 
-from dotenv import load_dotenv
-from pyannote.audio.pipelines import SpeakerDiarization
-
-# Load pretrained pipeline from Hugging Face
-load_dotenv()
-
-# Get Hugging Face token from environment
-HF_TOKEN = os.getenv("HUGGINGFACE_AUTH_TOKEN")
-
-if HF_TOKEN is None:
-    error_msg = "HUGGINGFACE_AUTH_TOKEN is not set. Please check your .env file."
-    raise ValueError(error_msg)
-
-# Load pretrained pipeline from Hugging Face using the token
-pipeline = SpeakerDiarization.from_pretrained(
-    "pyannote/speaker-diarization-3.0",
-    use_auth_token=HF_TOKEN,
-)
+from services.model_registry import get_model
 
 MIN_SPEAKERS = 2  # Constant to replace magic number
+AGENT = "agent"
+CUSTOMER = "customer"
+OTHER = "other"
 
 
-def analyze_speaker_diarization(audio_file: str) -> dict[str, Any]:
+def analyze_speaker_diarization(audio_file: str | dict[str, Any]) -> dict[str, Any]:
     """Perform speaker diarization.
 
-    Computes speaking ratio, interruptions, and TTFT.
+    Computes speaking ratio, interruptions, and TTFT, and returns the
+    speaker turns with the role (agent or customer) of each speaker.
 
     Args:
-        audio_file (str): Path to the audio file.
+        audio_file (str | dict): Path to the audio file, or an in-memory
+            ``{"waveform": ..., "sample_rate": ...}`` dict.
 
     Returns:
-        dict: A dictionary containing speaking ratio, interruptions, and TTFT.
+        dict: A dictionary containing speaking ratio, interruptions, TTFT,
+        ``roles`` per speaker and ``turns`` as ``{"start", "end", "speaker"}``
+        in start order.
 
     """
-    # Run speaker diarization
+    # Run speaker diarization with the shared pretrained pipeline
+    pipeline = get_model("diarization")
     diarization = pipeline(audio_file)
 
     # Store speaker durations and turns
@@ -50,12 +42,24 @@ def analyze_speaker_diarization(audio_file: str) -> dict[str, Any]:
         speaker_durations[speaker] += duration
         speaker_turns.append((turn.start, turn.end, speaker))
 
+    speaker_turns.sort()
+    turns = [
+        {"start": round(start, 2), "end": round(end, 2), "speaker": speaker}
+        for start, end, speaker in speaker_turns
+    ]
+
     if len(speaker_durations) < MIN_SPEAKERS:
-        return {"speaking_ratio": 1.0, "interruptions": 0, "ttft": 0.0}
+        return {
+            "speaking_ratio": 1.0, "interruptions": 0, "ttft": 0.0,
+            "roles": dict.fromkeys(speaker_durations, AGENT), "turns": turns,
+        }
 
     # Identify customer and agent
     customer_speaker = min(speaker_durations, key=speaker_durations.get)
     agent_speaker = max(speaker_durations, key=speaker_durations.get)
+    roles = dict.fromkeys(speaker_durations, OTHER)
+    roles[customer_speaker] = CUSTOMER
+    roles[agent_speaker] = AGENT
 
     # Calculate speaking ratio
     customer_time = speaker_durations[customer_speaker]
@@ -91,4 +95,6 @@ def analyze_speaker_diarization(audio_file: str) -> dict[str, Any]:
         "speaking_ratio": round(speaking_ratio, 2),
         "interruptions": agent_interruptions,
         "ttft": round(avg_ttft, 2),
+        "roles": roles,
+        "turns": turns,
     }
@@ -0,0 +1,163 @@
+"""Cleaned transcripts with a character-offset to audio-time index.
+
+Whisper reports when each word (or, failing that, each segment) was spoken.
+The cleaned transcript is assembled from those timed pieces, and the start
+and end offset of every piece are recorded in flat arrays, so any character
+span found by a text analysis can be mapped to seconds with a binary search
+instead of re-tokenizing the text.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from services.utils import clean_text
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class TimeIndex:
+    """Array-backed map from character offsets of a text to audio seconds.
+
+    Pieces must be added in text order. Offsets inside a piece are linearly
+    interpolated between its start and end time; a span starting between
+    pieces (on a joining space) starts with the following piece.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self._char_starts = array("q")
+        self._char_ends = array("q")
+        self._start_times = array("d")
+        self._end_times = array("d")
+
+    def __len__(self) -> int:
+        """Return the number of timed pieces."""
+        return len(self._char_starts)
+
+    def add(self, char_start: int, char_end: int, start: float, end: float) -> None:
+        """Record that ``text[char_start:char_end]`` was spoken from start to end."""
+        self._char_starts.append(char_start)
+        self._char_ends.append(char_end)
+        self._start_times.append(start)
+        self._end_times.append(max(end, start))
+
+    def pieces(self) -> Iterator[tuple[int, int, float, float]]:
+        """Yield ``(char_start, char_end, start, end)`` of every piece in order."""
+        return zip(self._char_starts, self._char_ends,
+                   self._start_times, self._end_times, strict=True)
+
+    def columns(self) -> tuple[array, array, array, array]:
+        """Return the char start, char end, start time and end time arrays."""
+        return self._char_starts, self._char_ends, self._start_times, self._end_times
+
+    def _time_in_piece(self, piece: int, offset: int) -> float:
+        """Interpolate the time of ``offset`` within (or just after) a piece."""
+        char_start, char_end = self._char_starts[piece], self._char_ends[piece]
+        start, end = self._start_times[piece], self._end_times[piece]
+        if offset >= char_end:
+            return end
+        return start + (end - start) * (offset - char_start) / (char_end - char_start)
+
+    def start_time(self, offset: int) -> float:
+        """Return the time at which the character at ``offset`` is spoken."""
+        if not self._char_starts:
+            return 0.0
+        piece = bisect_right(self._char_starts, offset) - 1
+        if piece < 0:
+            return self._start_times[0]
+        if offset >= self._char_ends[piece] and piece + 1 < len(self):
+            return self._start_times[piece + 1]
+        return self._time_in_piece(piece, offset)
+
+    def end_time(self, offset: int) -> float:
+        """Return the time at which the text ending at ``offset`` (exclusive) ends."""
+        if not self._char_starts:
+            return 0.0
+        piece = bisect_left(self._char_starts, offset) - 1
+        if piece < 0:
+            return self._start_times[0]
+        return self._time_in_piece(piece, offset)
+
+    def span(self, char_start: int, char_end: int) -> tuple[float, float]:
+        """Return ``(start, end)`` seconds of ``text[char_start:char_end]``."""
+        return (round(self.start_time(char_start), 2),
+                round(self.end_time(char_end), 2))
+
+
+@dataclass(frozen=True)
+class Transcript:
+    """Cleaned transcript text, its time index and timed segments.
+
+    ``segments`` holds ``{"start", "end", "char_start", "char_end"}`` for
+    every Whisper segment that produced text.
+    """
+
+    text: str
+    time_index: TimeIndex = field(default_factory=TimeIndex)
+    segments: list[dict[str, Any]] = field(default_factory=list)
+
+    def timed_segments(self) -> list[dict[str, Any]]:
+        """Return ``{"start", "end", "text"}`` for every segment."""
+        return [
+            {
+                "start": round(segment["start"], 2),
+                "end": round(segment["end"], 2),
+                "text": self.text[segment["char_start"]:segment["char_end"]],
+            }
+            for segment in self.segments
+        ]
+
+
+def _timed_pieces(segment: dict[str, Any]) -> list[tuple[str, float, float]]:
+    """Return ``(text, start, end)`` per word, or the segment if it has none."""
+    words = segment.get("words")
+    if words:
+        return [(word["word"], word["start"], word["end"]) for word in words]
+    return [(segment["text"], segment["start"], segment["end"])]
+
+
+def build_transcript(result: dict[str, Any]) -> Transcript:
+    """Clean a Whisper result piece by piece, indexing when each was spoken.
+
+    Args:
+        result (dict[str, Any]): Whisper-style ``{"text", "segments"}`` result,
+            with or without word timestamps.
+
+    Returns:
+        Transcript: The cleaned text (as ``clean_text`` would produce for the
+        whole transcript) with its time index.
+
+    """
+    if not result.get("segments"):
+        return Transcript(clean_text(result.get("text", "")))
+
+    parts: list[str] = []
+    length = 0
+    time_index = TimeIndex()
+    segments = []
+    for segment in result["segments"]:
+        segment_start = None
+        for text, start, end in _timed_pieces(segment):
+            cleaned = clean_text(text)
+            if not cleaned:
+                continue
+            if parts:
+                length += 1  # Joining space
+            if segment_start is None:
+                segment_start = length
+            parts.append(cleaned)
+            time_index.add(length, length + len(cleaned), start, end)
+            length += len(cleaned)
+        if segment_start is not None:
+            segments.append({
+                "start": segment["start"],
+                "end": segment["end"],
+                "char_start": segment_start,
+                "char_end": length,
+            })
+    return Transcript(" ".join(parts), time_index, segments)
@@ -1,4 +1,11 @@
-"""Module for transcribing audio using Whisper."""
+"""Module for transcribing audio using Whisper.
+
+The model comes from the model registry, which loads the backend selected
+by ``[models] whisper_backend`` (see ``services.transcription_backends``).
+With ``[transcription] batching``, recordings are decoded in batches shared
+with the other transcriptions in the process (see
+``services.batched_transcription``) instead of in parallel segments.
+"""
 
 from __future__ import annotations  # For better type annotations
 
@@ -6,9 +13,17 @@ import logging
 import time
 import warnings
 from pathlib import Path
+from typing import Any
+
+import numpy as np
 
-import torch
-import whisper
+import stage_graph
+from config_loader import TranscriptionConfigModel
+from services.audio_context import SAMPLE_RATE
+from services.batched_transcription import get_batcher, transcribe_batched
+from services.model_registry import get_model, model_registry
+from services.segmented_transcription import transcribe_long_audio
+from services.transcription_backends import WhisperBackend
 
 # Set up logging
 logging.basicConfig(
@@ -24,52 +39,97 @@ warnings.filterwarnings(
     category=FutureWarning,
     message=".torch.load.",
 )
-warnings.filterwarnings(
-    "ignore",
-    category=UserWarning,
-    message=".FP16 is not supported on CPU.",
-)
 
 SUPPORTED_FORMATS = [".wav", ".mp3"]
 
-def transcribe_audio(audio_file: str | Path, retries: int = 3) -> str | None:
+# Long-audio settings, overridden via configure_transcription
+transcription_config = TranscriptionConfigModel()
+
+
+def configure_transcription(config: TranscriptionConfigModel) -> None:
+    """Set the long-audio transcription configuration."""
+    global transcription_config  # noqa: PLW0603
+    transcription_config = config
+
+
+def _run_model(audio: str | np.ndarray) -> dict[str, Any]:
+    """Transcribe with batched decoding, one Whisper call or parallel segments."""
+    config = transcription_config
+    if config.batching:
+        model = get_model("whisper")
+        if isinstance(model, WhisperBackend):
+            if isinstance(audio, str):
+                import whisper  # noqa: PLC0415
+
+                audio = whisper.load_audio(audio)
+            return transcribe_batched(
+                audio, get_batcher(model, config),
+                cancel=stage_graph.run_stopped(),
+            )
+
+    if (
+        isinstance(audio, np.ndarray)
+        and config.workers > 1
+        and len(audio) / SAMPLE_RATE >= config.long_audio_threshold_seconds
+    ):
+        return transcribe_long_audio(audio, config, model_registry.config)
+
+    # Shared Whisper model, loaded once per process
+    model = get_model("whisper")
+    return model.transcribe(audio, word_timestamps=True)
+
+
+def transcribe_audio(
+    audio_file: str | Path | np.ndarray, retries: int = 3,
+) -> str | None:
     """Transcribes an audio file using OpenAI's Whisper model.
 
     Args:
-        audio_file (str | Path): Path to the audio file (as a string or Path object).
+        audio_file (str | Path | np.ndarray): Path to the audio file, or an
+            already decoded 16 kHz mono float32 buffer.
         retries (int, optional): Number of retry attempts in case of failure.
             Defaults to 3.
 
     Returns:
         str | None: Transcribed text if successful, otherwise None.
 
+    """
+    result = transcribe_with_segments(audio_file, retries)
+    return None if result is None else result["text"]
+
+
+def transcribe_with_segments(
+    audio_file: str | Path | np.ndarray, retries: int = 3,
+) -> dict[str, Any] | None:
+    """Transcribe audio and keep Whisper's segment and word timestamps.
+
+    Recordings longer than ``long_audio_threshold_seconds`` are split at
+    silences and transcribed in parallel segments.
+
+    Returns:
+        dict[str, Any] | None: Whisper-style ``{"text", "segments"}`` result
+        if successful, otherwise None.
+
     """
     # Convert PosixPath to string if necessary
     if isinstance(audio_file, Path):
         audio_file = str(audio_file)
 
-    # Check if the file exists
-    if not Path(audio_file).exists():
-        logger.error("❌ Audio file not found: %s", audio_file)
-        return None
-
-    if Path(audio_file).suffix.lower() not in SUPPORTED_FORMATS:
-        logger.error("Unsupported file format: %s", audio_file)
+    if isinstance(audio_file, str):
+        # Check if the file exists
+        if not Path(audio_file).exists():
+            logger.error("❌ Audio file not found: %s", audio_file)
+            return None
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    logger.info("Loading whisper model on '%s'...", device)
-    # Load the Whisper model
-    model = whisper.load_model("base", device=device)
+        if Path(audio_file).suffix.lower() not in SUPPORTED_FORMATS:
+            logger.error("Unsupported file format: %s", audio_file)
 
     for attempt in range(1, retries + 1):
         logger.info("🎙️ Transcribing audio (Attempt %d/%d)...", attempt, retries)
         try:
-            # Transcribe the audio file
+            # Transcribe the audio file (or the decoded buffer, without ffmpeg)
             start_time  = time.time()
-            result = model.transcribe(audio_file)
-            end_time = time.time()
-            logger.info("Transcription Completed in %.2f seconds.", end_time-start_time)
-            return result["text"]
+            result = _run_model(audio_file)
         except Exception as e:
             if isinstance(e, (KeyboardInterrupt, SystemExit)):
                 raise  # Don't suppress system exit signals
@@ -79,5 +139,9 @@ def transcribe_audio(audio_file: str | Path, retries: int = 3) -> str | None:
             if attempt < retries:
                 logger.info("🔄 Retrying in 2 seconds...")
                 time.sleep(2)
+        else:
+            end_time = time.time()
+            logger.info("Transcription Completed in %.2f seconds.", end_time-start_time)
+            return result
     logger.error("❌ Max retries reached. Could not transcribe the audio.")
     return None
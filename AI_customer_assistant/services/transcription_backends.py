@@ -0,0 +1,114 @@
+"""Transcription backends selectable with ``[models] whisper_backend``.
+
+Every backend exposes the ``transcribe(audio, **options)`` method and
+``device`` attribute of a Whisper model and returns Whisper's ``{"text",
+"segments"}`` result, so the transcription services do not depend on how
+the model runs:
+
+* ``whisper``: the PyTorch Whisper model on the configured device, in fp16
+  on CUDA and fp32 on CPU.
+* ``whisper-int8``: the same checkpoint on the CPU with its linear layers
+  (nearly all of the encoder and decoder compute) dynamically quantized to
+  int8. Weights are quantized once at load time and activations per call,
+  so no calibration data is needed; expect a faster, smaller model with a
+  small accuracy cost, measured by ``benchmarks.bench_transcription``.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from config_loader import ModelsConfigModel
+
+logger = logging.getLogger(__name__)
+
+WHISPER = "whisper"
+WHISPER_INT8 = "whisper-int8"
+CPU = "cpu"
+
+
+class WhisperBackend:
+    """PyTorch Whisper, in half precision only where the device supports it."""
+
+    name = WHISPER
+
+    def __init__(self, model: Any) -> None:  # noqa: ANN401
+        """Wrap a loaded ``whisper`` model."""
+        self.model = model
+
+    @property
+    def device(self) -> Any:  # noqa: ANN401
+        """Return the torch device the model runs on."""
+        return self.model.device
+
+    @property
+    def fp16(self) -> bool:
+        """Return True if inference runs in half precision (CUDA only)."""
+        return self.device.type == "cuda"
+
+    def transcribe(
+        self, audio: str | np.ndarray, **options: Any,  # noqa: ANN401
+    ) -> dict[str, Any]:
+        """Transcribe ``audio`` with Whisper's decoding ``options``."""
+        options.setdefault("fp16", self.fp16)
+        return self.model.transcribe(audio, **options)
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """Whisper on the CPU with int8 dynamically quantized linear layers."""
+
+    name = WHISPER_INT8
+
+    def __init__(self, model: Any) -> None:  # noqa: ANN401
+        """Quantize a CPU ``whisper`` model in place and wrap it."""
+        import torch  # noqa: PLC0415
+        import whisper.model  # noqa: PLC0415
+
+        # Whisper's Linear only adds a dtype cast for fp16; quantize_dynamic
+        # matches module types exactly, so present them as torch Linear.
+        for module in model.modules():
+            if type(module) is whisper.model.Linear:
+                module.__class__ = torch.nn.Linear
+        torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True,
+        )
+        super().__init__(model)
+
+    @property
+    def fp16(self) -> bool:
+        """Quantized inference always runs in fp32 with int8 weights."""
+        return False
+
+
+def load_backend(config: ModelsConfigModel) -> WhisperBackend:
+    """Load the configured Whisper checkpoint with the configured backend.
+
+    Raises:
+        ValueError: If ``whisper_backend`` is not a known backend.
+
+    """
+    import whisper  # noqa: PLC0415
+
+    from services.model_registry import resolve_device  # noqa: PLC0415
+
+    if config.whisper_backend not in (WHISPER, WHISPER_INT8):
+        error_msg = f"Unknown whisper_backend: {config.whisper_backend}"
+        raise ValueError(error_msg)
+
+    device = resolve_device(config.device)
+    if config.whisper_backend == WHISPER_INT8 and device != CPU:
+        logger.warning("%s runs on the CPU only; ignoring device %s",
+                       WHISPER_INT8, device)
+        device = CPU
+    model = whisper.load_model(
+        config.whisper_model,
+        device=device,
+        download_root=config.whisper_download_root,
+    )
+    if config.whisper_backend == WHISPER_INT8:
+        return QuantizedWhisperBackend(model)
+    return WhisperBackend(model)
@@ -0,0 +1,380 @@
+"""Dependency-aware executor for the stages of the audio pipeline.
+
+Each stage declares the named values it consumes. A stage is submitted as
+soon as all of its inputs are available, so independent stages (for example
+transcription and speaker diarization) run concurrently. A run can be
+cancelled from another thread (for example when the client disconnects):
+no further stages are started and the run returns at once.
+
+Stages that time out, or are running when their run is cancelled or
+aborted, cannot be interrupted and keep running after the run returns.
+Their futures are kept per calling thread, so whoever bounds the work
+(``uploads.RequestExecutor``) can wait for them with ``take_outliving_stages``,
+and stages that wait in a loop can stop early by checking ``run_stopped``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import profiling
+from metrics import Usage, measure
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+THREAD = "thread"
+PROCESS = "process"
+
+# Stage events reported to ``StageGraph.run`` listeners
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+
+# Futures of stages still running after their run returned, per calling thread
+_outliving = threading.local()
+# The stop event of the run a stage thread belongs to
+_stage_thread = threading.local()
+
+CANCEL_POLL_SECONDS = 0.1  # How often a run checks its cancel event
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def run_stopped() -> threading.Event | None:
+    """Return the event set once the calling stage thread's run has returned.
+
+    None outside thread-pool stages. A stage that is still running when it
+    is set has timed out or been cancelled or aborted, and its result will
+    not be read.
+    """
+    return getattr(_stage_thread, "stopped", None)
+
+
+def _init_stage_thread(
+    profiler: profiling.SamplingProfiler | None, stopped: threading.Event,
+) -> None:
+    """Join the calling thread's profile and run; a thread pool initializer."""
+    profiling.adopt(profiler)
+    _stage_thread.stopped = stopped
+
+
+class StageError(RuntimeError):
+    """Raised (and recorded) when a stage fails or cannot run."""
+
+    def __init__(self, stage: str, message: str) -> None:
+        """Initialize the error with the failing stage name."""
+        super().__init__(f"Stage '{stage}': {message}")
+        self.stage = stage
+
+
+class StageTimeoutError(StageError):
+    """Recorded when a stage exceeds its timeout."""
+
+
+class StageCancelledError(StageError):
+    """Recorded for stages that were running or pending when a run was cancelled."""
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A unit of work in the pipeline.
+
+    ``func`` is called with the values named in ``inputs``, in order, and
+    its return value is published under ``name``. An input also listed in
+    ``optional`` is passed as None if its stage fails, instead of skipping
+    this one. A failing ``critical`` stage aborts the whole run.
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    optional: tuple[str, ...] = ()
+    timeout: float | None = None
+    executor: str = THREAD
+    critical: bool = False
+
+
+@dataclass
+class StageGraphResult:
+    """Values, errors, wall times and resource usage produced by a run."""
+
+    values: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, StageError] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    usage: dict[str, Usage] = field(default_factory=dict)
+    outcomes: dict[str, str] = field(default_factory=dict)
+    aborted: bool = False
+    cancelled: bool = False
+
+
+def take_outliving_stages() -> list[Future]:
+    """Return and forget the unfinished stages left behind by this thread's runs."""
+    futures = getattr(_outliving, "futures", [])
+    _outliving.futures = []
+    return [future for future in futures if not future.done()]
+
+
+def get_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """Return the shared process pool used by ``process`` stages.
+
+    The pool is created on first use; ``max_workers`` only applies then.
+    """
+    global _process_pool  # noqa: PLW0603
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=max_workers)
+    return _process_pool
+
+
+class StageGraph:
+    """Run a set of stages in dependency order with maximum concurrency."""
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        max_workers: int | None = None,
+        process_workers: int | None = None,
+    ) -> None:
+        """Validate the stage graph.
+
+        Raises:
+            ValueError: If stage names are duplicated, an optional input is
+                not an input or the graph has a cycle.
+
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            error_msg = "Stage names must be unique."
+            raise ValueError(error_msg)
+        for stage in stages:
+            if not set(stage.optional) <= set(stage.inputs):
+                error_msg = f"Optional inputs of '{stage.name}' must be inputs."
+                raise ValueError(error_msg)
+            if stage.executor not in (THREAD, PROCESS):
+                error_msg = (
+                    f"Unknown executor for stage '{stage.name}': {stage.executor}"
+                )
+                raise ValueError(error_msg)
+        self.max_workers = max_workers or len(stages)
+        self.process_workers = process_workers
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        """Raise ValueError if stage dependencies form a cycle."""
+        remaining = {
+            name: {i for i in stage.inputs if i in self.stages}
+            for name, stage in self.stages.items()
+        }
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                error_msg = (
+                    f"Cyclic stage dependencies: {', '.join(sorted(remaining))}"
+                )
+                raise ValueError(error_msg)
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(
+        self,
+        inputs: dict[str, Any],
+        on_event: Callable[[str, str], None] | None = None,
+        cancel: threading.Event | None = None,
+    ) -> StageGraphResult:
+        """Execute every stage and collect the results.
+
+        Args:
+            inputs (dict[str, Any]): Initial values available to all stages.
+            on_event (Callable[[str, str], None], optional): Called with the
+                stage name and one of RUNNING, COMPLETED, FAILED, SKIPPED,
+                TIMED_OUT or CANCELLED whenever a stage changes state.
+            cancel (threading.Event, optional): When set, running and pending
+                stages are recorded as cancelled and the run returns.
+
+        Returns:
+            StageGraphResult: Stage outputs keyed by stage name, plus errors
+            for stages that failed, timed out or were skipped because one of
+            their inputs failed, and the final event of every stage.
+
+        """
+        missing = {
+            i for stage in self.stages.values() for i in stage.inputs
+            if i not in self.stages and i not in inputs
+        }
+        if missing:
+            error_msg = f"Missing stage inputs: {', '.join(sorted(missing))}"
+            raise ValueError(error_msg)
+
+        # Stage threads join the profile of the calling thread, if any
+        stopped = threading.Event()
+        thread_pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="stage",
+            initializer=_init_stage_thread, initargs=(profiling.active(), stopped),
+        )
+        run = _Run(self, inputs, thread_pool, on_event)
+        try:
+            while (run.pending or run.running) and not run.result.aborted:
+                if cancel is not None and cancel.is_set():
+                    run.cancel()
+                    break
+                run.submit_ready()
+                if run.result.aborted or not run.running:
+                    break
+                run.wait(CANCEL_POLL_SECONDS if cancel is not None else None)
+                run.expire()
+        finally:
+            # Timed-out or abandoned stages keep running in the background
+            stopped.set()
+            thread_pool.shutdown(wait=False, cancel_futures=True)
+            run.keep_outliving()
+
+        return run.result
+
+
+class _Run:
+    """The pending, running and finished stages of one ``StageGraph.run``."""
+
+    def __init__(
+        self,
+        graph: StageGraph,
+        inputs: dict[str, Any],
+        thread_pool: Executor,
+        on_event: Callable[[str, str], None] | None,
+    ) -> None:
+        """Start with every stage pending."""
+        self.graph = graph
+        self.values = dict(inputs)
+        self.result = StageGraphResult()
+        self.pending = dict(graph.stages)
+        self.running: dict[Future, tuple[Stage, float | None]] = {}
+        self.abandoned: list[Future] = []
+        self.thread_pool = thread_pool
+        self.on_event = on_event
+
+    def notify(self, name: str, event: str) -> None:
+        """Record a stage's final event and pass every event to the listener."""
+        if event != RUNNING:
+            self.result.outcomes[name] = event
+        if self.on_event is not None:
+            self.on_event(name, event)
+
+    def fail(self, stage: Stage, error: StageError, event: str = FAILED) -> None:
+        """Record a failed stage, aborting the run if it is critical."""
+        self.result.errors[stage.name] = error
+        self.notify(stage.name, event)
+        if stage.critical:
+            self.result.aborted = True
+
+    def cancel(self) -> None:
+        """Record every running and pending stage as cancelled."""
+        stages = [stage for stage, _ in self.running.values()]
+        stages += list(self.pending.values())
+        for future in self.running:
+            future.cancel()
+        self.abandoned.extend(self.running)
+        self.running.clear()
+        self.pending.clear()
+        for stage in stages:
+            self.result.errors[stage.name] = StageCancelledError(
+                stage.name, "cancelled",
+            )
+            self.notify(stage.name, CANCELLED)
+        self.result.aborted = self.result.cancelled = True
+
+    def submit_ready(self) -> None:
+        """Submit stages whose inputs are ready and skip those that cannot run."""
+        changed = True
+        while changed and not self.result.aborted:
+            changed = False
+            for name, stage in list(self.pending.items()):
+                failed = [
+                    i for i in stage.inputs
+                    if i in self.result.errors and i not in stage.optional
+                ]
+                if failed:
+                    del self.pending[name]
+                    self.result.errors[name] = StageError(
+                        name, f"skipped because '{failed[0]}' failed",
+                    )
+                    self.result.aborted = self.result.aborted or stage.critical
+                    self.notify(name, SKIPPED)
+                    changed = True
+                elif all(
+                    i in self.values
+                    or (i in stage.optional and i in self.result.errors)
+                    for i in stage.inputs
+                ):
+                    del self.pending[name]
+                    self._submit(stage)
+
+    def _submit(self, stage: Stage) -> None:
+        """Start ``stage`` on its executor."""
+        executor = (
+            get_process_pool(self.graph.process_workers)
+            if stage.executor == PROCESS
+            else self.thread_pool
+        )
+        future = executor.submit(
+            measure, stage.func, *[self.values.get(i) for i in stage.inputs],
+        )
+        deadline = time.monotonic() + stage.timeout if stage.timeout else None
+        self.running[future] = (stage, deadline)
+        self.notify(stage.name, RUNNING)
+
+    def wait(self, poll: float | None) -> None:
+        """Wait for a stage to finish, a deadline or ``poll`` seconds."""
+        deadlines = [d for _, d in self.running.values() if d is not None]
+        timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+        if poll is not None:
+            timeout = poll if timeout is None else min(timeout, poll)
+        done, _ = wait(self.running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            stage, _ = self.running.pop(future)
+            try:
+                value, usage = future.result()
+            except Exception as e:  # noqa: BLE001
+                self.fail(stage, StageError(stage.name, str(e)))
+            else:
+                self.values[stage.name] = value
+                self.result.values[stage.name] = value
+                self.result.timings[stage.name] = usage.wall
+                self.result.usage[stage.name] = usage
+                self.notify(stage.name, COMPLETED)
+
+    def expire(self) -> None:
+        """Fail the running stages past their deadline."""
+        now = time.monotonic()
+        for future, (stage, deadline) in list(self.running.items()):
+            if deadline is not None and now >= deadline:
+                future.cancel()
+                del self.running[future]
+                self.abandoned.append(future)
+                self.fail(stage, StageTimeoutError(
+                    stage.name, f"timed out after {stage.timeout} seconds",
+                ), TIMED_OUT)
+
+    def keep_outliving(self) -> None:
+        """Keep the calling thread's stages that are still running."""
+        self.abandoned.extend(self.running)
+        _outliving.futures = [
+            future
+            for future in [*getattr(_outliving, "futures", []), *self.abandoned]
+            if not future.done()
+        ]
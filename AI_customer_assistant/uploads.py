@@ -0,0 +1,446 @@
+"""Streaming upload handling and a bounded executor for request processing.
+
+``receive_upload`` parses the ``multipart/form-data`` request body as it
+arrives and writes the file field once, into a uniquely named file in the
+upload directory; other fields are discarded and disk writes run on a
+worker thread, so the event loop never blocks. An upload is rejected as
+soon as the evidence arrives, without reading the rest of the body: its
+extension when the part headers are parsed, its first bytes when they are
+not a WAV or MP3 header, and its size when it passes the limit (checked
+against ``Content-Length``, which uploads must declare, before the body is
+read, and again while receiving).
+
+``RequestExecutor`` runs the synchronous pipeline on its own thread pool,
+limited to a fixed number of requests at a time. A request that exceeds its
+timeout or whose client disconnects gets its response at once; the cancel
+event passed to the pipeline is set, so it starts no further stages, and
+the call is left to return (and clean up after itself) in the background.
+A request keeps its slot until its call has returned and every pipeline
+stage it left running (see ``stage_graph.take_outliving_stages``) has
+finished, so abandoned model runs still count against the limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, NamedTuple, TypeVar
+
+from python_multipart.exceptions import ParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from stage_graph import take_outliving_stages
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Mapping
+
+    from fastapi import Request
+
+ALLOWED_EXTENSIONS = (".wav", ".mp3")
+HEADER_BYTES = 12  # Enough for the RIFF/WAVE and ID3 signatures
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # Boundaries and part headers around the file
+BYTES_PER_KB = 1024
+BYTES_PER_MB = 1024 * 1024
+MP3_SYNC_BYTE = 0xFF
+MP3_SYNC_MASK = 0xE0
+
+T = TypeVar("T")
+
+
+class UploadRejectedError(ValueError):
+    """Raised when an upload is refused before processing."""
+
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        """Initialize the error with the HTTP status to respond with."""
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ClientDisconnectedError(ConnectionError):
+    """Raised when the client went away while its request was processed."""
+
+
+class StoredUpload(NamedTuple):
+    """An uploaded file written to the upload directory."""
+
+    path: Path
+    filename: str
+
+
+def check_extension(filename: str | None) -> str:
+    """Return the lower-cased extension of a supported upload.
+
+    Raises:
+        UploadRejectedError: If the extension is not supported.
+
+    """
+    extension = Path(filename or "").suffix.lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        allowed_formats = ", ".join(ALLOWED_EXTENSIONS)
+        error_msg = f"File format not supported. Allowed formats: {allowed_formats}"
+        raise UploadRejectedError(error_msg)
+    return extension
+
+
+def check_header(extension: str, head: bytes) -> None:
+    """Check that the first bytes of an upload match its extension.
+
+    Raises:
+        UploadRejectedError: If they are not a WAV (RIFF/RF64 ... WAVE) or MP3
+            (ID3 tag or MPEG frame sync) header.
+
+    """
+    if extension == ".wav":
+        valid = head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE"
+    else:
+        valid = head[:3] == b"ID3" or (
+            len(head) > 1
+            and head[0] == MP3_SYNC_BYTE
+            and head[1] & MP3_SYNC_MASK == MP3_SYNC_MASK
+        )
+    if not valid:
+        error_msg = f"File content is not a valid {extension[1:].upper()} file"
+        raise UploadRejectedError(error_msg, status_code=415)
+
+
+def _too_large(max_bytes: int) -> UploadRejectedError:
+    """Return the error for an upload over ``max_bytes``."""
+    error_msg = f"File exceeds the {max_bytes // BYTES_PER_MB} MB upload limit"
+    return UploadRejectedError(error_msg, status_code=413)
+
+
+def has_declared_size(headers: Mapping[str, str]) -> bool:
+    """Return True if the request declares its body size in ``Content-Length``."""
+    return headers.get("content-length", "").isdigit()
+
+
+def declared_size_exceeds(headers: Mapping[str, str], max_bytes: int) -> bool:
+    """Return True if the request's ``Content-Length`` is over the upload limit."""
+    length = headers.get("content-length", "")
+    return length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD_BYTES
+
+
+class _UploadReceiver:
+    """Multipart parser callbacks that keep one file field as it arrives.
+
+    The callbacks run inside ``MultipartParser.write`` and raise
+    ``UploadRejectedError`` as soon as the upload is known to be invalid.
+    Accepted bytes are buffered until ``flush`` writes them.
+    """
+
+    def __init__(self, field: str, directory: Path, max_bytes: int) -> None:
+        """Wait for the ``field`` part of a form posted to the upload limit."""
+        self.field = field.encode()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.filename: str | None = None
+        self.extension = ""
+        self.path: Path | None = None
+        self.complete = False
+        self.size = 0
+        self._file: IO[bytes] | None = None
+        self._in_field = False
+        self._head = bytearray()
+        self._pending = bytearray()
+        self._headers: dict[bytes, bytes] = {}
+        self._header_name = bytearray()
+        self._header_value = bytearray()
+
+    def callbacks(self) -> dict[str, Callable[..., None]]:
+        """Return the callbacks to pass to ``MultipartParser``."""
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers[bytes(self._header_name).lower()] = bytes(self._header_value)
+        self._header_name.clear()
+        self._header_value.clear()
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        self._in_field = (
+            options.get(b"name") == self.field and self.filename is None
+        )
+        if self._in_field:
+            self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+            self.extension = check_extension(self.filename)
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_field:
+            return
+        piece = data[start:end]
+        if len(self._head) < HEADER_BYTES:
+            self._head += piece[:HEADER_BYTES - len(self._head)]
+            if len(self._head) == HEADER_BYTES:
+                check_header(self.extension, bytes(self._head))
+        self.size += len(piece)
+        if self.size > self.max_bytes:
+            raise _too_large(self.max_bytes)
+        self._pending += piece
+
+    def _part_end(self) -> None:
+        if not self._in_field:
+            return
+        self._in_field = False
+        if self.size == 0:
+            error_msg = "Uploaded file is empty"
+            raise UploadRejectedError(error_msg)
+        if len(self._head) < HEADER_BYTES:
+            check_header(self.extension, bytes(self._head))
+        self.complete = True
+
+    def _open(self) -> None:
+        """Create the uniquely named file the upload is written to."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        descriptor, name = tempfile.mkstemp(
+            suffix=self.extension, prefix="upload-", dir=self.directory,
+        )
+        self.path = Path(name)
+        self._file = os.fdopen(descriptor, "wb")
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+
+    async def flush(self, min_bytes: int = 0) -> None:
+        """Write the buffered bytes once there are at least ``min_bytes``."""
+        if self._pending and len(self._pending) >= min_bytes:
+            data = bytes(self._pending)
+            self._pending.clear()
+            await asyncio.to_thread(self._write, data)
+
+    def close(self, *, discard: bool = False) -> None:
+        """Close the file, deleting it if ``discard`` is set."""
+        if self._file is not None:
+            self._file.close()
+        if discard and self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+async def receive_upload(
+    request: Request, directory: str | Path, *,
+    field: str, max_bytes: int, chunk_bytes: int,
+) -> StoredUpload | None:
+    """Store the ``field`` file of a multipart form as its body arrives.
+
+    Args:
+        request (Request): The upload request; its body is read here.
+        directory (str | Path): Directory for the file; created if missing.
+        field (str): Name of the form field holding the file.
+        max_bytes (int): Largest accepted file.
+        chunk_bytes (int): Bytes buffered before each write.
+
+    Returns:
+        StoredUpload | None: The stored file, which the caller must delete,
+        or None if the request is not a form with that field.
+
+    Raises:
+        UploadRejectedError: If the body is not valid multipart data, or the
+            file has an unsupported extension or header, is empty or is
+            larger than ``max_bytes``.
+
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        return None
+
+    receiver = _UploadReceiver(field, Path(directory), max_bytes)
+    parser = MultipartParser(boundary, receiver.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            await receiver.flush(chunk_bytes)
+        parser.finalize()
+        await receiver.flush()
+    except BaseException as e:
+        await asyncio.to_thread(receiver.close, discard=True)
+        if isinstance(e, ParseError):
+            error_msg = "Malformed multipart body"
+            raise UploadRejectedError(error_msg) from e
+        raise
+    await asyncio.to_thread(receiver.close, discard=not receiver.complete)
+    if not receiver.complete or receiver.path is None:
+        return None
+    return StoredUpload(receiver.path, receiver.filename or "")
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Return once the client of ``request`` has disconnected.
+
+    The request body must already have been read: the server then has no
+    message left to deliver but ``http.disconnect``.
+    """
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+def _call_collecting_stages(call: Callable[[], T], outliving: list[Future]) -> T:
+    """Call ``call``, then add the stages it left running to ``outliving``."""
+    try:
+        return call()
+    finally:
+        outliving.extend(take_outliving_stages())
+
+
+def _when_all_done(futures: list[Future], callback: Callable[[], object]) -> None:
+    """Call ``callback`` once, after every future in ``futures`` is done."""
+    remaining = [future for future in futures if not future.done()]
+    if not remaining:
+        callback()
+        return
+    count = [len(remaining)]
+    lock = threading.Lock()
+
+    def one_done(_future: Future) -> None:
+        with lock:
+            count[0] -= 1
+            last = count[0] == 0
+        if last:
+            callback()
+
+    for future in remaining:
+        future.add_done_callback(one_done)
+
+
+class RequestExecutor:
+    """Thread pool running at most ``max_concurrent`` requests at a time."""
+
+    def __init__(self, max_concurrent: int, timeout: float | None = None) -> None:
+        """Create the pool; requests beyond the limit wait for a free slot."""
+        self.max_concurrent = max(max_concurrent, 1)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="request",
+        )
+        self._slots: asyncio.Semaphore | None = None
+        self._abandoned: set[asyncio.Future] = set()
+        self.in_flight = 0
+        self.waiting = 0
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,  # noqa: ANN401
+        disconnected: Callable[[], Awaitable[object]] | None = None,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> T:
+        """Run ``func(*args, cancel=event, **kwargs)`` on the pool.
+
+        ``func`` is always called, even when the request is abandoned while
+        waiting for a slot (with the event already set), so it can release
+        the request's resources.
+
+        Args:
+            func (Callable[..., T]): Blocking function accepting a ``cancel``
+                ``threading.Event``.
+            *args (Any): Positional arguments for ``func``.
+            disconnected (Callable[[], Awaitable[object]], optional): Awaited
+                while the request runs; returns once the client has gone away,
+                e.g. ``wait_for_disconnect``.
+            **kwargs (Any): Keyword arguments for ``func``.
+
+        Returns:
+            T: The return value of ``func``.
+
+        Raises:
+            TimeoutError: If the request (including its wait for a slot) takes
+                longer than the executor timeout.
+            ClientDisconnectedError: If ``disconnected`` returns first.
+
+        """
+        cancel = threading.Event()
+        task = asyncio.ensure_future(
+            self._run(partial(func, *args, cancel=cancel, **kwargs)),
+        )
+        watchers = {task}
+        if disconnected is not None:
+            watchers.add(asyncio.ensure_future(disconnected()))
+        try:
+            done, _ = await asyncio.wait(
+                watchers, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if task in done:
+                return task.result()
+            if done:
+                error_msg = "Client disconnected before processing finished"
+                raise ClientDisconnectedError(error_msg)
+            error_msg = f"Processing exceeded {self.timeout} seconds"
+            raise TimeoutError(error_msg)
+        finally:
+            for watcher in watchers - {task}:
+                watcher.cancel()
+            if not task.done():
+                cancel.set()
+                self._abandoned.add(task)
+                task.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Future) -> None:
+        """Drop an abandoned call once it has returned, discarding its outcome."""
+        self._abandoned.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, call: Callable[[], T]) -> T:
+        """Wait for a slot, then run ``call`` on the pool.
+
+        The slot is released from completion callbacks once ``call`` and the
+        stages it left running have finished, so abandoned calls count
+        against the limit until all of their work has stopped.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        loop = asyncio.get_running_loop()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        outliving: list[Future] = []
+        future = self._executor.submit(_call_collecting_stages, call, outliving)
+
+        def release() -> None:
+            self.in_flight -= 1
+            self._slots.release()
+
+        future.add_done_callback(
+            lambda _done: _when_all_done(
+                outliving, lambda: loop.call_soon_threadsafe(release),
+            ),
+        )
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of running and waiting requests."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running requests finish in the background."""
+        self._executor.shutdown(wait=False, cancel_futures=True)